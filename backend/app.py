@@ -3,7 +3,7 @@ import json
 import base64
 import secrets
 from io import BytesIO
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from collections import Counter
 from typing import Dict, Any, Optional, List
 from flask import Flask, redirect, request, jsonify, session, send_file
@@ -16,7 +16,20 @@ from PIL import Image, ImageDraw, ImageFont
 import requests
 import hashlib
 import json_storage as storage  # Import our JSON storage module
+from sync_engine import SyncJob, run_sync_jobs
+from spotify_clients import registry as client_registry, token_hash
+from spotify_scheduler import scheduler, submit_with_context
+from sync_queue import sync_queue
+from singleflight import SingleFlight
+from http_cache import response_cache
+from audio_features_store import audio_features_store
+from feature_batcher import audio_features_batcher
+import play_history
+import snapshot_history
+from projections import PROJECTION_VERSION, project_artist, project_artists, project_tracks
+from token_manager import TokenManager
 import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Optional dependencies for enhanced features
 try:
@@ -66,28 +79,96 @@ sp_oauth = SpotifyOAuth(
     cache_path=None
 )
 
+# Accounts service override (e.g. scripts/utils/fake_spotify_server.py for offline runs)
+SPOTIFY_ACCOUNTS_BASE_URL = os.getenv('SPOTIFY_ACCOUNTS_BASE_URL')
+if SPOTIFY_ACCOUNTS_BASE_URL:
+    sp_oauth.OAUTH_AUTHORIZE_URL = SPOTIFY_ACCOUNTS_BASE_URL.rstrip('/') + '/authorize'
+    sp_oauth.OAUTH_TOKEN_URL = SPOTIFY_ACCOUNTS_BASE_URL.rstrip('/') + '/api/token'
+
+# Maximum number of pages fetched in parallel by fetch_all_spotify_items
+FETCH_MAX_WORKERS = int(os.getenv('SPOTIFY_FETCH_WORKERS', 4))
+
+# Coalesces concurrent freshness syncs for the same user, data type and range
+freshness_flight = SingleFlight()
+
+def identity_cache_key(access_token: str) -> str:
+    """Cache key for the user identity bound to an access token."""
+    return f"identity:{token_hash(access_token)}"
+
+def invalidate_identity(token_info: Optional[Dict[str, Any]]):
+    """Forget the cached identity for a token (logout or token refresh)."""
+    if token_info and token_info.get('access_token'):
+        cache.delete(identity_cache_key(token_info['access_token']))
+
+def on_token_refresh(old_token: Dict[str, Any], new_token: Dict[str, Any]):
+    """Move the cached identity to a refreshed token and drop the old client."""
+    profile = cache.get(identity_cache_key(old_token['access_token']))
+    invalidate_identity(old_token)
+    client_registry.evict(old_token.get('access_token'))
+    
+    # Same user, so the new token needn't look up its identity again
+    if profile is not None:
+        expires_in = new_token.get('expires_at', 0) - int(datetime.now().timestamp())
+        cache.set(identity_cache_key(new_token['access_token']), profile, timeout=max(expires_in, 60))
+
+# Serializes token refreshes per session and renews active tokens ahead of expiry
+token_manager = TokenManager(sp_oauth, on_refresh=on_token_refresh)
+
+def get_token_info() -> Optional[Dict[str, Any]]:
+    """Get the session token, refreshing it if it has expired."""
+    token_info = session.get('token_info')
+    if not token_info:
+        return None
+    
+    # The manager hands out the newest token for this session, refreshing
+    # it at most once even when several requests find it expired
+    current = token_manager.get_token(token_info)
+    if current['access_token'] != token_info['access_token']:
+        session['token_info'] = current
+    
+    return current
+
 def get_spotify_client():
     """Get authenticated Spotify client from session."""
-    token_info = session.get('token_info')
+    token_info = get_token_info()
     if not token_info:
         return None
     
-    # Check if token needs refresh
-    if sp_oauth.is_token_expired(token_info):
-        token_info = sp_oauth.refresh_access_token(token_info['refresh_token'])
-        session['token_info'] = token_info
+    return client_registry.get_client(token_info)
+
+def get_current_user_profile() -> Optional[Dict[str, Any]]:
+    """Get the current user's Spotify profile, resolved once per access token.
+    
+    The profile is stored server-side keyed by a hash of the access token,
+    so only the first request made with a token calls ``current_user()``.
+    """
+    token_info = get_token_info()
+    if not token_info:
+        return None
     
-    return spotipy.Spotify(auth=token_info['access_token'])
+    key = identity_cache_key(token_info['access_token'])
+    profile = cache.get(key)
+    if profile is None:
+        try:
+            profile = client_registry.get_client(token_info).current_user()
+        except:
+            return None
+        
+        # Keep the identity for as long as the token is valid
+        expires_in = token_info.get('expires_at', 0) - int(datetime.now().timestamp())
+        cache.set(key, profile, timeout=max(expires_in, 60))
+    
+    # Rate limits and cached responses follow the user across token refreshes
+    if profile.get('id'):
+        client_registry.get_client(token_info).user_key = profile['id']
+    
+    return profile
 
 def get_user_id():
     """Get current user ID for cache key generation."""
-    sp = get_spotify_client()
-    if sp:
-        try:
-            user = sp.current_user()
-            return user.get('id', 'unknown')
-        except:
-            pass
+    profile = get_current_user_profile()
+    if profile:
+        return profile.get('id', 'unknown')
     return 'unknown'
 
 def generate_cache_key(*args):
@@ -102,6 +183,10 @@ def generate_cache_key(*args):
 def fetch_all_spotify_items(sp, fetch_func, **kwargs):
     """Fetch all items from Spotify API with pagination - NO LIMITS.
     
+    The first page is fetched on its own to learn the ``total`` item count;
+    the remaining offsets are then requested in parallel on a bounded worker
+    pool and merged back in rank order.
+    
     Args:
         sp: Spotify client instance
         fetch_func: Function to call (e.g., sp.current_user_top_tracks)
@@ -110,49 +195,96 @@ def fetch_all_spotify_items(sp, fetch_func, **kwargs):
     Returns:
         List of ALL items fetched (no artificial limits)
     """
-    all_items = []
     limit = 50  # Maximum allowed by Spotify API for most endpoints
-    offset = 0
     
     # Debug logging
     print(f"Fetching items with params: {kwargs}")
     
-    while True:
-        # Call the function with current offset and limit
-        results = fetch_func(limit=limit, offset=offset, **kwargs)
-        
-        # Add items to our collection
-        items = results.get('items', [])
-        all_items.extend(items)
-        
-        # Check if we've fetched all items
-        # If 'next' is None or we got fewer items than requested, we're done
-        if not results.get('next') or len(items) < limit:
-            break
-        
-        # Move to next page
-        offset += limit
-        
-        # NO LIMIT - Continue fetching until Spotify says we're done
-        # The API itself will stop returning results when there's no more data
+    # First page tells us how many items there are in total
+    first_page = fetch_func(limit=limit, offset=0, **kwargs)
+    all_items = list(first_page.get('items', []))
+    total = first_page.get('total')
+    
+    if first_page.get('next') and len(all_items) >= limit:
+        if isinstance(total, int):
+            offsets = list(range(limit, total, limit))
+            pages = {}
+            
+            def fetch_page(offset):
+                return fetch_func(limit=limit, offset=offset, **kwargs).get('items', [])
+            
+            workers = max(1, min(FETCH_MAX_WORKERS, len(offsets)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {submit_with_context(executor, fetch_page, offset): offset for offset in offsets}
+                for future in as_completed(futures):
+                    pages[futures[future]] = future.result()
+            
+            # Merge pages back in rank order
+            for offset in offsets:
+                all_items.extend(pages[offset])
+        else:
+            # No total reported - walk the pages one by one
+            offset = limit
+            while True:
+                results = fetch_func(limit=limit, offset=offset, **kwargs)
+                items = results.get('items', [])
+                all_items.extend(items)
+                
+                # If 'next' is None or we got fewer items than requested, we're done
+                if not results.get('next') or len(items) < limit:
+                    break
+                offset += limit
     
     print(f"Fetched {len(all_items)} total items for {kwargs.get('time_range', 'default')}")  # Log for debugging
     return all_items
 
+def fetch_cursor_paginated(fetch_func, extract=None, **kwargs):
+    """Iterate over a cursor-paginated endpoint, following ``cursors.after``.
+    
+    Items are yielded page by page, so callers can stream them to storage
+    instead of collecting the whole list.
+    
+    Args:
+        fetch_func: Function to call (e.g., sp.current_user_followed_artists)
+        extract: Optional function picking the paging object out of a response
+            (e.g., the ``artists`` key of followed-artists responses)
+        **kwargs: Arguments to pass to the function
+    
+    Yields:
+        Items from each page in order
+    """
+    limit = 50  # Maximum allowed by Spotify API for most endpoints
+    after = None
+    
+    while True:
+        response = fetch_func(limit=limit, after=after, **kwargs) if after else fetch_func(limit=limit, **kwargs)
+        page = extract(response) if extract and response else response
+        if not page or not page.get('items'):
+            return
+        
+        yield from page['items']
+        
+        after = (page.get('cursors') or {}).get('after')
+        if not after or not page.get('next'):
+            return
+
 # Audio Features Analysis Functions
 def get_audio_features(sp: spotipy.Spotify, track_ids: List[str]) -> List[Dict[str, Any]]:
-    """Get audio features for multiple tracks."""
-    all_features = []
+    """Get audio features for multiple tracks.
     
-    for i in range(0, len(track_ids), 100):
-        batch = track_ids[i:i+100]
-        try:
-            features = sp.audio_features(batch)
-            all_features.extend([f for f in features if f])
-        except:
-            pass
+    Features are read from the persistent store; only track IDs it doesn't
+    know (or whose "no features" answer has expired) are requested from the
+    API, batched together with the lookups of concurrent requests.
+    """
+    known = audio_features_store.get_many(track_ids)
+    missing = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in known]
     
-    return all_features
+    if missing:
+        fetched = audio_features_batcher.fetch(sp, missing)
+        audio_features_store.put_many(fetched)
+        known.update(fetched)
+    
+    return [known[track_id] for track_id in track_ids if known.get(track_id)]
 
 def analyze_music_characteristics(sp: spotipy.Spotify, tracks: List[Dict]) -> Dict[str, Any]:
     """Analyze musical characteristics of user's top tracks."""
@@ -296,17 +428,107 @@ def get_listening_personality(analysis: Dict[str, Any]) -> Dict[str, str]:
     
     return personality
 
-def sync_user_data(user_id: str, force: bool = False) -> Dict[str, Any]:
+def save_top_items(user_id: str, item_type: str, items: List[Dict[str, Any]], time_range: str) -> bool:
+    """Save a freshly fetched top list and record it in the snapshot history.
+    
+    Returns:
+        False if the save failed; no snapshot is recorded then
+    """
+    if item_type == 'tracks':
+        saved = storage.save_top_tracks(user_id, items, time_range)
+        if saved:
+            snapshot_history.record_snapshot(user_id, 'top_tracks', time_range, project_tracks(items))
+    else:
+        saved = storage.save_top_artists(user_id, items, time_range)
+        if saved:
+            snapshot_history.record_snapshot(user_id, 'top_artists', time_range, project_artists(items))
+    return saved
+
+def plan_sync_jobs(sp: spotipy.Spotify, user_id: str, force: bool = False,
+                   time_ranges: Optional[List[str]] = None) -> List[SyncJob]:
+    """Plan the independent jobs that make up a full user sync.
+    
+    Top tracks and artists get one job per stale time range; profile,
+    recently played and followed artists are always refreshed.
+    """
+    
+    def sync_profile():
+        user_data = sp.current_user()
+        storage.save_user_profile(user_id, user_data)
+        return user_data
+    
+    def sync_top_tracks(time_range):
+        with response_cache.track_changes() as changes:
+            all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=time_range)
+        # Every page came back 304 - keep the stored file, just mark it verified
+        if not (changes.unchanged and storage.has_current_projection(user_id, 'top_tracks', time_range)
+                and storage.touch_data(user_id, 'top_tracks', time_range)):
+            if not save_top_items(user_id, 'tracks', all_tracks, time_range):
+                raise RuntimeError(f"Failed to save top tracks for {time_range}")
+        return len(all_tracks)
+    
+    def sync_top_artists(time_range):
+        with response_cache.track_changes() as changes:
+            all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=time_range)
+        if not (changes.unchanged and storage.has_current_projection(user_id, 'top_artists', time_range)
+                and storage.touch_data(user_id, 'top_artists', time_range)):
+            if not save_top_items(user_id, 'artists', all_artists, time_range):
+                raise RuntimeError(f"Failed to save top artists for {time_range}")
+        return len(all_artists)
+    
+    def sync_recently_played():
+        return sync_play_history(sp, user_id)
+    
+    def sync_followed_artists():
+        # Spotify lists follows by artist ID, so a follow plus an unfollow can
+        # leave the total and the first pages unchanged; always walk every page
+        followed_artists = fetch_cursor_paginated(sp.current_user_followed_artists,
+                                                  extract=lambda response: response.get('artists'))
+        return storage.stream_data(user_id, 'followed_artists', map(project_artist, followed_artists),
+                                   metadata={'projection': PROJECTION_VERSION})
+    
+    jobs = [SyncJob('profile', sync_profile)]
+    
+    for time_range in time_ranges or ['short_term', 'medium_term', 'long_term']:
+        # Check if sync is needed
+        if force or storage.is_data_stale(user_id, 'top_tracks', time_range, days=7):
+            jobs.append(SyncJob(f'top_tracks:{time_range}', lambda r=time_range: sync_top_tracks(r), time_range))
+        if force or storage.is_data_stale(user_id, 'top_artists', time_range, days=7):
+            jobs.append(SyncJob(f'top_artists:{time_range}', lambda r=time_range: sync_top_artists(r), time_range))
+    
+    jobs.append(SyncJob('recently_played', sync_recently_played, required=False))
+    jobs.append(SyncJob('followed_artists', sync_followed_artists, required=False))
+    return jobs
+
+def sync_play_history(sp: spotipy.Spotify, user_id: str) -> int:
+    """Append new plays to the history log and refresh recently_played.json.
+    
+    Returns:
+        Number of new plays
+    """
+    new_plays = play_history.fetch_new_plays(sp, user_id)
+    storage.save_data(user_id, 'recently_played', play_history.load_recent(user_id, 50),
+                      metadata={'projection': PROJECTION_VERSION})
+    return new_plays
+
+def sync_user_data(user_id: str, force: bool = False, sp: Optional[spotipy.Spotify] = None,
+                   on_progress=None, time_ranges: Optional[List[str]] = None) -> Dict[str, Any]:
     """Sync all user data from Spotify API to JSON storage.
     
+    Every data type and time range is synced as an independent job, so a
+    full sync takes about as long as its slowest job.
+    
     Args:
         user_id: The user's Spotify ID
         force: Force sync even if data is fresh
+        sp: Spotify client to use (defaults to the client for the current session)
+        on_progress: Optional callback invoked with each job state change
+        time_ranges: Time ranges to sync (defaults to all three)
     
     Returns:
         Dictionary with sync status and statistics
     """
-    sp = get_spotify_client()
+    sp = sp or get_spotify_client()
     if not sp:
         return {'error': 'Not authenticated'}
     
@@ -317,88 +539,105 @@ def sync_user_data(user_id: str, force: bool = False) -> Dict[str, Any]:
         'forced': force
     }
     
-    time_ranges = ['short_term', 'medium_term', 'long_term']
-    
     try:
-        # Sync user profile
-        user_data = sp.current_user()
-        storage.save_user_profile(user_id, user_data)
-        
-        for time_range in time_ranges:
-            # Check if sync is needed
-            tracks_stale = force or storage.is_data_stale(user_id, 'top_tracks', time_range, days=7)
-            artists_stale = force or storage.is_data_stale(user_id, 'top_artists', time_range, days=7)
-            
-            if tracks_stale:
-                # Sync top tracks
-                all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=time_range)
-                storage.save_top_tracks(user_id, all_tracks, time_range)
-                sync_stats['tracks_synced'] += len(all_tracks)
+        jobs = plan_sync_jobs(sp, user_id, force=force, time_ranges=time_ranges)
+        outcomes = run_sync_jobs(jobs, on_progress=on_progress)
+        
+        failed = [o for o in outcomes if o['status'] == 'failed' and o['required']]
+        if failed:
+            return {'error': f"Storage error: {failed[0]['error']}"}
+        
+        for outcome in outcomes:
+            if outcome['status'] != 'done':
+                continue
+            name = outcome['name']
+            if name.startswith('top_tracks:'):
+                sync_stats['tracks_synced'] += outcome['result']
+            elif name.startswith('top_artists:'):
+                sync_stats['artists_synced'] += outcome['result']
+            elif name in ('recently_played', 'followed_artists') and outcome['result'] is not None:
+                sync_stats[name] = outcome['result']
             
-            if artists_stale:
-                # Sync top artists
-                all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=time_range)
-                storage.save_top_artists(user_id, all_artists, time_range)
-                sync_stats['artists_synced'] += len(all_artists)
-            
-            if tracks_stale or artists_stale:
-                sync_stats['time_ranges'].append(time_range)
-        
-        # Sync recently played tracks
-        try:
-            recent_items = sp.current_user_recently_played(limit=50)
-            if recent_items and 'items' in recent_items:
-                storage.save_data(user_id, 'recently_played', recent_items['items'])
-                sync_stats['recently_played'] = len(recent_items['items'])
-        except Exception as e:
-            print(f"Error syncing recently played: {e}")
-        
-        # Sync followed artists
-        try:
-            followed = sp.current_user_followed_artists(limit=50)
-            if followed and 'artists' in followed:
-                storage.save_data(user_id, 'followed_artists', followed['artists']['items'])
-                sync_stats['followed_artists'] = len(followed['artists']['items'])
-        except Exception as e:
-            print(f"Error syncing followed artists: {e}")
+            if outcome['time_range'] and outcome['time_range'] not in sync_stats['time_ranges']:
+                sync_stats['time_ranges'].append(outcome['time_range'])
         
+        sync_stats['time_ranges'].sort(key=['short_term', 'medium_term', 'long_term'].index)
+        sync_stats['job_timings'] = {o['name']: o['duration_ms'] for o in outcomes}
         sync_stats['sync_time'] = datetime.now().isoformat()
         return sync_stats
         
     except Exception as e:
         return {'error': f'Storage error: {str(e)}'}
 
+def enqueue_background_sync(user_id: str, force: bool = False,
+                            time_ranges: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Queue a sync for the current user on the background workers.
+    
+    The Spotify client is captured from the current session so the worker
+    can run after the request has returned.
+    
+    Returns:
+        The job state, or None if the user is not authenticated
+    """
+    sp = get_spotify_client()
+    if not sp:
+        return None
+    
+    job, created = sync_queue.enqueue(
+        user_id,
+        lambda on_progress: sync_user_data(user_id, force=force, sp=sp, on_progress=on_progress,
+                                           time_ranges=time_ranges)
+    )
+    if created:
+        print(f"Queued background sync for {user_id}")
+    return job
+
+def _data_needs_sync(user_id: str, storage_type: str, time_range: str) -> bool:
+    """Check if stored top items are missing or stale."""
+    return storage.is_data_stale(user_id, storage_type, time_range, days=7)
+
 def ensure_data_freshness(user_id: str, data_type: str, time_range: str) -> bool:
     """Ensure data is fresh, syncing if necessary.
     
+    Concurrent callers for the same (user, data_type, time_range) share a
+    single in-flight fetch instead of each syncing the same data.
+    
     Returns:
         True if data is available (either was fresh or successfully synced)
     """
     storage_type = 'top_tracks' if data_type == 'tracks' else 'top_artists'
     
     # Check if data exists at all or is stale
-    existing_data = storage.load_top_tracks(user_id, time_range) if data_type == 'tracks' else storage.load_top_artists(user_id, time_range)
+    if not _data_needs_sync(user_id, storage_type, time_range):
+        return True
     
-    if existing_data is None or storage.is_data_stale(user_id, storage_type, time_range, days=7):
-        sp = get_spotify_client()
-        if not sp:
-            return False
-        
-        try:
-            print(f"Syncing {data_type} for time_range: {time_range}")
-            if data_type == 'tracks':
-                all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=time_range)
-                storage.save_top_tracks(user_id, all_tracks, time_range)
-                print(f"Saved {len(all_tracks)} tracks for {time_range}")
-            elif data_type == 'artists':
-                all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=time_range)
-                storage.save_top_artists(user_id, all_artists, time_range)
-                print(f"Saved {len(all_artists)} artists for {time_range}")
+    sp = get_spotify_client()
+    if not sp:
+        return False
+    
+    def sync_if_stale():
+        # Another caller may have synced while we waited for the lock
+        if not _data_needs_sync(user_id, storage_type, time_range):
             return True
-        except Exception as e:
-            print(f"Error syncing {data_type} for {time_range}: {e}")
-            return False
-    return True
+        
+        print(f"Syncing {data_type} for time_range: {time_range}")
+        if data_type == 'tracks':
+            all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=time_range)
+            if not save_top_items(user_id, 'tracks', all_tracks, time_range):
+                return False
+            print(f"Saved {len(all_tracks)} tracks for {time_range}")
+        elif data_type == 'artists':
+            all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=time_range)
+            if not save_top_items(user_id, 'artists', all_artists, time_range):
+                return False
+            print(f"Saved {len(all_artists)} artists for {time_range}")
+        return True
+    
+    try:
+        return freshness_flight.do(f"{user_id}:{storage_type}:{time_range}", sync_if_stale)
+    except Exception as e:
+        print(f"Error syncing {data_type} for {time_range}: {e}")
+        return False
 
 @app.route('/')
 def index():
@@ -1034,7 +1273,7 @@ def callback():
             if user_id != 'unknown':
                 # Check if this is a new user or data is stale
                 if storage.is_data_stale(user_id, 'top_tracks', 'medium_term', days=1):
-                    sync_user_data(user_id, force=False)
+                    enqueue_background_sync(user_id)
         except:
             pass  # Don't block login if sync fails
         
@@ -1056,6 +1295,11 @@ def logout():
     except:
         pass
     
+    token_info = session.get('token_info')
+    for token in (token_info, token_manager.forget(token_info)):
+        invalidate_identity(token)
+        if token:
+            client_registry.evict(token.get('access_token'))
     session.clear()
     return jsonify({'message': 'Logged out successfully'})
 
@@ -1103,14 +1347,30 @@ def sync_data():
                 'forced': force
             }
             
-            # Force sync for the specific range
-            all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=specific_range)
-            storage.save_top_tracks(user_id, all_tracks, specific_range)
-            sync_stats['tracks_synced'] = len(all_tracks)
+            # Force sync for the specific range, tracks and artists in parallel
+            def sync_tracks():
+                all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range=specific_range)
+                if not save_top_items(user_id, 'tracks', all_tracks, specific_range):
+                    raise RuntimeError(f"Failed to save top tracks for {specific_range}")
+                return len(all_tracks)
+            
+            def sync_artists():
+                all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=specific_range)
+                if not save_top_items(user_id, 'artists', all_artists, specific_range):
+                    raise RuntimeError(f"Failed to save top artists for {specific_range}")
+                return len(all_artists)
             
-            all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range=specific_range)
-            storage.save_top_artists(user_id, all_artists, specific_range)
-            sync_stats['artists_synced'] = len(all_artists)
+            outcomes = run_sync_jobs([
+                SyncJob(f'top_tracks:{specific_range}', sync_tracks, specific_range),
+                SyncJob(f'top_artists:{specific_range}', sync_artists, specific_range)
+            ])
+            for outcome in outcomes:
+                if outcome['status'] == 'failed':
+                    return jsonify({'error': outcome['error']}), 500
+            
+            sync_stats['tracks_synced'] = outcomes[0]['result']
+            sync_stats['artists_synced'] = outcomes[1]['result']
+            sync_stats['job_timings'] = {o['name']: o['duration_ms'] for o in outcomes}
             
             sync_stats['sync_time'] = datetime.now().isoformat()
             
@@ -1150,7 +1410,8 @@ def sync_status():
             'user_id': user_id,
             'files': files,
             'storage_stats': stats,
-            'refresh_threshold_days': 7
+            'refresh_threshold_days': 7,
+            'sync_job': sync_queue.get_status(user_id)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1191,6 +1452,22 @@ def debug_check_data():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/debug/cache-stats')
+def debug_cache_stats():
+    """Debug endpoint with hit rates of the Spotify API caching layers."""
+    return jsonify({
+        'http_cache': response_cache.get_stats(),
+        'audio_features_store': audio_features_store.get_stats(),
+        'audio_features_batcher': audio_features_batcher.get_stats(),
+        'scheduler': scheduler.get_stats(),
+        'clients': client_registry.stats(),
+        'tokens': token_manager.get_stats(),
+        'storage_reads': storage.read_cache.get_stats(),
+        'entities': storage.entity_store.get_stats() if storage.STORAGE_ENTITY_STORE else None,
+        'write_behind': storage.write_behind.get_stats() if storage.STORAGE_WRITE_BEHIND else None,
+        'freshness_sync': dict(freshness_flight.stats)
+    })
+
 @app.route('/api/user')
 def get_user():
     """Get current user profile."""
@@ -1199,20 +1476,18 @@ def get_user():
         return jsonify({'error': 'Not authenticated'}), 401
     
     try:
-        user = sp.current_user()
+        user = get_current_user_profile()
+        if not user:
+            return jsonify({'error': 'Failed to load user profile'}), 500
         user_id = user.get('id')
         
         # Save user profile to storage
         storage.save_user_profile(user_id, user)
         
-        # Check if this is first time or data is stale - trigger sync
+        # Check if this is first time or data is stale - sync medium_term in the background
         if storage.is_data_stale(user_id, 'top_tracks', 'medium_term', days=1):
-            # Do a quick sync for medium_term only on first access
             try:
-                all_tracks = fetch_all_spotify_items(sp, sp.current_user_top_tracks, time_range='medium_term')
-                all_artists = fetch_all_spotify_items(sp, sp.current_user_top_artists, time_range='medium_term')
-                storage.save_top_tracks(user_id, all_tracks, 'medium_term')
-                storage.save_top_artists(user_id, all_artists, 'medium_term')
+                enqueue_background_sync(user_id, force=True, time_ranges=['medium_term'])
             except:
                 pass  # Don't fail the user endpoint if sync fails
         
@@ -1435,6 +1710,20 @@ def spotify_wrapped(year):
         all_tracks = storage.load_top_tracks(user_id, time_range) or []
         all_artists = storage.load_top_artists(user_id, time_range) or []
         
+        # Past years use the top lists as they were at the end of that year, if we have them
+        data_source = {'type': 'current'}
+        if year < current_year:
+            year_end = datetime(year, 12, 31, 23, 59, 59)
+            past_tracks = snapshot_history.get_snapshot(user_id, 'top_tracks', time_range, at=year_end)
+            past_artists = snapshot_history.get_snapshot(user_id, 'top_artists', time_range, at=year_end)
+            if past_tracks and past_artists:
+                all_tracks, all_artists = past_tracks['items'], past_artists['items']
+                data_source = {
+                    'type': 'snapshot',
+                    'tracks_taken_at': past_tracks['taken_at'],
+                    'artists_taken_at': past_artists['taken_at']
+                }
+        
         # Get top 10 for display
         top_10_tracks = all_tracks[:10]
         top_10_artists = all_artists[:10]
@@ -1535,6 +1824,7 @@ def spotify_wrapped(year):
             'top_artist_status': top_artist_status,
             'top_song': formatted_tracks[0] if formatted_tracks else None,
             'top_artist': formatted_artists[0] if formatted_artists else None,
+            'data_source': data_source,
             'generated_at': datetime.now().isoformat()
         }
         
@@ -1698,7 +1988,7 @@ def generate_wrapped_card():
     
     try:
         # Get user data
-        user = sp.current_user()
+        user = get_current_user_profile() or {}
         user_name = user.get('display_name', 'Spotify User')
         
         # Get stats
@@ -1856,25 +2146,22 @@ def get_recently_played():
     try:
         user_id = get_user_id()
         
-        # Load from storage first
-        recent = storage.load_data(user_id, 'recently_played')
-        
-        if not recent or storage.is_data_stale(user_id, 'recently_played', None, days=1):
-            # Fetch fresh data
-            recent_items = sp.current_user_recently_played(limit=50)
-            if recent_items and 'items' in recent_items:
-                storage.save_data(user_id, 'recently_played', recent_items['items'])
-                recent = recent_items['items']
+        if storage.is_data_stale(user_id, 'recently_played', None, days=1):
+            # Fetch only plays newer than the stored history
+            sync_play_history(sp, user_id)
         
-        if isinstance(recent, dict) and 'data' in recent:
-            recent = recent['data']
+        recent = play_history.load_recent(user_id, 50)
         
-        # Analyze listening patterns
-        patterns = analyze_listening_patterns(recent) if recent else {}
+        # Analyze listening patterns over the last few months of history
+        since = datetime.now(timezone.utc) - timedelta(days=play_history.PATTERN_WINDOW_DAYS)
+        history = play_history.load_plays(user_id, since=since)
+        patterns = analyze_listening_patterns(history) if history else {}
         
         return jsonify({
             'items': recent,
-            'patterns': patterns
+            'patterns': patterns,
+            'history_size': len(history),
+            'history_window_days': play_history.PATTERN_WINDOW_DAYS
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1937,7 +2224,7 @@ def create_playlist():
         
         if playlist_type == 'top_tracks':
             # Create playlist from top tracks
-            tracks = storage.load_top_tracks(user_id, time_range)
+            tracks = storage.load_top_tracks(user_id, time_range, limit=50)
             
             if not tracks:
                 return jsonify({'error': 'No tracks found'}), 404
@@ -2045,7 +2332,7 @@ def create_mood_playlist(sp, tracks, mood):
 def create_discovery_playlist(sp, user_id, data):
     """Create a discovery playlist based on recommendations."""
     # Get top tracks and artists for seeds
-    tracks = storage.load_top_tracks(user_id, 'short_term') or []
+    tracks = storage.load_top_tracks(user_id, 'short_term', limit=2) or []
     artists = storage.load_top_artists(user_id, 'short_term') or []
     
     if not tracks and not artists:
@@ -2109,7 +2396,7 @@ def get_recommendations():
         time_range = request.args.get('time_range', 'medium_term')
         
         # Get top items for seeds
-        tracks = storage.load_top_tracks(user_id, time_range) or []
+        tracks = storage.load_top_tracks(user_id, time_range, limit=2) or []
         artists = storage.load_top_artists(user_id, time_range) or []
         
         if not tracks and not artists:
@@ -2205,9 +2492,19 @@ def get_music_evolution():
                         'percentage': abs(change) * 100
                     }
         
+        # Recorded versions of each top list, oldest first
+        history = {
+            time_range: {
+                'tracks': snapshot_history.summarize_history(user_id, 'top_tracks', time_range, limit=24),
+                'artists': snapshot_history.summarize_history(user_id, 'top_artists', time_range, limit=24)
+            }
+            for time_range in evolution
+        }
+        
         return jsonify({
             'evolution': evolution,
-            'trends': trends
+            'trends': trends,
+            'history': history
         })
         
     except Exception as e:
@@ -2230,7 +2527,7 @@ def get_instagram_wrapped(card_type):
         time_range = request.args.get('time_range', 'long_term' if datetime.now().month >= 11 else 'medium_term')
         
         # Get user data
-        user = sp.current_user()
+        user = get_current_user_profile() or {}
         user_name = user.get('display_name', 'My')
         
         # Load data from storage
@@ -2352,7 +2649,7 @@ def download_all_instagram_cards():
         time_range = request.args.get('time_range', 'long_term' if datetime.now().month >= 11 else 'medium_term')
         
         # Get user data (similar to above)
-        user = sp.current_user()
+        user = get_current_user_profile() or {}
         user_name = user.get('display_name', 'My')
         
         tracks = storage.load_top_tracks(user_id, time_range) or []
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Persistent track-level audio features store.
+Audio features never change for a track, so they are kept in SQLite keyed
+by track ID and shared across users; only unknown IDs go to the API.
+Tracks Spotify has no features for are remembered too, but only for
+AUDIO_FEATURES_MISSING_TTL_DAYS, since features can be added later.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+import json_storage as storage
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+# How long "Spotify has no features for this track" is trusted before asking again
+AUDIO_FEATURES_MISSING_TTL_DAYS = float(os.getenv('AUDIO_FEATURES_MISSING_TTL_DAYS', 30))
+
+class AudioFeaturesStore:
+    """SQLite-backed map of track ID -> audio features."""
+
+    def __init__(self, db_path: Optional[str] = None, missing_ttl_days: float = AUDIO_FEATURES_MISSING_TTL_DAYS):
+        self._db_path = db_path
+        self.missing_ttl = timedelta(days=missing_ttl_days)
+        self._initialized = set()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path or os.path.join(storage.STORAGE_DIR, 'audio_features.db')
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection with WAL mode, creating the table on first use."""
+        storage.ensure_storage_dir()
+        path = self.db_path
+        if not os.path.exists(path):
+            self._initialized.discard(path)
+        conn = sqlite3.connect(path, timeout=30.0)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if path not in self._initialized:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS audio_features (
+                        track_id TEXT PRIMARY KEY,
+                        features TEXT,
+                        fetched_at TIMESTAMP
+                    )
+                ''')
+                self._initialized.add(path)
+            yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, track_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Look up stored features.
+
+        Returns:
+            Map of track ID -> features for every known ID. Tracks Spotify
+            has no features for are known too and map to None, until that
+            answer is older than the missing-features TTL.
+        """
+        ids = list(dict.fromkeys(track_ids))
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing_since = (datetime.now() - self.missing_ttl).isoformat()
+
+        if ids:
+            with self._connection() as conn:
+                for i in range(0, len(ids), _QUERY_CHUNK):
+                    chunk = ids[i:i + _QUERY_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f'SELECT track_id, features FROM audio_features WHERE track_id IN ({placeholders}) '
+                        f'AND (features IS NOT NULL OR fetched_at >= ?)',
+                        chunk + [missing_since]
+                    ).fetchall()
+                    for track_id, features in rows:
+                        found[track_id] = json.loads(features) if features else None
+
+        with self._lock:
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(ids) - len(found)
+        return found
+
+    def put_many(self, features_by_id: Dict[str, Optional[Dict[str, Any]]]):
+        """Store features; None records that Spotify has no features for a track."""
+        if not features_by_id:
+            return
+
+        now = datetime.now().isoformat()
+        rows = [(track_id, json.dumps(features) if features else None, now)
+                for track_id, features in features_by_id.items()]
+        with self._connection() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO audio_features (track_id, features, fetched_at) VALUES (?, ?, ?)',
+                rows
+            )
+            conn.commit()
+
+        with self._lock:
+            self.stats['stored'] += len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+# Process-wide store
+audio_features_store = AudioFeaturesStore()
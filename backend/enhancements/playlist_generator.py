@@ -212,7 +212,7 @@ class WrappedPlaylistGenerator:
         """Create a playlist of recommended tracks based on wrapped data."""
         
         # Get top tracks and artists
-        top_tracks = storage.load_top_tracks(self.user_id, 'short_term') or []
+        top_tracks = storage.load_top_tracks(self.user_id, 'short_term', limit=2) or []
         top_artists = storage.load_top_artists(self.user_id, 'short_term') or []
         
         if not top_tracks or not top_artists:
@@ -268,9 +268,9 @@ class WrappedPlaylistGenerator:
         }
         
         for time_range, weight in weights.items():
-            tracks = storage.load_top_tracks(self.user_id, time_range) or []
+            tracks = storage.load_top_tracks(self.user_id, time_range, limit=20) or []
             
-            for i, track in enumerate(tracks[:20]):  # Top 20 from each
+            for i, track in enumerate(tracks):  # Top 20 from each
                 track_id = track.get('id')
                 if track_id:
                     if track_id not in all_tracks:
@@ -306,8 +306,8 @@ def playlist_endpoints(app):
         
         if playlist_type == 'current':
             time_range = request.json.get('time_range', 'medium_term')
-            tracks = storage.load_top_tracks(user_id, time_range)
-            result = generator.create_wrapped_playlist(tracks[:50])
+            tracks = storage.load_top_tracks(user_id, time_range, limit=50)
+            result = generator.create_wrapped_playlist(tracks)
         
         elif playlist_type == 'genre':
             result = generator.create_genre_playlists()
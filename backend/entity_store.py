@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for projected tracks and artists.
+Each distinct entity version is kept once in SQLite, keyed by the SHA-256
+of its canonical JSON, and shared by every user and time range listing
+it. Range files then hold only the ordered list of those keys. Rows are
+reference-counted by the files that list them, and rows nobody lists any
+more are removed by collect_garbage.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+def entity_key(entity: Dict[str, Any]) -> str:
+    """Content address of an entity (stable across key order)."""
+    canonical = json.dumps(entity, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class EntityStore:
+    """SQLite map of content key -> entity, with reference counts."""
+
+    def __init__(self, db_path: Callable[[], str]):
+        self._db_path = db_path
+        self._initialized = set()
+        self._lock = threading.Lock()
+        self.stats = {'stored': 0, 'deduplicated': 0, 'resolved': 0, 'collected': 0}
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path()
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection with WAL mode, creating the table on first use."""
+        path = self.db_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            self._initialized.discard(path)
+        conn = sqlite3.connect(path, timeout=30.0)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if path not in self._initialized:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS entities (
+                        key TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        entity_id TEXT,
+                        body TEXT NOT NULL,
+                        refcount INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS entities_unreferenced ON entities (refcount) WHERE refcount <= 0')
+                self._initialized.add(path)
+            yield conn
+        finally:
+            conn.close()
+
+    def put_many(self, kind: str, entities: Iterable[Dict[str, Any]], previous_keys: Iterable[str] = ()) -> List[str]:
+        """Store entities for a file that lists them, and count its references.
+
+        Entities not stored yet are added. Keys the file didn't list before
+        (``previous_keys``) get one more reference in the same transaction,
+        so collect_garbage never sees them unreferenced. Drop references the
+        file no longer holds with add_references once it has been written.
+
+        Returns:
+            The entities' keys, in the same order
+        """
+        keys, rows = [], {}
+        for entity in entities:
+            key = entity_key(entity)
+            keys.append(key)
+            rows.setdefault(key, (key, kind, entity.get('id'), json.dumps(entity, separators=(',', ':'))))
+        added = set(rows) - set(previous_keys)
+
+        if rows:
+            with self._connection() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    'INSERT OR IGNORE INTO entities (key, kind, entity_id, body) VALUES (?, ?, ?, ?)',
+                    rows.values()
+                )
+                stored = conn.total_changes - before
+                conn.executemany('UPDATE entities SET refcount = refcount + 1 WHERE key = ?',
+                                 [(key,) for key in added])
+                conn.commit()
+            with self._lock:
+                self.stats['stored'] += stored
+                self.stats['deduplicated'] += len(rows) - stored
+        return keys
+
+    def get_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Resolve keys to entities, in order (None for unknown keys)."""
+        unique = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        if unique:
+            with self._connection() as conn:
+                for i in range(0, len(unique), _QUERY_CHUNK):
+                    chunk = unique[i:i + _QUERY_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    for key, body in conn.execute(
+                            f'SELECT key, body FROM entities WHERE key IN ({placeholders})', chunk):
+                        found[key] = json.loads(body)
+        with self._lock:
+            self.stats['resolved'] += len(keys)
+        return [found.get(key) for key in keys]
+
+    def add_references(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Count one more reference to each key in ``added`` and one fewer to each in ``removed``."""
+        changes = [(1, key) for key in added] + [(-1, key) for key in removed]
+        if not changes:
+            return
+        with self._connection() as conn:
+            conn.executemany('UPDATE entities SET refcount = refcount + ? WHERE key = ?', changes)
+            conn.commit()
+
+    def set_references(self, counts: Dict[str, int]):
+        """Replace every reference count (after a full scan of the files)."""
+        with self._connection() as conn:
+            conn.execute('UPDATE entities SET refcount = 0')
+            conn.executemany('UPDATE entities SET refcount = ? WHERE key = ?',
+                             [(count, key) for key, count in counts.items()])
+            conn.commit()
+
+    def collect_garbage(self) -> int:
+        """Delete entities no file references.
+
+        Returns:
+            Number of entities removed
+        """
+        with self._connection() as conn:
+            removed = conn.execute('DELETE FROM entities WHERE refcount <= 0').rowcount
+            conn.commit()
+        with self._lock:
+            self.stats['collected'] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dedup counters and the number of stored entities."""
+        with self._lock:
+            stats = dict(self.stats)
+        with self._connection() as conn:
+            stats['entities'], stats['bytes'] = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM entities').fetchone()
+        return stats
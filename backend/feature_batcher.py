@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Cross-request micro-batcher for audio_features calls.
+Track IDs requested by concurrent callers are gathered over a short window,
+deduplicated across all callers and sent as full 100-ID calls in parallel;
+results are fanned back out to the waiting callers. Audio features don't
+depend on the user, so a chunk mixing several users' IDs is fetched with the
+client of one of its waiters, in the most urgent lane among them. If that
+call fails (an expired token, or that user's rate limit), only the IDs of
+the other waiters are retried, each with that waiter's own client.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from spotify_scheduler import current_priority, lane, submit_with_context
+
+# How long to gather IDs before dispatching a batch
+AUDIO_FEATURES_BATCH_WINDOW_MS = float(os.getenv('AUDIO_FEATURES_BATCH_WINDOW_MS', 20))
+
+# Parallel upstream calls per dispatch
+AUDIO_FEATURES_BATCH_WORKERS = int(os.getenv('AUDIO_FEATURES_BATCH_WORKERS', 4))
+
+# Spotify accepts up to 100 IDs per audio_features call
+BATCH_SIZE = 100
+
+def _owner_key(sp) -> Hashable:
+    """Key of the user a client acts for (registry clients carry one)."""
+    return getattr(sp, 'user_key', None) or id(sp)
+
+class AudioFeaturesBatcher:
+    """Gathers audio feature lookups from many callers into shared API calls."""
+
+    def __init__(self, window_ms: float = AUDIO_FEATURES_BATCH_WINDOW_MS,
+                 max_workers: int = AUDIO_FEATURES_BATCH_WORKERS, batch_size: int = BATCH_SIZE):
+        self.window = window_ms / 1000
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='audio-features')
+        self._cond = threading.Condition()
+        self._queued = OrderedDict()  # track ID -> most urgent lane of its callers
+        self._first_queued_at = None
+        self._futures: Dict[str, Future] = {}  # track ID -> pending result (queued or in flight)
+        self._waiters: Dict[str, 'OrderedDict[Hashable, Any]'] = {}  # track ID -> owner -> client
+        self._dispatcher = None
+        self.stats = {
+            'ids_requested': 0,
+            'ids_shared': 0,
+            'upstream_calls': 0,
+            'upstream_ids': 0,
+            'retried_calls': 0
+        }
+
+    def fetch(self, sp, track_ids: List[str], timeout: Optional[float] = 30) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get audio features for track IDs, sharing calls with concurrent callers.
+
+        Returns:
+            Map of track ID -> features (None when Spotify has none). IDs
+            whose upstream call failed are left out.
+        """
+        owner = _owner_key(sp)
+        priority = current_priority()
+        waiting = {}
+        with self._cond:
+            for track_id in dict.fromkeys(track_ids):
+                self.stats['ids_requested'] += 1
+                future = self._futures.get(track_id)
+                if future is not None:
+                    self.stats['ids_shared'] += 1
+                    if track_id in self._queued:
+                        # An interactive caller lifts a shared ID into its lane
+                        self._queued[track_id] = min(self._queued[track_id], priority)
+                else:
+                    future = self._futures[track_id] = Future()
+                    self._queued[track_id] = priority
+                    if self._first_queued_at is None:
+                        self._first_queued_at = time.monotonic()
+                self._waiters.setdefault(track_id, OrderedDict()).setdefault(owner, sp)
+                waiting[track_id] = future
+
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name='audio-features-batcher',
+                                                    daemon=True)
+                self._dispatcher.start()
+            self._cond.notify_all()
+
+        results = {}
+        for track_id, future in waiting.items():
+            try:
+                results[track_id] = future.result(timeout=timeout)
+            except Exception as e:
+                print(f"Error fetching audio features for {track_id}: {e}")
+        return results
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._queued:
+                    self._cond.wait()
+
+                # Gather until the window closes or a full batch is ready
+                while len(self._queued) < self.batch_size:
+                    remaining = self._first_queued_at + self.window - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+                queued = list(self._queued.items())
+                self._queued.clear()
+                self._first_queued_at = None
+
+                chunks = []
+                for i in range(0, len(queued), self.batch_size):
+                    chunk = queued[i:i + self.batch_size]
+                    owner, sp = next(iter(self._waiters[chunk[0][0]].items()))
+                    chunks.append((min(priority for _, priority in chunk), owner, sp,
+                                   [track_id for track_id, _ in chunk]))
+
+            for priority, owner, sp, track_ids in chunks:
+                with lane(priority):
+                    submit_with_context(self._executor, self._call_upstream, owner, sp, track_ids)
+
+    def _request(self, sp, track_ids: List[str]) -> Tuple[Dict[str, Any], Optional[Exception]]:
+        with self._cond:
+            self.stats['upstream_calls'] += 1
+            self.stats['upstream_ids'] += len(track_ids)
+        try:
+            features = sp.audio_features(track_ids) or []
+            return {f['id']: f for f in features if f}, None
+        except Exception as e:
+            return {}, e
+
+    def _call_upstream(self, owner: Hashable, sp, track_ids: List[str]):
+        by_id, error = self._request(sp, track_ids)
+        unresolved = list(track_ids) if error is not None else []
+        tried = {owner}
+
+        # Retry what's left with the client of a waiter not tried yet, one user at a time
+        while unresolved:
+            with self._cond:
+                retry = next(((waiter, client) for track_id in unresolved
+                              for waiter, client in self._waiters[track_id].items() if waiter not in tried), None)
+                if retry is None:
+                    break
+                waiter, client = retry
+                retry_ids = [track_id for track_id in unresolved if waiter in self._waiters[track_id]]
+                self.stats['retried_calls'] += 1
+            tried.add(waiter)
+            fetched, retry_error = self._request(client, retry_ids)
+            if retry_error is None:
+                by_id.update(fetched)
+                unresolved = [track_id for track_id in unresolved if track_id not in retry_ids]
+
+        with self._cond:
+            futures = [(track_id, self._futures.pop(track_id)) for track_id in track_ids]
+            for track_id in track_ids:
+                del self._waiters[track_id]
+
+        failed = set(unresolved)
+        for track_id, future in futures:
+            if track_id in failed:
+                future.set_exception(error)
+            else:
+                future.set_result(by_id.get(track_id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._futures)
+        stats['avg_batch_size'] = round(stats['upstream_ids'] / stats['upstream_calls'], 1) \
+            if stats['upstream_calls'] else 0.0
+        return stats
+
+# Process-wide batcher
+audio_features_batcher = AudioFeaturesBatcher()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+ETag / conditional-request cache for Spotify Web API responses.
+Sits under spotipy as a requests.Session: GET responses that carry an ETag
+are kept per user and URL, the next request sends If-None-Match, and a 304
+is answered from the cached body.
+"""
+
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Memory budget for cached response bodies
+SPOTIFY_ETAG_CACHE_MB = float(os.getenv('SPOTIFY_ETAG_CACHE_MB', 64))
+
+# Cache partition for the running call (set per call by the Spotify client)
+_scope = contextvars.ContextVar('http_cache_scope', default=None)
+
+# Change tracker for the running sync job (see ResponseCache.track_changes)
+_tracker = contextvars.ContextVar('http_cache_tracker', default=None)
+
+@contextmanager
+def cache_scope(scope: Optional[str]):
+    """Partition cached responses by user; calls without a scope aren't cached."""
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+class ChangeTracker:
+    """Counts fresh vs. revalidated responses seen while it is active."""
+
+    def __init__(self):
+        self.fetched = 0  # Full responses (new or changed content)
+        self.revalidated = 0  # 304 responses served from the cache
+        self._lock = threading.Lock()
+
+    def record(self, revalidated: bool):
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.fetched += 1
+
+    @property
+    def unchanged(self) -> bool:
+        """True if every response was a 304, i.e. nothing changed upstream."""
+        return self.revalidated > 0 and self.fetched == 0
+
+class ResponseCache:
+    """LRU store of (etag, body) per (scope, url) within a memory budget."""
+
+    def __init__(self, max_bytes: int = int(SPOTIFY_ETAG_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (scope, url) -> (etag, body, content_type)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'conditional_requests': 0,
+            'hits': 0,
+            'misses': 0,
+            'bytes_saved': 0
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag: str, body: bytes, content_type: Optional[str]):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (etag, body, content_type)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
+
+    def record(self, conditional: bool, hit: bool, bytes_saved: int = 0):
+        with self._lock:
+            self.stats['requests'] += 1
+            if conditional:
+                self.stats['conditional_requests'] += 1
+            if hit:
+                self.stats['hits'] += 1
+                self.stats['bytes_saved'] += bytes_saved
+            else:
+                self.stats['misses'] += 1
+
+    @contextmanager
+    def track_changes(self):
+        """Track whether the responses fetched inside the block changed.
+
+        Worker threads see the tracker as long as they are started with
+        spotify_scheduler.submit_with_context.
+        """
+        tracker = ChangeTracker()
+        token = _tracker.set(tracker)
+        try:
+            yield tracker
+        finally:
+            _tracker.reset(token)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics including hit rate and bytes saved."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['stored_bytes'] = self._size
+        stats['hit_rate'] = round(stats['hits'] / stats['requests'], 3) if stats['requests'] else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+# Process-wide response cache
+response_cache = ResponseCache()
+
+class CachingSession(requests.Session):
+    """requests.Session that revalidates cached GET responses with If-None-Match."""
+
+    def __init__(self, cache: ResponseCache = None):
+        super().__init__()
+        self.cache = cache or response_cache
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        scope = _scope.get()
+        if method.upper() != 'GET' or scope is None:
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        key = (scope, full_url)
+        cached = self.cache.get(key)
+
+        headers = dict(headers or {})
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        response = super().request(method, url, params=params, headers=headers, **kwargs)
+        tracker = _tracker.get()
+
+        if response.status_code == 304 and cached:
+            etag, body, content_type = cached
+            self.cache.record(conditional=True, hit=True, bytes_saved=len(body))
+            if tracker:
+                tracker.record(revalidated=True)
+            return _cached_response(response, etag, body, content_type)
+
+        self.cache.record(conditional=bool(cached), hit=False)
+        if response.status_code == 200:
+            if tracker:
+                tracker.record(revalidated=False)
+            etag = response.headers.get('ETag')
+            if etag:
+                self.cache.put(key, etag, response.content, response.headers.get('Content-Type'))
+        return response
+
+def _cached_response(not_modified: requests.Response, etag: str, body: bytes,
+                     content_type: Optional[str]) -> requests.Response:
+    """Turn a 304 into a 200 carrying the cached body, as spotipy expects."""
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response._content = body
+    response.headers = CaseInsensitiveDict({
+        'Content-Type': content_type or 'application/json',
+        'ETag': etag,
+        'X-Cache': 'revalidated'
+    })
+    response.url = not_modified.url
+    response.request = not_modified.request
+    response.encoding = 'utf-8'
+    return response
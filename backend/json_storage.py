@@ -6,26 +6,112 @@ Stores API responses as JSON files with metadata.
 
 import json
 import os
+import threading
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple, Callable
+import functools
 import hashlib
 
+import storage_codecs
+from storage_cache import FrozenList, freeze, read_cache, thaw
+from storage_index import StorageIndex
+from storage_writer import WriteBehindWriter
+from entity_store import EntityStore
+from projections import PROJECTION_VERSION, project_artists, project_tracks
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not on Windows; writers are then only serialized within a process
+
 # Storage directory
 STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 
+# Subdirectory of STORAGE_DIR holding the hash-sharded user directories
+SHARDS_DIR = '_shards'
+
+# Subdirectory of STORAGE_DIR holding the cross-process writer lock files
+LOCKS_DIR = '_locks'
+
+# Set to 1 to keep top tracks/artists once in data/entities.db, shared across
+# users and ranges, with range files holding only their ordered keys
+STORAGE_ENTITY_STORE = os.getenv('STORAGE_ENTITY_STORE', '0') == '1'
+
+# Set to 0 to skip fsync on writes (faster, but a crash can lose the latest write)
+STORAGE_FSYNC = os.getenv('STORAGE_FSYNC', '1') != '0'
+
+# Set to 1 to write saves from a background thread (see storage_writer.py)
+STORAGE_WRITE_BEHIND = os.getenv('STORAGE_WRITE_BEHIND', '0') == '1'
+
+# Files that can wait in the write-behind queue before saves block
+STORAGE_WRITE_BEHIND_MAX_PENDING = int(os.getenv('STORAGE_WRITE_BEHIND_MAX_PENDING', 256))
+
+# How long the writer collects saves into one batch before writing them
+STORAGE_WRITE_BEHIND_DELAY_MS = int(os.getenv('STORAGE_WRITE_BEHIND_DELAY_MS', 50))
+
 def ensure_storage_dir():
     """Ensure the storage directory exists."""
     if not os.path.exists(STORAGE_DIR):
         os.makedirs(STORAGE_DIR)
         print(f"Created storage directory: {STORAGE_DIR}")
 
+def get_shard_dir(user_id: str) -> str:
+    """Get a user's directory in the sharded layout: data/_shards/ab/cd/<user_id>."""
+    digest = hashlib.sha256(user_id.encode('utf-8')).hexdigest()
+    return os.path.join(STORAGE_DIR, SHARDS_DIR, digest[:2], digest[2:4], user_id)
+
+def get_legacy_user_dir(user_id: str) -> str:
+    """Get a user's directory in the original flat layout: data/<user_id>."""
+    return os.path.join(STORAGE_DIR, user_id)
+
 def get_user_dir(user_id: str) -> str:
-    """Get the directory path for a specific user."""
-    user_dir = os.path.join(STORAGE_DIR, user_id)
-    if not os.path.exists(user_dir):
-        os.makedirs(user_dir)
+    """Get the directory path for a specific user.
+    
+    New users go in the sharded layout; users not yet moved by
+    scripts/utils/migrate_storage_layout.py keep using their flat directory.
+    """
+    user_dir = get_shard_dir(user_id)
+    if os.path.isdir(user_dir):
+        return user_dir
+    legacy_dir = get_legacy_user_dir(user_id)
+    if os.path.isdir(legacy_dir):
+        return legacy_dir
+    os.makedirs(user_dir, exist_ok=True)
     return user_dir
 
+def iter_user_dirs() -> Iterator[Tuple[str, str]]:
+    """Yield (user_id, directory) for every stored user, in either layout."""
+    if not os.path.isdir(STORAGE_DIR):
+        return
+    shards_root = os.path.join(STORAGE_DIR, SHARDS_DIR)
+    if os.path.isdir(shards_root):
+        with os.scandir(shards_root) as level_1:
+            for shard_1 in level_1:
+                if not shard_1.is_dir():
+                    continue
+                with os.scandir(shard_1.path) as level_2:
+                    for shard_2 in level_2:
+                        if not shard_2.is_dir():
+                            continue
+                        with os.scandir(shard_2.path) as users:
+                            for entry in users:
+                                if entry.is_dir():
+                                    yield entry.name, entry.path
+    
+    with os.scandir(STORAGE_DIR) as entries:
+        for entry in entries:
+            # Migrated users leave a symlink behind; they were listed above
+            if entry.name not in (SHARDS_DIR, LOCKS_DIR) and entry.is_dir(follow_symlinks=False):
+                yield entry.name, entry.path
+
+def iter_data_files(user_dir: str) -> Iterator[os.DirEntry]:
+    """Yield the data files in a user directory (not the manifest or lock files)."""
+    with os.scandir(user_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') and entry.name != MANIFEST_FILE and entry.is_file():
+                yield entry
+
 def get_file_path(user_id: str, data_type: str, time_range: Optional[str] = None) -> str:
     """Get the file path for a specific data type."""
     user_dir = get_user_dir(user_id)
@@ -35,61 +121,552 @@ def get_file_path(user_id: str, data_type: str, time_range: Optional[str] = None
         filename = f"{data_type}.json"
     return os.path.join(user_dir, filename)
 
-def save_data(user_id: str, data_type: str, data: Any, time_range: Optional[str] = None) -> bool:
-    """Save data to a JSON file with metadata."""
-    ensure_storage_dir()
+_path_locks: Dict[str, List[Any]] = {}  # path -> [lock, threads holding or waiting for it]
+_path_locks_guard = threading.Lock()
+_held_locks = threading.local()
+
+def get_lock_path(path: str) -> str:
+    """Get the lock file guarding a storage file (kept out of the user directories)."""
+    digest = hashlib.sha1(path.encode()).hexdigest()
+    lock_dir = os.path.join(STORAGE_DIR, LOCKS_DIR, digest[:2])
+    os.makedirs(lock_dir, exist_ok=True)
+    return os.path.join(lock_dir, f"{digest}.lock")
+
+@contextmanager
+def key_lock(path: str):
+    """Hold the writer lock for a storage file.
+    
+    Writers of the same file are serialized across threads and, through an
+    advisory lock on its file in data/_locks, across processes (e.g. several
+    gunicorn workers). Readers never take it: writes go through atomic_write,
+    so a reader always sees the last complete version.
+    """
+    # Old-layout paths are symlinks into the shards; lock the real file
+    path = os.path.realpath(path)
+    held = _held_locks.__dict__.setdefault('paths', set())
+    if path in held:
+        yield  # Re-entered by the thread that holds it
+        return
     
+    # Thread locks live only while some thread holds or waits for them
+    with _path_locks_guard:
+        entry = _path_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
     try:
-        file_path = get_file_path(user_id, data_type, time_range)
+        with entry[0]:
+            held.add(path)
+            try:
+                if fcntl is None:
+                    yield
+                    return
+                with open(get_lock_path(path), 'a') as lock_file:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                held.discard(path)
+    finally:
+        with _path_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _path_locks[path]
+
+def _temp_path(path: str) -> str:
+    # Unique per writer, so concurrent writers never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+_sync_group = threading.local()
+
+def _fsync_dir(path: str):
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+@contextmanager
+def grouped_fsync():
+    """Defer the directory fsyncs of files committed by this thread to the end of the block.
+    
+    Each file is still fsynced before it is moved into place, so a crash
+    never leaves a renamed but unwritten file; only the fsyncs that persist
+    the renames are issued once per directory instead of once per write.
+    """
+    if getattr(_sync_group, 'paths', None) is not None:
+        yield  # Already grouped by an outer block
+        return
+    _sync_group.paths = paths = []
+    try:
+        yield
+    finally:
+        _sync_group.paths = None
+        if STORAGE_FSYNC:
+            for directory in dict.fromkeys(os.path.dirname(path) for path in paths):
+                if os.path.isdir(directory):
+                    _fsync_dir(directory)
+
+def _commit_file(tmp_path: str, path: str, f):
+    """Flush ``f`` (the open temp file) to disk and move it over ``path``."""
+    f.flush()
+    if STORAGE_FSYNC:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    group = getattr(_sync_group, 'paths', None)
+    if group is not None:
+        group.append(path)
+    elif STORAGE_FSYNC:
+        # Persist the rename itself
+        _fsync_dir(os.path.dirname(path))
+
+def atomic_write(path: str, data: bytes):
+    """Replace a file's contents atomically (temp file, fsync, rename)."""
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            _commit_file(tmp_path, path, f)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    read_cache.invalidate(path)
+
+# Per-user index of stored files (see get_manifest_entry)
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Index of every user's files with storage totals (see get_storage_stats)
+STORAGE_INDEX_FILE = 'storage_index.db'
+storage_index = StorageIndex(lambda: os.path.join(STORAGE_DIR, STORAGE_INDEX_FILE))
+
+# Shared track/artist store for entity-backed range files (see STORAGE_ENTITY_STORE)
+ENTITY_STORE_FILE = 'entities.db'
+entity_store = EntityStore(lambda: os.path.join(STORAGE_DIR, ENTITY_STORE_FILE))
+
+def _write_batch(writes: List[Any]):
+    with grouped_fsync():
+        for write in writes:
+            write()
+
+# Background writer for saves (see STORAGE_WRITE_BEHIND)
+write_behind = WriteBehindWriter(_write_batch, STORAGE_WRITE_BEHIND_MAX_PENDING, STORAGE_WRITE_BEHIND_DELAY_MS / 1000)
+
+TIME_RANGES = ('short_term', 'medium_term', 'long_term')
+
+def _manifest_key(data_type: str, time_range: Optional[str] = None) -> str:
+    return f"{data_type}_{time_range}" if time_range else data_type
+
+def _parse_file_stem(stem: str):
+    """Split a file name stem into (data_type, time_range)."""
+    for time_range in TIME_RANGES:
+        if stem.endswith('_' + time_range):
+            return stem[:-len(time_range) - 1], time_range
+    return stem, None
+
+def get_manifest_path(user_id: str) -> str:
+    return os.path.join(get_user_dir(user_id), MANIFEST_FILE)
+
+def load_manifest(user_id: str) -> Dict[str, Any]:
+    """Load the user's manifest (read-only view)."""
+    manifest = read_cache.load(get_manifest_path(user_id), storage_codecs.load_file)
+    return manifest or {'version': MANIFEST_VERSION, 'entries': {}}
+
+def _update_manifest(user_id: str, key: str, changes: Optional[Dict[str, Any]], replace: bool = True):
+    """Set (replace=True) or merge (replace=False) a manifest entry and write it atomically."""
+    path = get_manifest_path(user_id)
+    with key_lock(path):
+        manifest = thaw(load_manifest(user_id))
+        entries = manifest.setdefault('entries', {})
+        if replace or key not in entries:
+            entries[key] = changes
+        else:
+            entries[key].update(changes)
+        manifest['version'] = MANIFEST_VERSION
+        atomic_write(path, storage_codecs.CODECS['compact'].encode(manifest))
         
-        # Wrap data with metadata
-        wrapped_data = {
-            'user_id': user_id,
+        try:
+            storage_index.record(user_id, key, entries[key])
+        except Exception as e:
+            print(f"Error updating storage index: {e}")
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _record_write(user_id: str, data_type: str, time_range: Optional[str], wrapper: Dict[str, Any],
+                  item_count: Optional[int], size: int, sha256: str):
+    _update_manifest(user_id, _manifest_key(data_type, time_range), {
+        'data_type': data_type,
+        'time_range': time_range,
+        'timestamp': wrapper['timestamp'],
+        'verified_at': wrapper['timestamp'],
+        'item_count': item_count,
+        'size': size,
+        'sha256': sha256,
+        'projection': wrapper.get('projection'),
+        'entities': wrapper.get('entities')
+    })
+
+def _queued(file_path: str) -> Optional[Dict[str, Any]]:
+    """Data of a save of ``file_path`` still waiting in the write-behind queue."""
+    return write_behind.get(file_path) if STORAGE_WRITE_BEHIND else None
+
+def get_manifest_entry(user_id: str, data_type: str, time_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get the manifest entry for a stored file without reading its payload.
+    
+    Entries hold timestamp, verified_at, item_count, size, sha256 and the
+    projection version. Files written before the manifest existed are
+    indexed on first lookup. A save still in the write-behind queue is
+    described by an entry with 'pending' set (and no size or sha256 yet).
+    
+    Returns:
+        The entry, or None if the file doesn't exist
+    """
+    queued = _queued(get_file_path(user_id, data_type, time_range))
+    if queued is not None:
+        data = queued['data']
+        return {
             'data_type': data_type,
             'time_range': time_range,
-            'timestamp': datetime.now().isoformat(),
-            'data': data
+            'timestamp': queued['timestamp'],
+            'verified_at': queued['timestamp'],
+            'item_count': len(data) if isinstance(data, list) else None,
+            'size': None,
+            'sha256': None,
+            'projection': queued.get('projection'),
+            'entities': None,
+            'pending': True
         }
+    return _stored_manifest_entry(user_id, data_type, time_range)
+
+def _stored_manifest_entry(user_id: str, data_type: str, time_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Manifest entry of the file on disk, ignoring queued saves."""
+    file_path = get_file_path(user_id, data_type, time_range)
+    entry = load_manifest(user_id).get('entries', {}).get(_manifest_key(data_type, time_range))
+    if entry is not None:
+        return entry if os.path.exists(file_path) else None
+    
+    # Legacy file: parse it once and index it
+    try:
+        wrapped_data = read_cache.load(file_path, _load_storage_file)
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return None
+    if not wrapped_data:
+        return None
+    try:
+        data = wrapped_data.get('data')
+        timestamp = wrapped_data.get('timestamp') or datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
+        verified_at = max(timestamp, datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat())
+        entry = {
+            'data_type': data_type,
+            'time_range': time_range,
+            'timestamp': timestamp,
+            'verified_at': verified_at,
+            'item_count': len(data) if isinstance(data, list) else None,
+            'size': os.path.getsize(file_path),
+            'sha256': _file_sha256(file_path),
+            'projection': wrapped_data.get('projection'),
+            'entities': wrapped_data.get('entities')
+        }
+        _update_manifest(user_id, _manifest_key(data_type, time_range), entry)
+        return entry
+    except Exception as e:
+        print(f"Error indexing {file_path}: {e}")
+        return None
+
+def _wrap(user_id: str, data_type: str, data: Any, time_range: Optional[str] = None,
+          metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Wrap data with metadata."""
+    return {
+        'user_id': user_id,
+        'data_type': data_type,
+        'time_range': time_range,
+        'timestamp': datetime.now().isoformat(),
+        **(metadata or {}),
+        'data': data
+    }
+
+def _queue_write(file_path: str, wrapped_data: Dict[str, Any], persist: Callable[..., bool], *args) -> bool:
+    """Save now, or queue the save if STORAGE_WRITE_BEHIND is on.
+    
+    ``persist(*args, wrapped_data)`` does the write. Queued data is frozen,
+    so callers can't change it before it's written and reads are served
+    from the same view.
+    """
+    if not STORAGE_WRITE_BEHIND:
+        return persist(*args, wrapped_data)
+    wrapped_data = freeze(wrapped_data)
+    write_behind.submit(file_path, wrapped_data, functools.partial(persist, *args, wrapped_data))
+    return True
+
+def save_data(user_id: str, data_type: str, data: Any, time_range: Optional[str] = None,
+              metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """Save data to a storage file with metadata."""
+    ensure_storage_dir()
+    wrapped_data = _wrap(user_id, data_type, data, time_range, metadata)
+    return _queue_write(get_file_path(user_id, data_type, time_range), wrapped_data, _persist)
+
+def _persist(wrapped_data: Dict[str, Any]) -> bool:
+    """Write a wrapped storage file and record it in the manifest."""
+    user_id, data_type, time_range = wrapped_data['user_id'], wrapped_data['data_type'], wrapped_data['time_range']
+    data = wrapped_data['data']
+    try:
+        file_path = get_file_path(user_id, data_type, time_range)
         
-        # Write to file
-        with open(file_path, 'w') as f:
-            json.dump(wrapped_data, f, indent=2)
+        # Write to file with the configured codec; readers see the old or new version, never a partial one
+        encoded = storage_codecs.get_codec().encode(wrapped_data)
+        with key_lock(file_path):
+            atomic_write(file_path, encoded)
+            _record_write(user_id, data_type, time_range, wrapped_data,
+                          len(data) if isinstance(data, list) else None,
+                          len(encoded), hashlib.sha256(encoded).hexdigest())
         
         return True
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
 
+def stream_data(user_id: str, data_type: str, items: Iterable[Any], time_range: Optional[str] = None,
+                metadata: Optional[Dict[str, Any]] = None) -> int:
+    """Save a list to a storage file item by item, without holding it in memory.
+    
+    Produces the same wrapped format as save_data. The file is written to a
+    temporary path and moved into place, so readers never see a partial list.
+    Codecs that can't be streamed (msgpack) collect the list first.
+    Always written synchronously; a queued save of the same file is dropped.
+    
+    Returns:
+        Number of items written
+    """
+    ensure_storage_dir()
+    file_path = get_file_path(user_id, data_type, time_range)
+    tmp_path = _temp_path(file_path)
+    if STORAGE_WRITE_BEHIND:
+        write_behind.cancel(file_path)
+    
+    wrapper = {
+        'user_id': user_id,
+        'data_type': data_type,
+        'time_range': time_range,
+        'timestamp': datetime.now().isoformat(),
+        **(metadata or {})
+    }
+    codec = storage_codecs.get_codec()
+    
+    count = 0
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with codec.text_writer(raw) or nullcontext() as f:
+                if f is None:
+                    data = list(items)
+                    count = len(data)
+                    raw.write(codec.encode({**wrapper, 'data': data}))
+                else:
+                    f.write(json.dumps(wrapper)[:-1] + ',"data":[')
+                    for item in items:
+                        if count:
+                            f.write(',')
+                        f.write(json.dumps(item, separators=(',', ':')))
+                        count += 1
+                    f.write(']}')
+            raw.flush()
+            size, sha256 = raw.tell(), _file_sha256(tmp_path)
+            with key_lock(file_path):
+                _commit_file(tmp_path, file_path, raw)
+                read_cache.invalidate(file_path)
+                _record_write(user_id, data_type, time_range, wrapper, count, size, sha256)
+        return count
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _resolve_entities(kind: str, keys: List[str]) -> List[Dict[str, Any]]:
+    """Look up the entities an entity-backed file lists."""
+    entities = entity_store.get_many(keys)
+    missing = entities.count(None)
+    if missing:
+        print(f"Entity store is missing {missing} {kind} entities")
+    return [entity for entity in entities if entity is not None]
+
+def _load_storage_file(path: str) -> Any:
+    """Parse a storage file, resolving entity keys to the stored objects."""
+    wrapped_data = storage_codecs.load_file(path)
+    if isinstance(wrapped_data, dict) and wrapped_data.get('entities'):
+        wrapped_data['data'] = _resolve_entities(wrapped_data['entities'], wrapped_data['data'])
+    return wrapped_data
+
 def load_data(user_id: str, data_type: str, time_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    """Load data from a JSON file."""
+    """Load data from a storage file.
+    
+    Parsed files are cached until they change on disk, and the result is a
+    shared read-only view; deepcopy it before modifying.
+    """
     try:
         file_path = get_file_path(user_id, data_type, time_range)
+        queued = _queued(file_path)
+        if queued is not None:
+            return queued
         
-        if not os.path.exists(file_path):
-            return None
-        
-        with open(file_path, 'r') as f:
-            wrapped_data = json.load(f)
+        # Any codec is accepted; it is detected from the file header
+        wrapped_data = read_cache.load(file_path, _load_storage_file)
         
         return wrapped_data
     except Exception as e:
         print(f"Error loading data: {e}")
         return None
 
-def is_data_stale(user_id: str, data_type: str, time_range: Optional[str] = None, days: int = 7) -> bool:
-    """Check if data is older than specified days."""
-    wrapped_data = load_data(user_id, data_type, time_range)
+def load_items(user_id: str, data_type: str, time_range: Optional[str] = None,
+               limit: Optional[int] = None, offset: int = 0) -> Optional[List[Any]]:
+    """Load a stored list, or just items[offset:offset + limit] of it.
     
-    if not wrapped_data:
+    Slices of files written with the jsonl codec are read through its offset
+    index, decoding only the requested items; other files are loaded whole
+    (or taken from the read cache) and sliced.
+    
+    Returns:
+        Read-only list of items, or None if nothing is stored
+    """
+    if limit is None and not offset:
+        wrapped = load_data(user_id, data_type, time_range)
+        return wrapped['data'] if wrapped else None
+    
+    stop = None if limit is None else offset + limit
+    file_path = get_file_path(user_id, data_type, time_range)
+    wrapped = _queued(file_path) or read_cache.peek(file_path)
+    if wrapped is None:
+        try:
+            sliced = storage_codecs.read_items(file_path, offset, stop)
+            if sliced is not None:
+                header, items, _ = sliced
+                if header.get('entities'):
+                    items = _resolve_entities(header['entities'], items)
+                return freeze(items)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading items from {file_path}: {e}")
+        wrapped = load_data(user_id, data_type, time_range)
+    return FrozenList(wrapped['data'][offset:stop]) if wrapped else None
+
+def touch_data(user_id: str, data_type: str, time_range: Optional[str] = None) -> bool:
+    """Mark stored data as verified now without rewriting it.
+    
+    Used when a resync finds nothing changed upstream.
+    """
+    try:
+        file_path = get_file_path(user_id, data_type, time_range)
+        if _queued(file_path) is not None:
+            return True  # The queued save is newer still
+        if not os.path.exists(file_path):
+            return False
+        os.utime(file_path, None)
+        read_cache.retag(file_path)
+        
+        if get_manifest_entry(user_id, data_type, time_range) is not None:
+            _update_manifest(user_id, _manifest_key(data_type, time_range),
+                             {'verified_at': datetime.now().isoformat()}, replace=False)
+        return True
+    except Exception as e:
+        print(f"Error touching data: {e}")
+        return False
+
+def _is_entry_stale(entry: Optional[Dict[str, Any]], days: int) -> bool:
+    if not entry:
         return True  # No data exists, so it's "stale"
     
     try:
-        timestamp = datetime.fromisoformat(wrapped_data['timestamp'])
-        age = datetime.now() - timestamp
+        # touch_data() records unchanged resyncs in verified_at
+        verified = datetime.fromisoformat(max(entry['timestamp'], entry.get('verified_at') or entry['timestamp']))
+        age = datetime.now() - verified
         return age.days >= days
     except:
         return True  # If we can't determine age, consider it stale
 
+def is_data_stale(user_id: str, data_type: str, time_range: Optional[str] = None, days: int = 7) -> bool:
+    """Check if data was last synced or verified more than specified days ago.
+    
+    Answered from the manifest; the data file itself is not read.
+    """
+    return _is_entry_stale(get_manifest_entry(user_id, data_type, time_range), days)
+
+def has_current_projection(user_id: str, data_type: str, time_range: Optional[str] = None) -> bool:
+    """Check if stored data was written with the current projection schema."""
+    entry = get_manifest_entry(user_id, data_type, time_range)
+    return bool(entry) and entry.get('projection') == PROJECTION_VERSION
+
+def _referenced_keys(user_id: str, data_type: str, time_range: Optional[str] = None) -> set:
+    """Entity keys an entity-backed file currently lists (empty for plain files)."""
+    entry = _stored_manifest_entry(user_id, data_type, time_range)
+    if not entry or not entry.get('entities'):
+        return set()
+    raw = storage_codecs.load_file(get_file_path(user_id, data_type, time_range))
+    return set(raw.get('data') or [])
+
+def save_entity_list(user_id: str, data_type: str, kind: str, items: List[Dict[str, Any]],
+                     time_range: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """Save a list of tracks or artists, through the entity store if enabled.
+    
+    With STORAGE_ENTITY_STORE the objects go to the shared store and the file
+    lists their keys; reference counts follow what each file lists. Loading
+    is the same either way.
+    """
+    ensure_storage_dir()
+    wrapped_data = _wrap(user_id, data_type, items, time_range, metadata)
+    return _queue_write(get_file_path(user_id, data_type, time_range), wrapped_data, _persist_entity_list, kind)
+
+def _persist_entity_list(kind: str, wrapped_data: Dict[str, Any]) -> bool:
+    """Write a wrapped track or artist list, through the entity store if enabled."""
+    user_id, data_type, time_range = wrapped_data['user_id'], wrapped_data['data_type'], wrapped_data['time_range']
+    file_path = get_file_path(user_id, data_type, time_range)
+    try:
+        with key_lock(file_path):
+            previous = _referenced_keys(user_id, data_type, time_range)
+            if not STORAGE_ENTITY_STORE:
+                saved = _persist(wrapped_data)
+                if saved and previous:
+                    entity_store.add_references(removed=previous)
+                return saved
+            
+            keys = entity_store.put_many(kind, wrapped_data['data'], previous_keys=previous)
+            saved = _persist({**wrapped_data, 'entities': kind, 'data': keys})
+            if saved:
+                entity_store.add_references(removed=previous - set(keys))
+            else:
+                entity_store.add_references(removed=set(keys) - previous)
+            return saved
+    except Exception as e:
+        print(f"Error saving {data_type}: {e}")
+        return False
+
+def collect_entity_garbage(recount: bool = False) -> int:
+    """Remove stored entities no range file lists any more.
+    
+    Args:
+        recount: Recompute every reference count from the files first (fixes
+            counts left behind by a crash between a file write and its count
+            update; run while no syncs are writing)
+    
+    Returns:
+        Number of entities removed
+    """
+    if recount:
+        counts: Dict[str, int] = {}
+        for user_id, user_dir in iter_user_dirs():
+            for entry in iter_data_files(user_dir):
+                data_type, time_range = _parse_file_stem(entry.name[:-5])
+                for key in _referenced_keys(user_id, data_type, time_range):
+                    counts[key] = counts.get(key, 0) + 1
+        entity_store.set_references(counts)
+    return entity_store.collect_garbage()
+
 def save_user_profile(user_id: str, profile_data: Dict[str, Any]) -> bool:
     """Save user profile data."""
     return save_data(user_id, 'profile', profile_data)
@@ -100,95 +677,100 @@ def load_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     return wrapped['data'] if wrapped else None
 
 def save_top_tracks(user_id: str, tracks: List[Dict[str, Any]], time_range: str) -> bool:
-    """Save top tracks for a specific time range."""
-    return save_data(user_id, 'top_tracks', tracks, time_range)
+    """Save top tracks for a specific time range, projected to the fields in use."""
+    return save_entity_list(user_id, 'top_tracks', 'track', project_tracks(tracks), time_range,
+                            metadata={'projection': PROJECTION_VERSION})
 
-def load_top_tracks(user_id: str, time_range: str) -> Optional[List[Dict[str, Any]]]:
-    """Load top tracks for a specific time range."""
-    wrapped = load_data(user_id, 'top_tracks', time_range)
-    return wrapped['data'] if wrapped else None
+def load_top_tracks(user_id: str, time_range: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+    """Load top tracks for a specific time range (only the first ``limit`` if given)."""
+    return load_items(user_id, 'top_tracks', time_range, limit)
 
 def save_top_artists(user_id: str, artists: List[Dict[str, Any]], time_range: str) -> bool:
-    """Save top artists for a specific time range."""
-    return save_data(user_id, 'top_artists', artists, time_range)
+    """Save top artists for a specific time range, projected to the fields in use."""
+    return save_entity_list(user_id, 'top_artists', 'artist', project_artists(artists), time_range,
+                            metadata={'projection': PROJECTION_VERSION})
 
-def load_top_artists(user_id: str, time_range: str) -> Optional[List[Dict[str, Any]]]:
-    """Load top artists for a specific time range."""
-    wrapped = load_data(user_id, 'top_artists', time_range)
-    return wrapped['data'] if wrapped else None
+def load_top_artists(user_id: str, time_range: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+    """Load top artists for a specific time range (only the first ``limit`` if given)."""
+    return load_items(user_id, 'top_artists', time_range, limit)
 
-def get_storage_stats() -> Dict[str, Any]:
-    """Get statistics about the storage."""
+def rebuild_storage_index():
+    """Rebuild the storage index from every user's files and manifest."""
     ensure_storage_dir()
+    built_at = datetime.now().isoformat()
+    rows = []
     
-    stats = {
+    for user_id, user_dir in iter_user_dirs():
+        for entry in iter_data_files(user_dir):
+            data_type, time_range = _parse_file_stem(entry.name[:-5])
+            manifest_entry = get_manifest_entry(user_id, data_type, time_range)
+            if manifest_entry:
+                rows.append((user_id, entry.name[:-5], manifest_entry))
+    
+    storage_index.rebuild(rows, built_at)
+    print(f"Rebuilt storage index: {len(rows)} files")
+
+def _ensure_storage_index():
+    """Populate the index with a full scan the first time it is used."""
+    if not storage_index.is_built():
+        rebuild_storage_index()
+
+def get_storage_stats() -> Dict[str, Any]:
+    """Get statistics about the storage (from the storage index)."""
+    _ensure_storage_index()
+    totals = storage_index.get_totals()
+    
+    return {
         'storage_dir': STORAGE_DIR,
-        'users': 0,
-        'total_files': 0,
-        'total_size_mb': 0
+        'users': totals['users'],
+        'total_files': totals['files'],
+        'total_size_mb': round(totals['bytes'] / (1024 * 1024), 2)
     }
-    
-    if not os.path.exists(STORAGE_DIR):
-        return stats
-    
-    # Count users and files
-    for user_dir in os.listdir(STORAGE_DIR):
-        user_path = os.path.join(STORAGE_DIR, user_dir)
-        if os.path.isdir(user_path):
-            stats['users'] += 1
-            for file in os.listdir(user_path):
-                if file.endswith('.json'):
-                    stats['total_files'] += 1
-                    file_path = os.path.join(user_path, file)
-                    stats['total_size_mb'] += os.path.getsize(file_path) / (1024 * 1024)
-    
-    stats['total_size_mb'] = round(stats['total_size_mb'], 2)
-    return stats
 
 def clear_user_data(user_id: str) -> bool:
     """Clear all data for a specific user."""
     try:
+        if STORAGE_WRITE_BEHIND:
+            # Queued saves would recreate the directory
+            write_behind.flush()
+        
+        # Release the user's references to shared entities
+        for entry in load_manifest(user_id).get('entries', {}).values():
+            if entry.get('entities'):
+                entity_store.add_references(removed=_referenced_keys(user_id, entry['data_type'], entry['time_range']))
+        
         user_dir = get_user_dir(user_id)
         if os.path.exists(user_dir):
             import shutil
             shutil.rmtree(user_dir)
+        legacy_dir = get_legacy_user_dir(user_id)
+        if os.path.islink(legacy_dir):
+            os.remove(legacy_dir)
+        storage_index.remove(user_id)
         return True
     except Exception as e:
         print(f"Error clearing user data: {e}")
         return False
 
 def get_all_user_files(user_id: str) -> List[Dict[str, Any]]:
-    """Get information about all files for a user."""
-    user_dir = get_user_dir(user_id)
+    """Get information about all files for a user (from the storage index)."""
+    _ensure_storage_index()
     files = []
     
-    if not os.path.exists(user_dir):
-        return files
-    
-    for filename in os.listdir(user_dir):
-        if filename.endswith('.json'):
-            file_path = os.path.join(user_dir, filename)
-            
-            # Get file info
-            size_kb = os.path.getsize(file_path) / 1024
-            modified = datetime.fromtimestamp(os.path.getmtime(file_path))
-            
-            # Parse filename
-            name_parts = filename[:-5].split('_')  # Remove .json
-            data_type = name_parts[0]
-            time_range = name_parts[1] if len(name_parts) > 1 else None
-            
-            # Check if stale
-            is_stale = is_data_stale(user_id, data_type.replace('_', ' '), time_range)
-            
-            files.append({
-                'filename': filename,
-                'data_type': data_type,
-                'time_range': time_range,
-                'size_kb': round(size_kb, 2),
-                'modified': modified.isoformat(),
-                'age_days': (datetime.now() - modified).days,
-                'is_stale': is_stale
-            })
+    for entry in storage_index.get_user_files(user_id):
+        modified = datetime.fromisoformat(max(entry['timestamp'], entry['verified_at'] or entry['timestamp']))
+        
+        files.append({
+            'filename': f"{entry['file_key']}.json",
+            'data_type': entry['data_type'],
+            'time_range': entry['time_range'],
+            'size_kb': round(entry['size'] / 1024, 2),
+            'modified': modified.isoformat(),
+            'age_days': (datetime.now() - modified).days,
+            'synced_at': entry['timestamp'],
+            'item_count': entry['item_count'],
+            'sha256': entry['sha256'],
+            'is_stale': _is_entry_stale(entry, 7)
+        })
     
     return sorted(files, key=lambda x: x['modified'], reverse=True)
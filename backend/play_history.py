@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Append-only play history log.
+Plays are kept as JSON lines in one file per month under
+data/<user_id>/play_history/YYYY-MM.jsonl. Each sync asks Spotify only for
+plays newer than the last stored played_at (the `after` cursor), so history
+grows beyond the 50 plays the recently-played endpoint returns.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import json_storage as storage
+from projections import project_play
+
+HISTORY_DIR = 'play_history'
+CURSOR_FILE = 'cursor.json'
+
+# Safety cap on pages followed per sync
+MAX_PAGES = 20
+
+# How far back the recently-played endpoint analyzes listening patterns
+PATTERN_WINDOW_DAYS = int(os.getenv('PLAY_HISTORY_PATTERN_DAYS', 90))
+
+def get_history_dir(user_id: str) -> str:
+    """Get the play history directory for a user."""
+    history_dir = os.path.join(storage.get_user_dir(user_id), HISTORY_DIR)
+    os.makedirs(history_dir, exist_ok=True)
+    return history_dir
+
+def parse_played_at(played_at: str) -> datetime:
+    """Parse Spotify's played_at timestamp (UTC, ISO 8601)."""
+    return datetime.fromisoformat(played_at.replace('Z', '+00:00'))
+
+def _play_key(item: Dict[str, Any]):
+    return item.get('played_at'), (item.get('track') or {}).get('id')
+
+def _list_segments(user_id: str) -> List[str]:
+    """Month keys (YYYY-MM) of the stored segments, oldest first."""
+    return sorted(name[:-6] for name in os.listdir(get_history_dir(user_id)) if name.endswith('.jsonl'))
+
+def _read_segment(user_id: str, month: str) -> Iterator[Dict[str, Any]]:
+    path = os.path.join(get_history_dir(user_id), f'{month}.jsonl')
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                # A line without its newline is still being appended; skip it
+                if line.strip() and line.endswith('\n'):
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+def get_cursor(user_id: str) -> Optional[str]:
+    """Get the played_at of the newest stored play."""
+    path = os.path.join(get_history_dir(user_id), CURSOR_FILE)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get('last_played_at')
+    except (FileNotFoundError, ValueError):
+        pass
+
+    # Rebuild from the newest segment if the cursor file is missing
+    for month in reversed(_list_segments(user_id)):
+        plays = list(_read_segment(user_id, month))
+        if plays:
+            return max(play['played_at'] for play in plays)
+    return None
+
+def _write_cursor(user_id: str, last_played_at: str):
+    path = os.path.join(get_history_dir(user_id), CURSOR_FILE)
+    storage.atomic_write(path, json.dumps({'last_played_at': last_played_at,
+                                           'updated_at': datetime.now().isoformat()}).encode('utf-8'))
+
+def append_plays(user_id: str, items: List[Dict[str, Any]]) -> int:
+    """Append plays newer than the stored cursor, skipping duplicates.
+
+    Returns:
+        Number of plays added
+    """
+    with storage.key_lock(os.path.join(get_history_dir(user_id), CURSOR_FILE)):
+        cursor = get_cursor(user_id)
+        cursor_time = parse_played_at(cursor) if cursor else None
+
+        new_plays = {}
+        for item in items:
+            if not item.get('played_at'):
+                continue
+            if cursor_time and parse_played_at(item['played_at']) <= cursor_time:
+                continue
+            new_plays.setdefault(_play_key(item), project_play(item))
+
+        # A crash between a segment append and the cursor write leaves plays
+        # newer than the cursor already stored; don't append them twice
+        if new_plays:
+            first_month = min(played_at for played_at, _ in new_plays)[:7]
+            for month in _list_segments(user_id):
+                if month >= first_month:
+                    for play in _read_segment(user_id, month):
+                        new_plays.pop(_play_key(play), None)
+
+        if not new_plays:
+            return 0
+
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for item in sorted(new_plays.values(), key=lambda i: parse_played_at(i['played_at'])):
+            by_month.setdefault(item['played_at'][:7], []).append(item)
+
+        history_dir = get_history_dir(user_id)
+        for month, plays in by_month.items():
+            with open(os.path.join(history_dir, f'{month}.jsonl'), 'a') as f:
+                f.write(''.join(json.dumps(play, separators=(',', ':')) + '\n' for play in plays))
+
+        newest = max(new_plays.values(), key=lambda i: parse_played_at(i['played_at']))
+        _write_cursor(user_id, newest['played_at'])
+        return len(new_plays)
+
+def load_plays(user_id: str, since: Optional[datetime] = None,
+               until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Load stored plays, oldest first.
+
+    Only the monthly segments overlapping [since, until] are read. Both
+    bounds must be timezone-aware (UTC).
+    """
+    first_month = since.strftime('%Y-%m') if since else None
+    last_month = until.strftime('%Y-%m') if until else None
+
+    plays = []
+    for month in _list_segments(user_id):
+        if (first_month and month < first_month) or (last_month and month > last_month):
+            continue
+        for play in _read_segment(user_id, month):
+            played_at = parse_played_at(play['played_at'])
+            if (since and played_at < since) or (until and played_at > until):
+                continue
+            plays.append(play)
+    return plays
+
+def load_recent(user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """Load the newest plays, newest first (the recently-played API order)."""
+    recent: List[Dict[str, Any]] = []
+    for month in reversed(_list_segments(user_id)):
+        recent = list(_read_segment(user_id, month)) + recent
+        if len(recent) >= limit:
+            break
+    return list(reversed(recent[-limit:]))
+
+def fetch_new_plays(sp, user_id: str) -> int:
+    """Fetch plays newer than the stored cursor and append them to the log.
+
+    Returns:
+        Number of plays added
+    """
+    cursor = get_cursor(user_id)
+    after = int(parse_played_at(cursor).timestamp() * 1000) if cursor else None
+
+    items = []
+    for _ in range(MAX_PAGES):
+        page = sp.current_user_recently_played(limit=50, after=after) if after else \
+            sp.current_user_recently_played(limit=50)
+        if not page or not page.get('items'):
+            break
+        items.extend(page['items'])
+
+        # Without a cursor only the latest page is available
+        next_after = (page.get('cursors') or {}).get('after')
+        if not after or not page.get('next') or not next_after or int(next_after) <= after:
+            break
+        after = int(next_after)
+
+    return append_plays(user_id, items)
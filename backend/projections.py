@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compact projections of Spotify objects for storage.
+Full API objects carry available_markets lists, nested album markets,
+external URLs and several sizes of every image; the dashboard, wrapped
+stats and card generators only read a handful of fields. Objects are
+projected to those fields at ingest. A reader that needs a dropped field
+should add it here and bump PROJECTION_VERSION; stored files with an older
+version are rewritten on their next sync.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bump when the projected fields change; stored with every projected file
+PROJECTION_VERSION = 1
+
+def _first_image(images: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Keep only the largest image (Spotify lists them largest first)."""
+    if not images:
+        return []
+    image = images[0]
+    return [{'url': image.get('url'), 'height': image.get('height'), 'width': image.get('width')}]
+
+def _simple_artist(artist: Dict[str, Any]) -> Dict[str, Any]:
+    return {'id': artist.get('id'), 'name': artist.get('name')}
+
+def project_track(track: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Project a track object to the stored fields."""
+    if not track:
+        return track
+    album = track.get('album') or {}
+    return {
+        'id': track.get('id'),
+        'name': track.get('name'),
+        'uri': track.get('uri'),
+        'duration_ms': track.get('duration_ms', 0),
+        'popularity': track.get('popularity', 0),
+        'explicit': track.get('explicit', False),
+        'preview_url': track.get('preview_url'),
+        'artists': [_simple_artist(artist) for artist in track.get('artists') or []],
+        'album': {
+            'id': album.get('id'),
+            'name': album.get('name'),
+            'release_date': album.get('release_date'),
+            'images': _first_image(album.get('images'))
+        }
+    }
+
+def project_artist(artist: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Project an artist object to the stored fields."""
+    if not artist:
+        return artist
+    return {
+        'id': artist.get('id'),
+        'name': artist.get('name'),
+        'uri': artist.get('uri'),
+        'genres': artist.get('genres') or [],
+        'popularity': artist.get('popularity', 0),
+        'followers': {'total': (artist.get('followers') or {}).get('total', 0)},
+        'images': _first_image(artist.get('images'))
+    }
+
+def project_play(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a recently-played item (play metadata plus its track)."""
+    return {
+        'played_at': item.get('played_at'),
+        'track': project_track(item.get('track')),
+        'context': {'type': item['context'].get('type'), 'uri': item['context'].get('uri')}
+                   if item.get('context') else None
+    }
+
+def project_tracks(tracks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [project_track(track) for track in tracks]
+
+def project_artists(artists: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [project_artist(artist) for artist in artists]
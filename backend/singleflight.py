@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Single-flight call coalescing.
+Concurrent callers asking for the same key wait on the one in-flight call
+and share its result. A shared lock backend extends this across worker
+processes: set SINGLEFLIGHT_LOCK_DIR to a directory all workers can see.
+"""
+
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows
+
+class LocalLockBackend:
+    """In-process only; coalescing within the process is already exclusive."""
+
+    @contextmanager
+    def lock(self, key: str):
+        yield
+
+class FileLockBackend:
+    """Advisory file locks, shared by every worker process on the host."""
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        os.makedirs(lock_dir, exist_ok=True)
+
+    @contextmanager
+    def lock(self, key: str):
+        path = os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest() + '.lock')
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def default_lock_backend():
+    """Pick the lock backend from configuration."""
+    lock_dir = os.getenv('SINGLEFLIGHT_LOCK_DIR')
+    if lock_dir and fcntl is not None:
+        return FileLockBackend(lock_dir)
+    return LocalLockBackend()
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    Functions passed to ``do`` should re-check whether their work is still
+    needed: with a shared lock backend, a caller in another process may
+    have finished the same work while this one waited for the lock.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or default_lock_backend()
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {'executed': 0, 'shared': 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` for ``key`` unless a call for it is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats['shared'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self.backend.lock(key):
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
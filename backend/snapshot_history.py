@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Versioned history of top lists.
+Each sync that changes a top list appends a version to
+data/<user_id>/snapshots/<data_type>_<time_range>.jsonl. Most versions are
+stored as rank-list deltas against the previous one (items that left,
+items that entered at a rank, and items that moved), with a full keyframe
+every SNAPSHOT_KEYFRAME_INTERVAL versions so rebuilding any version only
+replays a few deltas.
+"""
+
+import json
+import os
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import json_storage as storage
+from storage_cache import read_cache
+
+SNAPSHOTS_DIR = 'snapshots'
+
+# Store a full copy every this many versions
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv('SNAPSHOT_KEYFRAME_INTERVAL', 10))
+
+def get_log_path(user_id: str, data_type: str, time_range: str) -> str:
+    """Get the snapshot log of one top list."""
+    snapshots_dir = os.path.join(storage.get_user_dir(user_id), SNAPSHOTS_DIR)
+    os.makedirs(snapshots_dir, exist_ok=True)
+    return os.path.join(snapshots_dir, f'{data_type}_{time_range}.jsonl')
+
+def _item_key(item: Dict[str, Any]) -> str:
+    return item.get('id') or item.get('uri') or item.get('name')
+
+def _stable_indexes(old_positions: List[int]) -> set:
+    """Indexes of a longest increasing subsequence of ``old_positions``."""
+    tails, tail_indexes, previous = [], [], [-1] * len(old_positions)
+    for i, position in enumerate(old_positions):
+        slot = bisect_left(tails, position)
+        if slot == len(tails):
+            tails.append(position)
+            tail_indexes.append(i)
+        else:
+            tails[slot] = position
+            tail_indexes[slot] = i
+        previous[i] = tail_indexes[slot - 1] if slot else -1
+
+    stable = set()
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i != -1:
+        stable.add(i)
+        i = previous[i]
+    return stable
+
+def compute_delta(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Describe ``new`` as changes to ``old``.
+
+    Items kept in the same relative order (a longest increasing
+    subsequence of their old ranks) are implicit; everything else is listed.
+
+    Returns:
+        {'removed': [key], 'inserted': [[rank, item]], 'moved': [[rank, key]]},
+        with ranks as 0-based indexes into ``new``
+    """
+    old_ranks = {}
+    for rank, item in enumerate(old):
+        old_ranks.setdefault(_item_key(item), rank)
+    new_keys = [_item_key(item) for item in new]
+    new_set = set(new_keys)
+
+    common = [(rank, old_ranks[key]) for rank, key in enumerate(new_keys) if key in old_ranks]
+    stable = _stable_indexes([old_rank for _, old_rank in common])
+    return {
+        'removed': [key for key in old_ranks if key not in new_set],
+        'inserted': [[rank, item] for rank, item in enumerate(new) if new_keys[rank] not in old_ranks],
+        'moved': [[rank, new_keys[rank]] for i, (rank, _) in enumerate(common) if i not in stable]
+    }
+
+def apply_delta(old: List[Dict[str, Any]], delta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuild the list a delta was computed for."""
+    removed = set(delta['removed'])
+    survivors = [item for item in old if _item_key(item) not in removed]
+    by_key = {_item_key(item): item for item in survivors}
+
+    result: List[Optional[Dict[str, Any]]] = [None] * (len(survivors) + len(delta['inserted']))
+    placed = set()
+    for rank, item in delta['inserted']:
+        result[rank] = item
+    for rank, key in delta['moved']:
+        result[rank] = by_key[key]
+        placed.add(key)
+
+    # Everything else kept its relative order
+    stable = iter(item for item in survivors if _item_key(item) not in placed)
+    return [item if item is not None else next(stable) for item in result]
+
+def _parse_log(path: str) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            # A line without its newline is still being appended; skip it
+            if not line.strip() or not line.endswith('\n'):
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Half a record left by a crash, with a later append glued on
+                print(f"Skipping unreadable snapshot record in {path}")
+    return records
+
+def _trim_partial_line(path: str):
+    """Cut a log back to its last complete line, dropping half a record left by a crash."""
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b'\n')
+            if newline != -1:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos < end:
+            f.truncate(pos)
+
+def _load_log(user_id: str, data_type: str, time_range: str) -> List[Dict[str, Any]]:
+    return read_cache.load(get_log_path(user_id, data_type, time_range), _parse_log) or []
+
+def iter_snapshots(user_id: str, data_type: str,
+                   time_range: str) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Yield (record metadata, items) for every version, oldest first."""
+    items: List[Dict[str, Any]] = []
+    for record in _load_log(user_id, data_type, time_range):
+        items = list(record['items']) if 'items' in record else apply_delta(items, record['delta'])
+        yield {'version': record['version'], 'taken_at': record['taken_at'], 'keyframe': 'items' in record}, items
+
+def list_snapshots(user_id: str, data_type: str, time_range: str) -> List[Dict[str, Any]]:
+    """List stored versions (version, taken_at, keyframe) without rebuilding them."""
+    return [{'version': record['version'], 'taken_at': record['taken_at'], 'keyframe': 'items' in record}
+            for record in _load_log(user_id, data_type, time_range)]
+
+def get_snapshot(user_id: str, data_type: str, time_range: str, version: Optional[int] = None,
+                 at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Rebuild one version of a top list.
+
+    Args:
+        version: Version number (defaults to the latest)
+        at: Instead of a version, the latest version taken at or before this time
+
+    Returns:
+        {'version', 'taken_at', 'items'}, or None if there is no such version
+    """
+    log = _load_log(user_id, data_type, time_range)
+    if at is not None:
+        candidates = [r['version'] for r in log if datetime.fromisoformat(r['taken_at']) <= at]
+        version = candidates[-1] if candidates else None
+    elif version is None and log:
+        version = log[-1]['version']
+    if version is None:
+        return None
+
+    # Replay from the nearest keyframe at or before the version
+    target = next((i for i, record in enumerate(log) if record['version'] == version), None)
+    if target is None:
+        return None
+    start = max(i for i in range(target + 1) if 'items' in log[i])
+    items = list(log[start]['items'])
+    for record in log[start + 1:target + 1]:
+        items = apply_delta(items, record['delta'])
+    return {'version': version, 'taken_at': log[target]['taken_at'], 'items': items}
+
+def diff_snapshots(user_id: str, data_type: str, time_range: str, from_version: int,
+                   to_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Compare two versions of a top list.
+
+    Returns:
+        Items that entered and exited, and items whose rank changed (1-based
+        ranks), or None if either version doesn't exist
+    """
+    old = get_snapshot(user_id, data_type, time_range, from_version)
+    new = get_snapshot(user_id, data_type, time_range, to_version)
+    if not old or not new:
+        return None
+
+    old_ranks = {_item_key(item): rank for rank, item in enumerate(old['items'], 1)}
+    new_ranks = {_item_key(item): rank for rank, item in enumerate(new['items'], 1)}
+    return {
+        'from': {'version': old['version'], 'taken_at': old['taken_at']},
+        'to': {'version': new['version'], 'taken_at': new['taken_at']},
+        'entered': [dict(item, rank=new_ranks[_item_key(item)]) for item in new['items']
+                    if _item_key(item) not in old_ranks],
+        'exited': [dict(item, rank=old_ranks[_item_key(item)]) for item in old['items']
+                   if _item_key(item) not in new_ranks],
+        'moved': [{'item': item, 'from_rank': old_ranks[_item_key(item)], 'to_rank': new_ranks[_item_key(item)]}
+                  for item in new['items']
+                  if _item_key(item) in old_ranks and old_ranks[_item_key(item)] != new_ranks[_item_key(item)]]
+    }
+
+def summarize_history(user_id: str, data_type: str, time_range: str, top: int = 5,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Timeline of a top list: each version's leaders and how many items entered or exited.
+
+    Args:
+        top: Number of leading item names to include per version
+        limit: Only the most recent versions
+    """
+    timeline = []
+    previous_keys = None
+    for meta, items in iter_snapshots(user_id, data_type, time_range):
+        keys = {_item_key(item) for item in items}
+        timeline.append({
+            **meta,
+            'size': len(items),
+            'top': [item.get('name') for item in items[:top]],
+            'entered': len(keys - previous_keys) if previous_keys is not None else 0,
+            'exited': len(previous_keys - keys) if previous_keys is not None else 0
+        })
+        previous_keys = keys
+    return timeline[-limit:] if limit else timeline
+
+def record_snapshot(user_id: str, data_type: str, time_range: str,
+                    items: List[Dict[str, Any]]) -> Optional[int]:
+    """Append a version if the list changed since the last one.
+
+    Items should be projected (see projections.py); they are stored as-is
+    in keyframes and insertions.
+
+    Returns:
+        The new version number, or None if nothing changed
+    """
+    path = get_log_path(user_id, data_type, time_range)
+    with storage.key_lock(path):
+        log = _load_log(user_id, data_type, time_range)
+        previous = get_snapshot(user_id, data_type, time_range) if log else None
+        version = log[-1]['version'] + 1 if log else 1
+        record: Dict[str, Any] = {'version': version, 'taken_at': datetime.now().isoformat()}
+
+        since_keyframe = next((i for i, r in enumerate(reversed(log)) if 'items' in r), len(log))
+        if previous is None or since_keyframe + 1 >= SNAPSHOT_KEYFRAME_INTERVAL:
+            if previous is not None and [_item_key(i) for i in previous['items']] == [_item_key(i) for i in items]:
+                return None
+            record['items'] = items
+        else:
+            delta = compute_delta(previous['items'], items)
+            if not any(delta.values()):
+                return None
+            # A delta that rewrites most of the list is no smaller than a keyframe
+            if len(delta['inserted']) + len(delta['moved']) > len(items) // 2:
+                record['items'] = items
+            else:
+                record['delta'] = delta
+
+        _trim_partial_line(path)
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        return version
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Per-process registry of Spotify clients.
+All clients share one pooled requests.Session so keep-alive connections
+(and their TLS sessions) are reused across requests and users.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import requests
+import spotipy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import CachingSession, cache_scope
+from spotify_scheduler import scheduler
+
+# Connection pool size for the shared HTTP session
+SPOTIFY_HTTP_POOL_SIZE = int(os.getenv('SPOTIFY_HTTP_POOL_SIZE', 20))
+
+# Maximum number of cached clients (one per access token)
+SPOTIFY_MAX_CLIENTS = int(os.getenv('SPOTIFY_MAX_CLIENTS', 1000))
+
+# Web API base URL override (e.g. scripts/utils/fake_spotify_server.py for offline runs)
+SPOTIFY_API_BASE_URL = os.getenv('SPOTIFY_API_BASE_URL')
+
+def token_hash(access_token: str) -> str:
+    """Hash an access token so it can be used as a server-side key."""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+def build_http_session(pool_size: int = SPOTIFY_HTTP_POOL_SIZE) -> requests.Session:
+    """Build a keep-alive HTTP session with a tunable connection pool.
+
+    Retry behaviour mirrors the defaults spotipy uses for its own sessions,
+    except that 429 responses are left to the request scheduler. GET
+    responses are revalidated through the ETag cache.
+    """
+    http_session = CachingSession()
+    retry = Retry(
+        total=spotipy.Spotify.max_retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=spotipy.Spotify.max_retries,
+        backoff_factor=0.3,
+        status_forcelist=[code for code in spotipy.Spotify.default_retry_codes if code != 429],
+        respect_retry_after_header=False)
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    http_session.mount('http://', adapter)
+    http_session.mount('https://', adapter)
+    return http_session
+
+class PooledSpotify(spotipy.Spotify):
+    """Spotify client that runs on a shared HTTP session.
+
+    Every API call goes through the request scheduler, which applies the
+    global and per-user rate limits and retries 429 responses. ``user_key``
+    starts as the token hash and is replaced by the Spotify user ID once
+    the identity is known; it also partitions the ETag cache.
+    """
+
+    user_key = 'anonymous'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if SPOTIFY_API_BASE_URL:
+            self.prefix = SPOTIFY_API_BASE_URL.rstrip('/') + '/'
+
+    def _internal_call(self, method, url, payload, params):
+        # spotipy mutates params, so every attempt gets a fresh copy
+        parent = super()._internal_call
+        with cache_scope(self.user_key):
+            return scheduler.call(self.user_key, lambda: parent(method, url, payload, dict(params)))
+
+    def __del__(self):
+        # The session is shared by every client in the registry, so unlike
+        # spotipy.Spotify we must not close it when one client goes away.
+        pass
+
+class SpotifyClientRegistry:
+    """Reuses one Spotify client per access token, evicting expired ones."""
+
+    def __init__(self, pool_size: int = SPOTIFY_HTTP_POOL_SIZE, max_clients: int = SPOTIFY_MAX_CLIENTS):
+        self.pool_size = pool_size
+        self.http_session = build_http_session(pool_size)
+        self.max_clients = max_clients
+        self._clients = OrderedDict()  # token hash -> (client, expires_at)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get_client(self, token_info: Dict[str, Any]) -> spotipy.Spotify:
+        """Get the client for a token, creating it on first use."""
+        key = token_hash(token_info['access_token'])
+        now = time.time()
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry and entry[1] > now:
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return entry[0]
+
+            client = PooledSpotify(auth=token_info['access_token'], requests_session=self.http_session)
+            client.user_key = key
+            self._clients[key] = (client, token_info.get('expires_at') or now + 3600)
+            self.created += 1
+            self._evict_locked(now)
+            return client
+
+    def evict(self, access_token: Optional[str]):
+        """Drop the client for a token (e.g. after it was refreshed)."""
+        if not access_token:
+            return
+        with self._lock:
+            self._clients.pop(token_hash(access_token), None)
+
+    def _evict_locked(self, now: float):
+        """Remove expired clients and keep the registry within its size limit."""
+        for key in [k for k, (_, expires_at) in self._clients.items() if expires_at <= now]:
+            del self._clients[key]
+        while len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'created': self.created,
+                'reused': self.reused,
+                'pool_size': self.pool_size
+            }
+
+# Process-wide registry
+registry = SpotifyClientRegistry()
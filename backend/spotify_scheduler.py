@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware scheduler for Spotify Web API calls.
+Every call made through a registry client waits for a token from a global
+and a per-user token bucket, interactive requests are served ahead of
+background sync, and 429 responses pause all callers for Retry-After plus
+a random jitter.
+"""
+
+import bisect
+import contextvars
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from spotipy.exceptions import SpotifyException
+
+# Priority lanes (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Token bucket settings (requests per second and burst size)
+SPOTIFY_GLOBAL_RATE = float(os.getenv('SPOTIFY_GLOBAL_RATE', 20))
+SPOTIFY_GLOBAL_BURST = int(os.getenv('SPOTIFY_GLOBAL_BURST', 40))
+SPOTIFY_USER_RATE = float(os.getenv('SPOTIFY_USER_RATE', 10))
+SPOTIFY_USER_BURST = int(os.getenv('SPOTIFY_USER_BURST', 30))
+
+# Retry settings for rate-limited (429) calls
+SPOTIFY_MAX_429_RETRIES = int(os.getenv('SPOTIFY_MAX_429_RETRIES', 5))
+SPOTIFY_BACKOFF_BASE = float(os.getenv('SPOTIFY_BACKOFF_BASE', 0.5))
+SPOTIFY_BACKOFF_MAX = float(os.getenv('SPOTIFY_BACKOFF_MAX', 30))
+
+# Lane of the code currently running; copied into worker threads by submit_with_context
+_current_priority = contextvars.ContextVar('spotify_priority', default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def lane(priority: int):
+    """Run the enclosed Spotify calls in the given priority lane."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_priority() -> int:
+    """Get the priority lane of the running code."""
+    return _current_priority.get()
+
+def submit_with_context(executor, fn: Callable, *args, **kwargs):
+    """Submit work to an executor so it keeps the caller's priority lane."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/second."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+class RequestScheduler:
+    """Coordinates Spotify calls across requests and threads."""
+
+    def __init__(self, global_rate: float = SPOTIFY_GLOBAL_RATE, global_burst: int = SPOTIFY_GLOBAL_BURST,
+                 user_rate: float = SPOTIFY_USER_RATE, user_burst: int = SPOTIFY_USER_BURST,
+                 max_retries: int = SPOTIFY_MAX_429_RETRIES, backoff_base: float = SPOTIFY_BACKOFF_BASE,
+                 backoff_max: float = SPOTIFY_BACKOFF_MAX):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._global = TokenBucket(global_rate, global_burst)
+        self._users: Dict[str, TokenBucket] = {}
+        self._waiting = []  # sorted (priority, seq, user_key) tickets
+        self._seq = itertools.count()
+        self._blocked_until = 0.0  # Global pause after a 429
+
+        self.stats = {
+            'calls': 0,
+            'rate_limited': 0,
+            'retries': 0,
+            'waited_seconds': 0.0
+        }
+
+    def _user_bucket(self, user_key: str) -> TokenBucket:
+        bucket = self._users.get(user_key)
+        if bucket is None:
+            bucket = self._users[user_key] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def acquire(self, user_key: str, priority: Optional[int] = None):
+        """Block until this caller may send one request.
+
+        Waiting callers are served in (priority, arrival) order, skipping
+        callers whose own user bucket is empty so one busy user can't hold
+        up everyone else.
+        """
+        if priority is None:
+            priority = current_priority()
+
+        ticket = (priority, next(self._seq), user_key)
+        started = time.monotonic()
+
+        with self._cond:
+            bisect.insort(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = max(self._blocked_until - now, self._global.wait_time(now))
+
+                    if wait <= 0:
+                        # Find the first waiter whose user bucket has a token
+                        user_waits = []
+                        for waiting in self._waiting:
+                            user_wait = self._user_bucket(waiting[2]).wait_time(now)
+                            if user_wait <= 0:
+                                break
+                            user_waits.append(user_wait)
+                        else:
+                            waiting = None
+
+                        if waiting is not None and waiting != ticket:
+                            # Someone ahead of us can go; make sure they wake up
+                            self._cond.notify_all()
+
+                        if waiting == ticket:
+                            self._global.consume()
+                            self._user_bucket(user_key).consume()
+                            self._waiting.remove(ticket)
+                            self.stats['calls'] += 1
+                            self.stats['waited_seconds'] += now - started
+                            self._prune_users_locked()
+                            self._cond.notify_all()
+                            return
+
+                        wait = min(user_waits) if waiting is None and user_waits else 0.05
+
+                    self._cond.wait(timeout=max(wait, 0.001))
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                raise
+
+    def _prune_users_locked(self, max_users: int = 1000):
+        """Forget idle users whose buckets have refilled completely."""
+        if len(self._users) <= max_users:
+            return
+        now = time.monotonic()
+        waiting_users = {ticket[2] for ticket in self._waiting}
+        for key, bucket in list(self._users.items()):
+            if key not in waiting_users and bucket.wait_time(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self._users[key]
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Delay before retrying: Retry-After (or exponential backoff) plus jitter."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, user_key: str, func: Callable[[], Any], priority: Optional[int] = None) -> Any:
+        """Run one Spotify call under the rate limits, retrying on 429."""
+        attempt = 0
+        while True:
+            self.acquire(user_key, priority)
+            try:
+                return func()
+            except SpotifyException as e:
+                if e.http_status != 429:
+                    raise
+
+                with self._cond:
+                    self.stats['rate_limited'] += 1
+                if attempt >= self.max_retries:
+                    raise
+
+                retry_after = _parse_retry_after(e.headers)
+                delay = self._backoff(attempt, retry_after)
+                with self._cond:
+                    self.stats['retries'] += 1
+                    if retry_after is not None:
+                        # Spotify limits the whole app, so pause every caller
+                        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    self._cond.notify_all()
+
+                print(f"Spotify rate limit hit, retrying in {delay:.2f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['waiting'] = len(self._waiting)
+            stats['tracked_users'] = len(self._users)
+            stats['paused_for'] = round(max(0.0, self._blocked_until - time.monotonic()), 2)
+        stats['waited_seconds'] = round(stats['waited_seconds'], 3)
+        return stats
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from a response."""
+    if not headers:
+        return None
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+# Process-wide scheduler shared by all Spotify clients
+scheduler = RequestScheduler()
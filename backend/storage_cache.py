@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+In-process read-through cache for storage files.
+Parsed files are kept in an LRU keyed on (path, mtime_ns, size), so a file
+changed on disk (by this or another process) is parsed again, and repeated
+loads of an unchanged file are served without touching the parser.
+Cached data is shared between callers, so it is handed out as read-only
+views: FrozenDict / FrozenList behave like dict / list (and serialize as
+JSON the same way) but raise TypeError on mutation. copy.deepcopy returns
+ordinary mutable containers.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Memory budget for parsed storage files
+STORAGE_READ_CACHE_MB = float(os.getenv('STORAGE_READ_CACHE_MB', 64))
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is a shared read-only view; copy.deepcopy() it to modify")
+
+class FrozenDict(dict):
+    """Read-only dict."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+class FrozenList(list):
+    """Read-only list."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+def freeze(value: Any) -> Any:
+    """Recursively convert parsed JSON into read-only views."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Recursively copy read-only views into ordinary dicts and lists."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory held by a parsed JSON value."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, list):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+class StorageReadCache:
+    """LRU of parsed files within a memory budget."""
+
+    def __init__(self, max_bytes: int = int(STORAGE_READ_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> ((mtime_ns, size), value, cost)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def load(self, path: str, parse: Callable[[str], Any]) -> Optional[Any]:
+        """Get the parsed contents of ``path``, parsing only if it changed.
+
+        Returns:
+            Read-only view of the data, or None if the file doesn't exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        value = freeze(parse(path))
+        self._put(path, key, value)
+        return value
+
+    def peek(self, path: str) -> Optional[Any]:
+        """Get the cached contents of ``path`` if they are current, without parsing on a miss."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != (stat.st_mtime_ns, stat.st_size):
+                return None
+            self._entries.move_to_end(path)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def _put(self, path: str, key, value):
+        cost = estimate_size(value)
+        with self._lock:
+            self._discard_locked(path)
+            if cost > self.max_bytes:
+                return
+            self._entries[path] = (key, value, cost)
+            self._size += cost
+            while self._size > self.max_bytes:
+                _, (_, _, evicted_cost) = self._entries.popitem(last=False)
+                self._size -= evicted_cost
+                self.stats['evictions'] += 1
+
+    def _discard_locked(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def invalidate(self, path: str):
+        """Drop a file's entry (called when it is written or deleted)."""
+        with self._lock:
+            self._discard_locked(path)
+
+    def retag(self, path: str):
+        """Keep a file's entry valid after a metadata-only change (e.g. utime)."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries[path] = ((stat.st_mtime_ns, stat.st_size), entry[1], entry[2])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and memory use."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['cached_bytes'] = self._size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+# Process-wide read cache
+read_cache = StorageReadCache()
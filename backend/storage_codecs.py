@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Pluggable serialization codecs for storage files.
+Files keep their .json names; the codec a file was written with is
+detected from its first bytes, so files written with any codec (including
+the original pretty-printed JSON) load regardless of the configured one.
+Set STORAGE_CODEC to choose how new files are written.
+"""
+
+import gzip
+import io
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # Optional: pip install zstandard
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # Optional: pip install msgpack
+
+# Codec for newly written files: json, compact, gzip, jsonl, zstd or msgpack
+STORAGE_CODEC = os.getenv('STORAGE_CODEC', 'compact')
+
+class JsonCodec:
+    """Plain JSON text; ``indent`` None writes the compact form."""
+
+    magic = b''
+
+    def __init__(self, name: str, indent: Optional[int] = None):
+        self.name = name
+        self.indent = indent
+        self.separators = (',', ':') if indent is None else None
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, indent=self.indent, separators=self.separators).encode('utf-8')
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+    @contextmanager
+    def text_writer(self, binary_file):
+        """Text stream for writing JSON incrementally into ``binary_file``."""
+        writer = io.TextIOWrapper(binary_file, encoding='utf-8', write_through=True)
+        try:
+            yield writer
+        finally:
+            writer.detach()
+
+class GzipCodec(JsonCodec):
+    """Compact JSON compressed with gzip."""
+
+    magic = b'\x1f\x8b'
+
+    def __init__(self, level: int = 6):
+        super().__init__('gzip')
+        self.level = level
+
+    def encode(self, obj: Any) -> bytes:
+        return gzip.compress(super().encode(obj), compresslevel=self.level, mtime=0)
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(gzip.decompress(raw))
+
+    @contextmanager
+    def text_writer(self, binary_file):
+        with gzip.GzipFile(fileobj=binary_file, mode='wb', compresslevel=self.level, mtime=0) as compressed:
+            with super().text_writer(compressed) as writer:
+                yield writer
+
+class ZstdCodec(JsonCodec):
+    """Compact JSON compressed with Zstandard (needs the zstandard package)."""
+
+    magic = b'\x28\xb5\x2f\xfd'
+
+    def __init__(self, level: int = 3):
+        super().__init__('zstd')
+        self.level = level
+
+    def encode(self, obj: Any) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level).compress(super().encode(obj))
+
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(raw))
+
+    @contextmanager
+    def text_writer(self, binary_file):
+        compressed = zstandard.ZstdCompressor(level=self.level).stream_writer(binary_file, closefd=False)
+        try:
+            with super().text_writer(compressed) as writer:
+                yield writer
+        finally:
+            compressed.close()
+
+class MsgpackCodec:
+    """Binary MessagePack (needs the msgpack package)."""
+
+    name = 'msgpack'
+    magic = b'SWMP\x01'  # msgpack has no header of its own
+
+    def encode(self, obj: Any) -> bytes:
+        return self.magic + msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, raw: bytes) -> Any:
+        return msgpack.unpackb(raw[len(self.magic):], raw=False)
+
+    def text_writer(self, binary_file):
+        return None  # Not streamable; callers encode the whole object
+
+class IndexedJsonlCodec:
+    """One JSON line per list item behind a fixed-width offset index.
+
+    Layout: magic, '<QQ' (header length, item count), the wrapper without
+    its data list as JSON, (count + 1) '<Q' item offsets relative to the
+    first item, then the items, each followed by a newline. read_items uses
+    the offsets to decode a slice of the list without touching the rest.
+    Payloads whose data isn't a list are stored whole in the header.
+    """
+
+    name = 'jsonl'
+    magic = b'SWJL\x01'
+    _sizes = struct.Struct('<QQ')
+    _offset = struct.Struct('<Q')
+
+    def encode(self, obj: Any) -> bytes:
+        data = obj.get('data') if isinstance(obj, dict) else None
+        if not isinstance(data, list):
+            header, lines = obj, []
+        else:
+            header = {key: value for key, value in obj.items() if key != 'data'}
+            lines = [json.dumps(item, separators=(',', ':')).encode('utf-8') + b'\n' for item in data]
+
+        offsets, position = [], 0
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        offsets.append(position)
+
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        return b''.join([self.magic, self._sizes.pack(len(header_bytes), len(lines)), header_bytes,
+                         struct.pack(f'<{len(offsets)}Q', *offsets)] + lines)
+
+    def decode(self, raw: bytes) -> Any:
+        header, items, _ = self.read_items(raw)
+        return header if items is None else {**header, 'data': items}
+
+    def read_items(self, buffer, start: int = 0, stop: Optional[int] = None) -> Tuple[Dict[str, Any], Optional[List[Any]], int]:
+        """Decode the header and items[start:stop] from an encoded buffer (bytes or mmap).
+
+        Returns:
+            (header, items or None if the data isn't a list, total item count)
+        """
+        position = len(self.magic)
+        header_length, count = self._sizes.unpack_from(buffer, position)
+        position += self._sizes.size
+        header = json.loads(buffer[position:position + header_length])
+        if 'data' in header:
+            return header, None, 0
+
+        index = position + header_length
+        items_start = index + self._offset.size * (count + 1)
+        start, stop, _ = slice(start, stop).indices(count)
+        if start >= stop:
+            return header, [], count
+        first = self._offset.unpack_from(buffer, index + self._offset.size * start)[0]
+        end = self._offset.unpack_from(buffer, index + self._offset.size * stop)[0]
+        # Items are single lines (JSON escapes newlines), so the slice is one array
+        body = buffer[items_start + first:items_start + end - 1]
+        return header, json.loads(b'[' + body.replace(b'\n', b',') + b']'), count
+
+    def text_writer(self, binary_file):
+        return None  # The offset index needs every item first
+
+CODECS: Dict[str, Any] = {
+    'json': JsonCodec('json', indent=2),
+    'compact': JsonCodec('compact'),
+    'gzip': GzipCodec(),
+    'jsonl': IndexedJsonlCodec()
+}
+if zstandard is not None:
+    CODECS['zstd'] = ZstdCodec()
+if msgpack is not None:
+    CODECS['msgpack'] = MsgpackCodec()
+
+# Codecs recognised by their header, checked before falling back to JSON
+_HEADER_CODECS = [ZstdCodec(), GzipCodec(), MsgpackCodec(), CODECS['jsonl']]
+
+def get_codec(name: Optional[str] = None):
+    """Get a codec by name (defaults to STORAGE_CODEC)."""
+    name = name or STORAGE_CODEC
+    codec = CODECS.get(name)
+    if codec is None:
+        print(f"Storage codec '{name}' is unavailable, using compact JSON")
+        codec = CODECS['compact']
+    return codec
+
+def detect_codec(raw: bytes):
+    """Identify the codec a file was written with from its first bytes."""
+    for codec in _HEADER_CODECS:
+        if raw.startswith(codec.magic):
+            if (codec.name == 'zstd' and zstandard is None) or (codec.name == 'msgpack' and msgpack is None):
+                raise ValueError(f"File was written with the {codec.name} codec, which is not installed")
+            return codec
+    return CODECS['compact']
+
+def decode(raw: bytes) -> Any:
+    """Decode file contents written with any codec."""
+    return detect_codec(raw).decode(raw)
+
+def load_file(path: str) -> Any:
+    """Read and decode a storage file."""
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+def read_items(path: str, start: int = 0, stop: Optional[int] = None):
+    """Read items[start:stop] of a stored list without decoding the rest.
+
+    Only files written with the jsonl codec support this; the file is
+    memory-mapped and just the requested slice is parsed.
+
+    Returns:
+        (header, items, total count), or None if the file's codec can't be sliced
+    """
+    codec = CODECS['jsonl']
+    with open(path, 'rb') as f:
+        if f.read(len(codec.magic)) != codec.magic:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header, items, count = codec.read_items(mapped, start, stop)
+    return None if items is None else (header, items, count)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Global index of stored files.
+One SQLite row per stored file (mirroring its manifest entry), plus
+per-user and overall totals kept up to date by triggers, so storage stats
+and per-user file listings are answered without walking the data
+directory. The index can always be rebuilt from the per-user manifests.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Manifest entry fields stored per file
+FIELDS = ('data_type', 'time_range', 'timestamp', 'verified_at', 'item_count', 'size', 'sha256', 'projection')
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS files (
+        user_id TEXT NOT NULL,
+        file_key TEXT NOT NULL,
+        data_type TEXT,
+        time_range TEXT,
+        timestamp TEXT,
+        verified_at TEXT,
+        item_count INTEGER,
+        size INTEGER NOT NULL DEFAULT 0,
+        sha256 TEXT,
+        projection INTEGER,
+        PRIMARY KEY (user_id, file_key)
+    );
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        files INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        users INTEGER NOT NULL DEFAULT 0,
+        files INTEGER NOT NULL DEFAULT 0,
+        bytes INTEGER NOT NULL DEFAULT 0,
+        built_at TEXT
+    );
+    INSERT OR IGNORE INTO totals (id) VALUES (1);
+
+    CREATE TRIGGER IF NOT EXISTS files_insert AFTER INSERT ON files BEGIN
+        INSERT INTO users (user_id) SELECT new.user_id
+            WHERE NOT EXISTS (SELECT 1 FROM users WHERE user_id = new.user_id);
+        UPDATE users SET files = files + 1, bytes = bytes + new.size WHERE user_id = new.user_id;
+        UPDATE totals SET files = files + 1, bytes = bytes + new.size WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS files_update AFTER UPDATE OF size ON files BEGIN
+        UPDATE users SET bytes = bytes + new.size - old.size WHERE user_id = new.user_id;
+        UPDATE totals SET bytes = bytes + new.size - old.size WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS files_delete AFTER DELETE ON files BEGIN
+        UPDATE users SET files = files - 1, bytes = bytes - old.size WHERE user_id = old.user_id;
+        UPDATE totals SET files = files - 1, bytes = bytes - old.size WHERE id = 1;
+        DELETE FROM users WHERE user_id = old.user_id AND files <= 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS users_insert AFTER INSERT ON users BEGIN
+        UPDATE totals SET users = users + 1 WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS users_delete AFTER DELETE ON users BEGIN
+        UPDATE totals SET users = users - 1 WHERE id = 1;
+    END;
+'''
+
+def _values(entry: Dict[str, Any]) -> List[Any]:
+    return [(entry.get(field) or 0) if field == 'size' else entry.get(field) for field in FIELDS]
+
+class StorageIndex:
+    """SQLite index of stored files with incrementally maintained totals."""
+
+    def __init__(self, db_path: Callable[[], str]):
+        self._db_path = db_path
+        self._initialized = set()
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path()
+
+    @contextmanager
+    def _connection(self):
+        """Open a connection with WAL mode, creating the schema on first use."""
+        path = self.db_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            self._initialized.discard(path)
+        conn = sqlite3.connect(path, timeout=30.0)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if path not in self._initialized:
+                with self._lock:
+                    conn.executescript(_SCHEMA)
+                    self._initialized.add(path)
+            yield conn
+        finally:
+            conn.close()
+
+    def record(self, user_id: str, file_key: str, entry: Dict[str, Any]):
+        """Insert or update a file's row from its manifest entry."""
+        columns = ', '.join(FIELDS)
+        updates = ', '.join(f'{field} = excluded.{field}' for field in FIELDS)
+        with self._connection() as conn:
+            conn.execute(
+                f'INSERT INTO files (user_id, file_key, {columns}) VALUES (?, ?, {", ".join("?" * len(FIELDS))}) '
+                f'ON CONFLICT (user_id, file_key) DO UPDATE SET {updates}',
+                [user_id, file_key] + _values(entry)
+            )
+            conn.commit()
+
+    def remove(self, user_id: str, file_key: Optional[str] = None):
+        """Drop one file's row, or every row of a user if ``file_key`` is None."""
+        with self._connection() as conn:
+            if file_key is None:
+                conn.execute('DELETE FROM files WHERE user_id = ?', (user_id,))
+            else:
+                conn.execute('DELETE FROM files WHERE user_id = ? AND file_key = ?', (user_id, file_key))
+            conn.commit()
+
+    def rebuild(self, rows: Iterable[tuple], built_at: str):
+        """Replace the whole index with (user_id, file_key, entry) rows."""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM files')
+            conn.executemany(
+                f'INSERT INTO files (user_id, file_key, {", ".join(FIELDS)}) '
+                f'VALUES (?, ?, {", ".join("?" * len(FIELDS))})',
+                ([user_id, file_key] + _values(entry) for user_id, file_key, entry in rows)
+            )
+            conn.execute('UPDATE totals SET built_at = ? WHERE id = 1', (built_at,))
+            conn.commit()
+
+    def is_built(self) -> bool:
+        """Whether the index has been populated from a full scan."""
+        with self._connection() as conn:
+            row = conn.execute('SELECT built_at FROM totals WHERE id = 1').fetchone()
+        return bool(row and row[0])
+
+    def get_totals(self) -> Dict[str, int]:
+        """Get user, file and byte counts across all users."""
+        with self._connection() as conn:
+            users, files, size = conn.execute('SELECT users, files, bytes FROM totals WHERE id = 1').fetchone()
+        return {'users': users, 'files': files, 'bytes': size}
+
+    def get_user_files(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get the indexed entries of a user's files."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                f'SELECT file_key, {", ".join(FIELDS)} FROM files WHERE user_id = ?', (user_id,)
+            ).fetchall()
+        return [dict(zip(('file_key',) + FIELDS, row)) for row in rows]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Write-behind queue for storage files.
+Saves are queued and written by a background thread, so request handlers
+and syncs don't wait on disk I/O. The queue holds at most one pending write
+per file: a newer save of the same file replaces the queued one. Writes are
+taken in batches so their directory fsyncs can be shared, and reads of a file
+with a queued or in-progress write are answered from the queue.
+
+Queued writes live in process memory: they are lost if the process is
+killed before they are written, and other processes see them only once
+they are on disk.
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# A queued write: the data to serve reads from, and the callable that writes it
+Job = Tuple[Any, Callable[[], Any]]
+
+class WriteBehindWriter:
+    """Bounded, coalescing queue drained by a background thread."""
+
+    def __init__(self, run_batch: Callable[[List[Callable[[], Any]]], None],
+                 max_pending: int = 256, delay: float = 0.05):
+        """
+        Args:
+            run_batch: Called on the writer thread with the write callables of one batch
+            max_pending: Files that can be queued before save calls block
+            delay: Seconds to wait after the first queued write, letting more
+                writes join the batch (and repeated writes coalesce)
+        """
+        self._run_batch = run_batch
+        self.max_pending = max_pending
+        self.delay = delay
+        self._pending: 'OrderedDict[str, Job]' = OrderedDict()
+        self._in_flight: Dict[str, Job] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'queued': 0, 'coalesced': 0, 'written': 0, 'batches': 0, 'blocked': 0}
+
+    def _ensure_thread(self):
+        # Started lazily, so a process forked after import gets its own thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='storage-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def submit(self, key: str, view: Any, write: Callable[[], Any]):
+        """Queue a write of ``key``, replacing any queued write of it.
+
+        Blocks while the queue is full, unless ``key`` is already queued.
+        """
+        with self._cond:
+            if key in self._pending:
+                self.stats['coalesced'] += 1
+            else:
+                if len(self._pending) >= self.max_pending:
+                    self.stats['blocked'] += 1
+                    self._cond.wait_for(lambda: len(self._pending) < self.max_pending or key in self._pending)
+            self._pending[key] = (view, write)
+            self.stats['queued'] += 1
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get the data of a queued or in-progress write of ``key``, or None."""
+        with self._cond:
+            job = self._pending.get(key) or self._in_flight.get(key)
+        return job[0] if job else None
+
+    def cancel(self, key: str):
+        """Drop a queued write of ``key`` and wait for one in progress to finish.
+
+        For writers that bypass the queue, so an older queued write can't
+        land after theirs.
+        """
+        with self._cond:
+            self._pending.pop(key, None)
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: key not in self._in_flight)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued write is on disk.
+
+        Returns:
+            False if the timeout passed first
+        """
+        with self._cond:
+            if self._pending:
+                self._ensure_thread()
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+            if self.delay:
+                time.sleep(self.delay)
+            with self._cond:
+                self._in_flight = dict(self._pending)
+                self._pending.clear()
+                self._cond.notify_all()  # Wake blocked submitters
+            try:
+                self._run_batch([write for _, write in self._in_flight.values()])
+            except Exception as e:
+                print(f"Error in storage writer batch: {e}")
+            with self._cond:
+                self.stats['written'] += len(self._in_flight)
+                self.stats['batches'] += 1
+                self._in_flight = {}
+                self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue counters and the current queue length."""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending) + len(self._in_flight)
+        return stats
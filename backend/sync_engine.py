@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Sync engine for Spotify data.
+Runs independent sync jobs (one per data type and time range) concurrently
+under a configurable concurrency cap and records per-job timings.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from spotify_scheduler import submit_with_context
+
+# Maximum number of sync jobs running at the same time
+SYNC_MAX_CONCURRENCY = int(os.getenv('SYNC_MAX_CONCURRENCY', 4))
+
+class SyncJob:
+    """A single unit of sync work, e.g. top tracks for one time range."""
+
+    def __init__(self, name: str, func: Callable[[], Any], time_range: Optional[str] = None,
+                 required: bool = True):
+        self.name = name
+        self.func = func
+        self.time_range = time_range
+        self.required = required  # Failure of a required job fails the whole sync
+
+    def __repr__(self):
+        return f"SyncJob({self.name!r})"
+
+def _report(on_progress: Optional[Callable[[Dict[str, Any]], None]], outcome: Dict[str, Any]):
+    """Send a job state change to the progress callback, never failing the job."""
+    if not on_progress:
+        return
+    try:
+        on_progress(outcome)
+    except Exception as e:
+        print(f"Error reporting sync progress: {e}")
+
+def _run_job(job: SyncJob, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Run one job and capture its result, error and duration."""
+    _report(on_progress, {'name': job.name, 'time_range': job.time_range, 'status': 'running'})
+    start = time.perf_counter()
+    outcome = {
+        'name': job.name,
+        'time_range': job.time_range,
+        'required': job.required,
+        'status': 'done',
+        'result': None,
+        'error': None
+    }
+
+    try:
+        outcome['result'] = job.func()
+    except Exception as e:
+        outcome['status'] = 'failed'
+        outcome['error'] = str(e)
+
+    outcome['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return outcome
+
+def run_sync_jobs(jobs: List[SyncJob], max_concurrency: Optional[int] = None,
+                  on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Run sync jobs concurrently.
+
+    Args:
+        jobs: Jobs to run; they must not depend on each other
+        max_concurrency: Maximum number of jobs in flight (defaults to SYNC_MAX_CONCURRENCY)
+        on_progress: Optional callback invoked with each job state change
+            ('queued', 'running', then the final outcome); it may be
+            called from worker threads
+
+    Returns:
+        Job outcomes in the same order as ``jobs``
+    """
+    if not jobs:
+        return []
+
+    workers = max(1, min(max_concurrency or SYNC_MAX_CONCURRENCY, len(jobs)))
+    outcomes: Dict[int, Dict[str, Any]] = {}
+
+    for job in jobs:
+        _report(on_progress, {'name': job.name, 'time_range': job.time_range, 'status': 'queued'})
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync-job') as executor:
+        futures = {submit_with_context(executor, _run_job, job, on_progress): index
+                   for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes[futures[future]] = outcome
+
+            if outcome['status'] == 'failed':
+                print(f"Sync job {outcome['name']} failed: {outcome['error']}")
+
+            _report(on_progress, outcome)
+
+    return [outcomes[index] for index in range(len(jobs))]
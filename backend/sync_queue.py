@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Background job queue for user syncs.
+Worker threads run syncs off the request path, at most one in-flight sync
+per user, and keep job state that /api/sync-status can report.
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from spotify_scheduler import PRIORITY_BACKGROUND, lane
+
+# Number of background sync workers
+SYNC_QUEUE_WORKERS = int(os.getenv('SYNC_QUEUE_WORKERS', 2))
+
+# Finished job states are kept this long for status reporting
+SYNC_JOB_RETENTION_SECONDS = int(os.getenv('SYNC_JOB_RETENTION_SECONDS', 3600))
+
+ACTIVE_STATES = ('queued', 'running')
+
+class SyncJobQueue:
+    """Runs sync functions on worker threads with per-user deduplication."""
+
+    def __init__(self, workers: int = SYNC_QUEUE_WORKERS):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._jobs: Dict[str, Dict[str, Any]] = {}  # user_id -> latest job state
+        self._funcs: Dict[str, Callable] = {}  # job id -> sync function
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'sync-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, user_id: str, func: Callable[[Callable], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Queue a sync for a user unless one is already queued or running.
+
+        Args:
+            user_id: The user's Spotify ID
+            func: Sync function; called with a progress callback that takes
+                sync job outcomes (see sync_engine.run_sync_jobs)
+
+        Returns:
+            (job state, whether a new job was created)
+        """
+        with self._lock:
+            existing = self._jobs.get(user_id)
+            if existing and existing['status'] in ACTIVE_STATES:
+                return dict(existing), False
+
+            self._ensure_workers()
+            self._prune_locked()
+
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'status': 'queued',
+                'queued_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'progress': {},
+                'errors': [],
+                'result': None
+            }
+            self._jobs[user_id] = job
+            self._funcs[job['job_id']] = func
+            self._queue.put(job)
+            return dict(job), True
+
+    def get_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of the latest sync job for a user."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if not job:
+                return None
+            snapshot = dict(job)
+            snapshot['progress'] = {name: dict(state) for name, state in job['progress'].items()}
+            snapshot['errors'] = list(job['errors'])
+            return snapshot
+
+    def is_active(self, user_id: str) -> bool:
+        """Check whether a sync is queued or running for a user."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+            return bool(job and job['status'] in ACTIVE_STATES)
+
+    def _record_progress(self, job: Dict[str, Any], outcome: Dict[str, Any]):
+        with self._lock:
+            job['progress'][outcome['name']] = {
+                'status': outcome['status'],
+                'time_range': outcome.get('time_range'),
+                'duration_ms': outcome.get('duration_ms')
+            }
+            if outcome['status'] == 'failed':
+                job['errors'].append({'job': outcome['name'], 'error': outcome.get('error')})
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                func = self._funcs.pop(job['job_id'])
+                job['status'] = 'running'
+                job['started_at'] = datetime.now().isoformat()
+
+            start = time.perf_counter()
+            try:
+                with lane(PRIORITY_BACKGROUND):
+                    result = func(lambda outcome: self._record_progress(job, outcome))
+                with self._lock:
+                    job['result'] = result
+                    if isinstance(result, dict) and 'error' in result:
+                        job['status'] = 'failed'
+                        job['errors'].append({'job': 'sync', 'error': result['error']})
+                    else:
+                        job['status'] = 'done'
+            except Exception as e:
+                print(f"Background sync failed for {job['user_id']}: {e}")
+                with self._lock:
+                    job['status'] = 'failed'
+                    job['errors'].append({'job': 'sync', 'error': str(e)})
+            finally:
+                with self._lock:
+                    job['finished_at'] = datetime.now().isoformat()
+                    job['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                self._queue.task_done()
+
+    def _prune_locked(self):
+        """Forget finished jobs older than the retention period."""
+        cutoff = datetime.now().timestamp() - SYNC_JOB_RETENTION_SECONDS
+        for user_id, job in list(self._jobs.items()):
+            if job['status'] not in ACTIVE_STATES and job['finished_at'] \
+                    and datetime.fromisoformat(job['finished_at']).timestamp() < cutoff:
+                del self._jobs[user_id]
+
+# Process-wide sync queue
+sync_queue = SyncJobQueue()
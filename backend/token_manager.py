@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Coordinated OAuth token refresh.
+Refreshes are serialized per token lineage (one user session's refresh
+token), so concurrent requests arriving just after expiry wait on a single
+call to the token endpoint and all pick up its result. A background thread
+renews tokens that are in active use shortly before they expire, so most
+requests never see an expired token at all.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from spotify_clients import token_hash
+
+# Renew tokens this many seconds before they expire
+SPOTIFY_TOKEN_REFRESH_MARGIN = int(os.getenv('SPOTIFY_TOKEN_REFRESH_MARGIN', 300))
+
+# How often the background renewal pass runs (seconds)
+SPOTIFY_TOKEN_RENEW_INTERVAL = int(os.getenv('SPOTIFY_TOKEN_RENEW_INTERVAL', 60))
+
+# Tokens unused for this long are no longer renewed and are dropped
+SPOTIFY_TOKEN_IDLE_SECONDS = int(os.getenv('SPOTIFY_TOKEN_IDLE_SECONDS', 3600))
+
+# A token is refreshed inline once it is this close to expiry (spotipy's threshold)
+_INLINE_MARGIN = 60
+
+class _Lineage:
+    """Latest token for one refresh-token lineage and the lock guarding its refresh."""
+
+    def __init__(self, token_info: Dict[str, Any]):
+        self.lock = threading.Lock()
+        self.token_info = token_info
+        self.last_used = time.time()
+
+class TokenManager:
+    """Hands out current access tokens, refreshing each lineage at most once at a time."""
+
+    def __init__(self, oauth, on_refresh: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 margin: int = SPOTIFY_TOKEN_REFRESH_MARGIN, renew_interval: int = SPOTIFY_TOKEN_RENEW_INTERVAL,
+                 idle_seconds: int = SPOTIFY_TOKEN_IDLE_SECONDS):
+        self.oauth = oauth
+        self.on_refresh = on_refresh
+        self.margin = margin
+        self.renew_interval = renew_interval
+        self.idle_seconds = idle_seconds
+        self._lineages: Dict[str, _Lineage] = {}  # refresh token hash -> lineage
+        self._lock = threading.Lock()
+        self._renewer = None
+        self.stats = {'refreshes': 0, 'proactive_refreshes': 0, 'waited': 0, 'failures': 0}
+
+    def _lineage(self, token_info: Dict[str, Any]) -> _Lineage:
+        key = token_hash(token_info['refresh_token'])
+        with self._lock:
+            lineage = self._lineages.get(key)
+            if lineage is None:
+                lineage = self._lineages[key] = _Lineage(token_info)
+            elif token_info.get('expires_at', 0) > lineage.token_info.get('expires_at', 0):
+                lineage.token_info = token_info
+            lineage.last_used = time.time()
+        return lineage
+
+    def get_token(self, token_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a valid token for the lineage of ``token_info``.
+
+        Returns the newest known token; if it is about to expire, refreshes
+        it, or waits for the refresh another request already started.
+        """
+        if not token_info.get('refresh_token'):
+            return token_info
+
+        self._ensure_renewer()
+        lineage = self._lineage(token_info)
+        current = lineage.token_info
+        if not self._expires_within(current, _INLINE_MARGIN):
+            return current
+
+        waited = not lineage.lock.acquire(blocking=False)
+        if waited:
+            lineage.lock.acquire()
+        try:
+            # Another request may have refreshed while we waited
+            if not self._expires_within(lineage.token_info, _INLINE_MARGIN):
+                with self._lock:
+                    self.stats['waited'] += 1
+                return lineage.token_info
+            return self._refresh_locked(lineage)
+        finally:
+            lineage.lock.release()
+
+    def forget(self, token_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Stop tracking a token lineage (e.g. on logout).
+
+        Returns:
+            The newest token of the lineage, if it was tracked
+        """
+        if not token_info or not token_info.get('refresh_token'):
+            return None
+        with self._lock:
+            lineage = self._lineages.get(token_hash(token_info['refresh_token']))
+            if lineage is None:
+                return None
+            for key in [k for k, v in self._lineages.items() if v is lineage]:
+                del self._lineages[key]
+            return lineage.token_info
+
+    def renew_expiring(self):
+        """Refresh every recently used token that expires within the margin."""
+        now = time.time()
+        with self._lock:
+            for key, lineage in list(self._lineages.items()):
+                if now - lineage.last_used > self.idle_seconds:
+                    del self._lineages[key]
+            lineages = list(self._lineages.values())
+
+        for lineage in lineages:
+            if not self._expires_within(lineage.token_info, self.margin):
+                continue
+            # Skip lineages a request is refreshing right now
+            if not lineage.lock.acquire(blocking=False):
+                continue
+            try:
+                if self._expires_within(lineage.token_info, self.margin):
+                    self._refresh_locked(lineage)
+                    with self._lock:
+                        self.stats['proactive_refreshes'] += 1
+            except Exception as e:
+                print(f"Proactive token refresh failed: {e}")
+            finally:
+                lineage.lock.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh statistics."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['tracked_tokens'] = len(self._lineages)
+        return stats
+
+    def _refresh_locked(self, lineage: _Lineage) -> Dict[str, Any]:
+        old = lineage.token_info
+        try:
+            new = self.oauth.refresh_access_token(old['refresh_token'])
+        except Exception:
+            with self._lock:
+                self.stats['failures'] += 1
+            raise
+
+        with self._lock:
+            self.stats['refreshes'] += 1
+            lineage.token_info = new
+            # Spotify may rotate the refresh token; keep both keys on this lineage
+            self._lineages[token_hash(new['refresh_token'])] = lineage
+
+        if self.on_refresh:
+            self.on_refresh(old, new)
+        return new
+
+    @staticmethod
+    def _expires_within(token_info: Dict[str, Any], seconds: int) -> bool:
+        return token_info.get('expires_at', 0) - time.time() < seconds
+
+    def _ensure_renewer(self):
+        if self._renewer is not None or self.renew_interval <= 0:
+            return
+        with self._lock:
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew_loop, name='token-renewer', daemon=True)
+                self._renewer.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.renew_interval)
+            try:
+                self.renew_expiring()
+            except Exception as e:
+                print(f"Token renewal pass failed: {e}")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark storage codecs on realistic payloads.
+Compares file size, write time and read time of every available codec on
+1-2k item top-tracks files, both as full API objects and as stored
+projections. Tracks come from the fake Spotify API's synthetic catalogue.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import storage_codecs
+from fake_spotify_server import Catalogue, FakeSpotifyConfig
+from projections import project_tracks
+
+# Markets listed on a typical track (the fake catalogue lists only a few)
+MARKETS = ['AD', 'AE', 'AG', 'AL', 'AM', 'AO', 'AR', 'AT', 'AU', 'AZ', 'BA', 'BB', 'BD', 'BE', 'BF', 'BG',
+           'BH', 'BI', 'BJ', 'BN', 'BO', 'BR', 'BS', 'BT', 'BW', 'BY', 'BZ', 'CA', 'CD', 'CG', 'CH', 'CI'] * 6
+
+def build_payload(items: int, projected: bool):
+    catalogue = Catalogue(FakeSpotifyConfig(tracks=items))
+    tracks = []
+    for i in range(items):
+        track = catalogue.track(i)
+        track['available_markets'] = MARKETS
+        track['album']['available_markets'] = MARKETS
+        track['album']['images'] += [dict(track['album']['images'][0], height=300, width=300),
+                                     dict(track['album']['images'][0], height=64, width=64)]
+        tracks.append(track)
+    return {
+        'user_id': 'benchmark_user',
+        'data_type': 'top_tracks',
+        'time_range': 'long_term',
+        'timestamp': '2025-01-01T00:00:00',
+        'data': project_tracks(tracks) if projected else tracks
+    }
+
+def time_codec(codec, payload, path: str, repeat: int):
+    writes, reads = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, 'wb') as f:
+            f.write(codec.encode(payload))
+        writes.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loaded = storage_codecs.load_file(path)
+        reads.append(time.perf_counter() - start)
+    assert loaded == payload
+    return os.path.getsize(path), statistics.median(writes), statistics.median(reads)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark storage codecs')
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("Storage Codec Benchmark")
+    print("=" * 72)
+    print(f"Codecs available: {', '.join(storage_codecs.CODECS)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'payload.json')
+        for items in args.items:
+            for projected in (False, True):
+                payload = build_payload(items, projected)
+                label = 'projected' if projected else 'full objects'
+                print(f"\n📦 {items} tracks, {label}")
+                print(f"   {'codec':<10}{'size (KB)':>12}{'write (ms)':>14}{'read (ms)':>12}")
+                baseline = None
+                for name, codec in storage_codecs.CODECS.items():
+                    size, write, read = time_codec(codec, payload, path, args.repeat)
+                    baseline = baseline or size
+                    print(f"   {name:<10}{size / 1024:>12.1f}{write * 1000:>14.2f}{read * 1000:>12.2f}"
+                          f"   ({baseline / size:.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
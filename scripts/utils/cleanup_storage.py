@@ -2,14 +2,19 @@
 """Cleanup script for JSON storage."""
 
 import os
+import sys
 import shutil
-import json
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+import json_storage as storage
+from storage_codecs import load_file
+
 def cleanup_storage():
     """Clean up the JSON storage directory."""
     
-    storage_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    storage_dir = storage.STORAGE_DIR
     
     print("JSON Storage Cleanup Utility")
     print("=" * 60)
@@ -27,27 +32,23 @@ def cleanup_storage():
     total_size = 0
     users = []
     
-    for user_dir in os.listdir(storage_dir):
-        user_path = os.path.join(storage_dir, user_dir)
-        if os.path.isdir(user_path):
-            user_count += 1
-            user_size = 0
-            user_files = 0
-            
-            for file in os.listdir(user_path):
-                if file.endswith('.json'):
-                    file_count += 1
-                    user_files += 1
-                    file_path = os.path.join(user_path, file)
-                    file_size = os.path.getsize(file_path)
-                    total_size += file_size
-                    user_size += file_size
-            
-            users.append({
-                'id': user_dir,
-                'files': user_files,
-                'size_kb': user_size / 1024
-            })
+    for user_id, user_path in storage.iter_user_dirs():
+        user_count += 1
+        user_size = 0
+        user_files = 0
+        
+        for entry in storage.iter_data_files(user_path):
+            file_count += 1
+            user_files += 1
+            file_size = entry.stat().st_size
+            total_size += file_size
+            user_size += file_size
+        
+        users.append({
+            'id': user_id,
+            'files': user_files,
+            'size_kb': user_size / 1024
+        })
     
     print(f"\n📊 Current Storage Status:")
     print(f"   - Users: {user_count}")
@@ -64,9 +65,10 @@ def cleanup_storage():
     print("2. Clear specific user data")
     print("3. Clear old data (>30 days)")
     print("4. View storage details")
-    print("5. Exit")
+    print("5. Collect unused shared tracks/artists")
+    print("6. Exit")
     
-    choice = input("\nEnter your choice (1-5): ").strip()
+    choice = input("\nEnter your choice (1-6): ").strip()
     
     if choice == '1':
         confirm = input("⚠️  This will delete ALL stored data! Are you sure? (yes/no): ").strip().lower()
@@ -79,11 +81,10 @@ def cleanup_storage():
     
     elif choice == '2':
         user_id = input("Enter user ID to clear: ").strip()
-        user_path = os.path.join(storage_dir, user_id)
-        if os.path.exists(user_path):
+        if any(uid == user_id for uid, _ in storage.iter_user_dirs()):
             confirm = input(f"⚠️  Delete all data for user {user_id}? (yes/no): ").strip().lower()
             if confirm == 'yes':
-                shutil.rmtree(user_path)
+                storage.clear_user_data(user_id)
                 print(f"✅ Cleared data for user {user_id}")
             else:
                 print("❌ Cancelled")
@@ -94,25 +95,19 @@ def cleanup_storage():
         old_count = 0
         old_size = 0
         
-        for user_dir in os.listdir(storage_dir):
-            user_path = os.path.join(storage_dir, user_dir)
-            if os.path.isdir(user_path):
-                for file in os.listdir(user_path):
-                    if file.endswith('.json'):
-                        file_path = os.path.join(user_path, file)
-                        
-                        # Check file age
-                        try:
-                            with open(file_path, 'r') as f:
-                                data = json.load(f)
-                                timestamp = datetime.fromisoformat(data.get('timestamp', ''))
-                                age = datetime.now() - timestamp
-                                
-                                if age.days > 30:
-                                    old_count += 1
-                                    old_size += os.path.getsize(file_path)
-                        except:
-                            pass
+        for user_id, user_path in storage.iter_user_dirs():
+            for entry in storage.iter_data_files(user_path):
+                # Check file age
+                try:
+                    data = load_file(entry.path)
+                    timestamp = datetime.fromisoformat(data.get('timestamp', ''))
+                    age = datetime.now() - timestamp
+                    
+                    if age.days > 30:
+                        old_count += 1
+                        old_size += entry.stat().st_size
+                except:
+                    pass
         
         if old_count > 0:
             print(f"\n📊 Found {old_count} old files ({old_size / 1024:.2f} KB)")
@@ -120,26 +115,22 @@ def cleanup_storage():
             
             if confirm == 'yes':
                 deleted = 0
-                for user_dir in os.listdir(storage_dir):
-                    user_path = os.path.join(storage_dir, user_dir)
-                    if os.path.isdir(user_path):
-                        for file in os.listdir(user_path):
-                            if file.endswith('.json'):
-                                file_path = os.path.join(user_path, file)
-                                
-                                try:
-                                    with open(file_path, 'r') as f:
-                                        data = json.load(f)
-                                        timestamp = datetime.fromisoformat(data.get('timestamp', ''))
-                                        age = datetime.now() - timestamp
-                                        
-                                        if age.days > 30:
-                                            os.remove(file_path)
-                                            deleted += 1
-                                            print(f"   Deleted: {file}")
-                                except:
-                                    pass
+                for user_id, user_path in storage.iter_user_dirs():
+                    for entry in list(storage.iter_data_files(user_path)):
+                        try:
+                            data = load_file(entry.path)
+                            timestamp = datetime.fromisoformat(data.get('timestamp', ''))
+                            age = datetime.now() - timestamp
+                            
+                            if age.days > 30:
+                                os.remove(entry.path)
+                                deleted += 1
+                                print(f"   Deleted: {entry.name}")
+                        except:
+                            pass
                 
+                # Deleted files are still in the storage index
+                storage.rebuild_storage_index()
                 print(f"✅ Deleted {deleted} old files")
             else:
                 print("❌ Cancelled")
@@ -148,30 +139,33 @@ def cleanup_storage():
     
     elif choice == '4':
         print("\n📊 Detailed Storage Information:")
-        for user_dir in os.listdir(storage_dir):
-            user_path = os.path.join(storage_dir, user_dir)
-            if os.path.isdir(user_path):
-                print(f"\n👤 User: {user_dir}")
-                for file in sorted(os.listdir(user_path)):
-                    if file.endswith('.json'):
-                        file_path = os.path.join(user_path, file)
-                        size_kb = os.path.getsize(file_path) / 1024
-                        
-                        # Get timestamp
-                        try:
-                            with open(file_path, 'r') as f:
-                                data = json.load(f)
-                                timestamp = data.get('timestamp', 'unknown')
-                                if timestamp != 'unknown':
-                                    dt = datetime.fromisoformat(timestamp)
-                                    age_days = (datetime.now() - dt).days
-                                    print(f"   - {file}: {size_kb:.2f} KB, {age_days} days old")
-                                else:
-                                    print(f"   - {file}: {size_kb:.2f} KB")
-                        except:
-                            print(f"   - {file}: {size_kb:.2f} KB")
+        for user_id, user_path in storage.iter_user_dirs():
+            print(f"\n👤 User: {user_id}")
+            for entry in sorted(storage.iter_data_files(user_path), key=lambda e: e.name):
+                file = entry.name
+                size_kb = entry.stat().st_size / 1024
+                
+                # Get timestamp
+                try:
+                    data = load_file(entry.path)
+                    timestamp = data.get('timestamp', 'unknown')
+                    if timestamp != 'unknown':
+                        dt = datetime.fromisoformat(timestamp)
+                        age_days = (datetime.now() - dt).days
+                        print(f"   - {file}: {size_kb:.2f} KB, {age_days} days old")
+                    else:
+                        print(f"   - {file}: {size_kb:.2f} KB")
+                except:
+                    print(f"   - {file}: {size_kb:.2f} KB")
     
     elif choice == '5':
+        if os.path.exists(storage.entity_store.db_path):
+            removed = storage.collect_entity_garbage(recount=True)
+            print(f"✅ Removed {removed} unused entities")
+        else:
+            print("✅ No entity store (STORAGE_ENTITY_STORE is off)")
+    
+    elif choice == '6':
         print("👋 Exiting...")
     
     else:
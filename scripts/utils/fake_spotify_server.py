@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Spotify Web API and accounts service.
+
+Serves deterministic synthetic users (profile, top tracks/artists, recently
+played, followed artists, audio features, playlists) with configurable
+catalogue size, latency, jitter, error rate and 429 responses, so sync,
+analytics and rendering throughput can be benchmarked without network
+access.
+
+Point the backend at it with:
+
+    SPOTIFY_API_BASE_URL=http://127.0.0.1:8901/v1/
+    SPOTIFY_ACCOUNTS_BASE_URL=http://127.0.0.1:8901
+
+Logging in through /login then signs in as --default-user (or the user
+given as ?user=<id> on the authorize URL).
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import string
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+BASE62 = string.digits + string.ascii_letters
+GENRES = ['pop', 'rock', 'indie', 'hip hop', 'rap', 'r&b', 'jazz', 'classical', 'electronic', 'house',
+          'techno', 'country', 'folk', 'metal', 'punk', 'soul', 'funk', 'latin', 'k-pop', 'ambient']
+TIME_RANGES = ['short_term', 'medium_term', 'long_term']
+
+@dataclass
+class FakeSpotifyConfig:
+    """Knobs for the synthetic catalogue and the injected network behaviour."""
+    users: int = 10
+    default_user: str = 'user_0'
+    tracks: int = 5000  # Catalogue size
+    artists: int = 800
+    top_items: int = 200  # Top tracks/artists per user and time range
+    follows: int = 150  # Followed artists per user
+    play_interval: int = 180  # Seconds between synthetic plays
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # Share of API requests answered with 503
+    rate_limit_rate: float = 0.0  # Share of API requests answered with 429
+    retry_after: float = 1.0
+    etags: bool = True
+    seed: int = 42
+
+def spotify_id(kind: str, index: int) -> str:
+    """Deterministic 22-character base62 ID, like Spotify's."""
+    value = int(hashlib.sha1(f'{kind}:{index}'.encode()).hexdigest(), 16)
+    chars = []
+    for _ in range(22):
+        value, digit = divmod(value, 62)
+        chars.append(BASE62[digit])
+    return ''.join(chars)
+
+class Catalogue:
+    """Synthetic artists, albums, tracks and per-user listening data."""
+
+    def __init__(self, config: FakeSpotifyConfig):
+        self.config = config
+        self.artist_ids = [spotify_id('artist', i) for i in range(config.artists)]
+        self.track_ids = [spotify_id('track', i) for i in range(config.tracks)]
+        self.artist_index = {artist_id: i for i, artist_id in enumerate(self.artist_ids)}
+        self.track_index = {track_id: i for i, track_id in enumerate(self.track_ids)}
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f'{self.config.seed}:' + ':'.join(map(str, key)))
+
+    def user_ids(self) -> List[str]:
+        return [f'user_{i}' for i in range(self.config.users)]
+
+    def profile(self, user_id: str) -> Dict[str, Any]:
+        rng = self._rng('profile', user_id)
+        return {
+            'id': user_id,
+            'display_name': f'Fake User {user_id.split("_")[-1]}',
+            'email': f'{user_id}@example.com',
+            'country': rng.choice(['US', 'GB', 'DE', 'SE', 'BR', 'JP']),
+            'product': 'premium',
+            'followers': {'href': None, 'total': rng.randint(0, 500)},
+            'images': [{'url': f'https://i.scdn.co/image/{spotify_id("image", user_id)}', 'height': 300, 'width': 300}],
+            'external_urls': {'spotify': f'https://open.spotify.com/user/{user_id}'},
+            'type': 'user',
+            'uri': f'spotify:user:{user_id}'
+        }
+
+    def artist(self, index: int) -> Dict[str, Any]:
+        rng = self._rng('artist', index)
+        artist_id = self.artist_ids[index]
+        return {
+            'id': artist_id,
+            'name': f'Artist {index}',
+            'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'popularity': rng.randint(10, 100),
+            'followers': {'href': None, 'total': rng.randint(100, 5000000)},
+            'images': [{'url': f'https://i.scdn.co/image/{spotify_id("artist-image", index)}',
+                        'height': 640, 'width': 640}],
+            'external_urls': {'spotify': f'https://open.spotify.com/artist/{artist_id}'},
+            'type': 'artist',
+            'uri': f'spotify:artist:{artist_id}'
+        }
+
+    def _simple_artist(self, index: int) -> Dict[str, Any]:
+        artist_id = self.artist_ids[index]
+        return {'id': artist_id, 'name': f'Artist {index}', 'type': 'artist', 'uri': f'spotify:artist:{artist_id}',
+                'external_urls': {'spotify': f'https://open.spotify.com/artist/{artist_id}'}}
+
+    def track(self, index: int) -> Dict[str, Any]:
+        rng = self._rng('track', index)
+        track_id = self.track_ids[index]
+        artist_index = rng.randrange(self.config.artists)
+        album_index = index // 10
+        album_id = spotify_id('album', album_index)
+        return {
+            'id': track_id,
+            'name': f'Track {index}',
+            'artists': [self._simple_artist(artist_index)],
+            'album': {
+                'id': album_id,
+                'name': f'Album {album_index}',
+                'album_type': 'album',
+                'release_date': f'{rng.randint(1970, 2025)}-{rng.randint(1, 12):02d}-01',
+                'images': [{'url': f'https://i.scdn.co/image/{spotify_id("album-image", album_index)}',
+                            'height': 640, 'width': 640}],
+                'artists': [self._simple_artist(artist_index)],
+                'uri': f'spotify:album:{album_id}'
+            },
+            'duration_ms': rng.randint(120000, 360000),
+            'popularity': rng.randint(0, 100),
+            'explicit': rng.random() < 0.2,
+            'preview_url': None,
+            'available_markets': ['US', 'GB', 'DE', 'SE', 'BR', 'JP'],
+            'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'},
+            'type': 'track',
+            'uri': f'spotify:track:{track_id}'
+        }
+
+    def audio_features(self, track_id: str) -> Optional[Dict[str, Any]]:
+        index = self.track_index.get(track_id)
+        if index is None:
+            return None
+        rng = self._rng('features', index)
+        return {
+            'id': track_id,
+            'danceability': round(rng.random(), 3),
+            'energy': round(rng.random(), 3),
+            'valence': round(rng.random(), 3),
+            'acousticness': round(rng.random(), 3),
+            'instrumentalness': round(rng.random() ** 3, 3),
+            'speechiness': round(rng.random() / 3, 3),
+            'liveness': round(rng.random() / 2, 3),
+            'loudness': round(-rng.random() * 20, 3),
+            'tempo': round(rng.uniform(60, 180), 3),
+            'key': rng.randint(0, 11),
+            'mode': rng.randint(0, 1),
+            'time_signature': 4,
+            'duration_ms': self.track(index)['duration_ms'],
+            'type': 'audio_features',
+            'uri': f'spotify:track:{track_id}'
+        }
+
+    def top_indexes(self, user_id: str, kind: str, time_range: str) -> List[int]:
+        size = self.config.tracks if kind == 'tracks' else self.config.artists
+        return self._rng('top', user_id, kind, time_range).sample(range(size), min(self.config.top_items, size))
+
+    def followed_artist_ids(self, user_id: str) -> List[str]:
+        indexes = self._rng('follows', user_id).sample(range(self.config.artists),
+                                                        min(self.config.follows, self.config.artists))
+        return sorted(self.artist_ids[i] for i in indexes)  # Spotify orders follows by artist ID
+
+    def plays(self, user_id: str, after_ms: Optional[int], before_ms: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """Plays happen every play_interval seconds; returns the newest matching ones."""
+        interval = self.config.play_interval
+        slot = int(time.time()) // interval
+        if before_ms is not None:
+            slot = min(slot, (before_ms - 1) // 1000 // interval)
+
+        plays = []
+        while len(plays) < limit and slot >= 0:
+            played_at = slot * interval
+            if after_ms is not None and played_at * 1000 <= after_ms:
+                break
+            index = self._rng('play', user_id, slot).randrange(self.config.tracks)
+            plays.append({
+                'played_at': datetime.fromtimestamp(played_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'track': self.track(index),
+                'context': None
+            })
+            slot -= 1
+        return plays
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeSpotifyConfig):
+        super().__init__(address, FakeSpotifyHandler)
+        self.config = config
+        self.catalogue = Catalogue(config)
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.playlists: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'rate_limited': 0, 'errors': 0}
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    # Response helpers
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        headers = dict(headers or {})
+
+        if status == 200 and self.command == 'GET' and self.server.config.etags:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                self.server.count('not_modified')
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        self._send_json(status, {'error': {'status': status, 'message': message}}, headers)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _current_user(self) -> Optional[str]:
+        auth = self.headers.get('Authorization', '')
+        if not auth.startswith('Bearer fake-'):
+            return None
+        user_id = auth[len('Bearer fake-'):].rsplit('-', 1)[0]
+        return user_id if user_id in self.server.catalogue.user_ids() else None
+
+    # Dispatch
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+        if path == '/authorize':
+            return self._authorize(query)
+        if path == '/api/token':
+            return self._token()
+        if path == '/_stats':
+            return self._send_json(200, self.server.stats)
+        if not path.startswith('/v1/'):
+            return self._send_error(404, 'Not found')
+
+        self.server.count('requests')
+        config = self.server.config
+        if config.latency_ms or config.jitter_ms:
+            time.sleep(max(0.0, config.latency_ms + (self.server.roll() * 2 - 1) * config.jitter_ms) / 1000)
+        if config.rate_limit_rate and self.server.roll() < config.rate_limit_rate:
+            self.server.count('rate_limited')
+            return self._send_error(429, 'API rate limit exceeded', {'Retry-After': str(config.retry_after)})
+        if config.error_rate and self.server.roll() < config.error_rate:
+            self.server.count('errors')
+            return self._send_error(503, 'Service unavailable')
+
+        user_id = self._current_user()
+        if not user_id:
+            return self._send_error(401, 'Invalid access token')
+
+        status, payload = self._api(path[len('/v1'):], query, user_id)
+        if status == 200:
+            self.server.count('ok')
+        self._send_json(status, payload)
+
+    # Accounts service
+
+    def _authorize(self, query: Dict[str, str]):
+        user_id = query.get('user', self.server.config.default_user)
+        params = {'code': f'code-{user_id}'}
+        if 'state' in query:
+            params['state'] = query['state']
+        self.send_response(302)
+        self.send_header('Location', f"{query.get('redirect_uri', '/')}?{urlencode(params)}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _token(self):
+        form = {key: values[-1] for key, values in parse_qs(self._read_body().decode()).items()}
+        if form.get('grant_type') == 'authorization_code':
+            user_id = form.get('code', '')[len('code-'):]
+        elif form.get('grant_type') == 'refresh_token':
+            user_id = form.get('refresh_token', '')[len('refresh-'):]
+        else:
+            return self._send_json(400, {'error': 'unsupported_grant_type'})
+
+        if user_id not in self.server.catalogue.user_ids():
+            return self._send_json(400, {'error': 'invalid_grant'})
+
+        self._send_json(200, {
+            'access_token': f'fake-{user_id}-{int(time.time() * 1000)}',
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+            'refresh_token': f'refresh-{user_id}',
+            'scope': form.get('scope', '')
+        })
+
+    # Web API
+
+    def _api(self, path: str, query: Dict[str, str], user_id: str) -> Tuple[int, Any]:
+        catalogue = self.server.catalogue
+        parts = path.strip('/').split('/')
+
+        if path == '/me':
+            return 200, catalogue.profile(user_id)
+
+        if len(parts) == 3 and parts[:2] == ['me', 'top'] and parts[2] in ('tracks', 'artists'):
+            time_range = query.get('time_range', 'medium_term')
+            if time_range not in TIME_RANGES:
+                return 400, {'error': {'status': 400, 'message': 'Invalid time range'}}
+            indexes = catalogue.top_indexes(user_id, parts[2], time_range)
+            build = catalogue.track if parts[2] == 'tracks' else catalogue.artist
+            return 200, self._offset_page(path, query, [build(i) for i in self._slice(indexes, query)], len(indexes))
+
+        if path == '/me/player/recently-played':
+            limit = min(int(query.get('limit', 20)), 50)
+            after = int(query['after']) if 'after' in query else None
+            before = int(query['before']) if 'before' in query else None
+            plays = catalogue.plays(user_id, after, before, limit)
+            cursors = None
+            if plays:
+                newest = int(datetime.fromisoformat(plays[0]['played_at'].replace('Z', '+00:00')).timestamp() * 1000)
+                oldest = int(datetime.fromisoformat(plays[-1]['played_at'].replace('Z', '+00:00')).timestamp() * 1000)
+                cursors = {'after': str(newest), 'before': str(oldest)}
+            return 200, {'items': plays, 'limit': limit, 'cursors': cursors,
+                         'next': f'/v1{path}?before={cursors["before"]}' if plays and len(plays) == limit else None,
+                         'href': f'/v1{path}'}
+
+        if path == '/me/following':
+            limit = min(int(query.get('limit', 20)), 50)
+            followed = catalogue.followed_artist_ids(user_id)
+            start = followed.index(query['after']) + 1 if query.get('after') in followed else 0
+            ids = followed[start:start + limit]
+            more = start + limit < len(followed)
+            return 200, {'artists': {
+                'items': [catalogue.artist(catalogue.artist_index[artist_id]) for artist_id in ids],
+                'limit': limit,
+                'total': len(followed),
+                'cursors': {'after': ids[-1] if more else None},
+                'next': f'/v1{path}?type=artist&after={ids[-1]}&limit={limit}' if more else None,
+                'href': f'/v1{path}'
+            }}
+
+        if path == '/audio-features':
+            return 200, {'audio_features': [catalogue.audio_features(track_id)
+                                            for track_id in query.get('ids', '').split(',')[:100]]}
+
+        if path in ('/tracks', '/artists'):
+            kind = path[1:]
+            index = catalogue.track_index if kind == 'tracks' else catalogue.artist_index
+            build = catalogue.track if kind == 'tracks' else catalogue.artist
+            return 200, {kind: [build(index[item_id]) if item_id in index else None
+                                for item_id in query.get('ids', '').split(',')[:50]]}
+
+        if len(parts) == 2 and parts[0] in ('tracks', 'artists'):
+            index = catalogue.track_index if parts[0] == 'tracks' else catalogue.artist_index
+            if parts[1] not in index:
+                return 404, {'error': {'status': 404, 'message': 'Non existing id'}}
+            build = catalogue.track if parts[0] == 'tracks' else catalogue.artist
+            return 200, build(index[parts[1]])
+
+        if path == '/recommendations':
+            limit = min(int(query.get('limit', 20)), 100)
+            rng = random.Random(f'{self.server.config.seed}:recommendations:{query.get("seed_tracks")}:'
+                                f'{query.get("seed_artists")}')
+            return 200, {'tracks': [catalogue.track(i) for i in rng.sample(range(self.server.config.tracks), limit)],
+                         'seeds': []}
+
+        if self.command == 'POST' and len(parts) == 3 and parts[0] == 'users' and parts[2] == 'playlists':
+            body = json.loads(self._read_body() or b'{}')
+            with self.server.lock:
+                playlist_id = spotify_id('playlist', len(self.server.playlists))
+                self.server.playlists[playlist_id] = {'owner': user_id, 'tracks': []}
+            return 201, {'id': playlist_id, 'name': body.get('name'), 'description': body.get('description'),
+                         'public': body.get('public', True),
+                         'external_urls': {'spotify': f'https://open.spotify.com/playlist/{playlist_id}'}}
+
+        if self.command == 'POST' and len(parts) == 3 and parts[0] == 'playlists' and parts[2] == 'tracks':
+            body = json.loads(self._read_body() or b'{}')
+            uris = body if isinstance(body, list) else body.get('uris', [])
+            playlist = self.server.playlists.get(parts[1])
+            if playlist is None:
+                return 404, {'error': {'status': 404, 'message': 'Not found'}}
+            with self.server.lock:
+                playlist['tracks'].extend(uris)
+            return 201, {'snapshot_id': spotify_id('snapshot', len(playlist['tracks']))}
+
+        return 404, {'error': {'status': 404, 'message': 'Service not found'}}
+
+    @staticmethod
+    def _slice(items: List[Any], query: Dict[str, str]) -> List[Any]:
+        limit = min(int(query.get('limit', 20)), 50)
+        offset = int(query.get('offset', 0))
+        return items[offset:offset + limit]
+
+    @staticmethod
+    def _offset_page(path: str, query: Dict[str, str], items: List[Any], total: int) -> Dict[str, Any]:
+        limit = min(int(query.get('limit', 20)), 50)
+        offset = int(query.get('offset', 0))
+        time_range = query.get('time_range', 'medium_term')
+        next_offset = offset + limit
+        return {
+            'items': items,
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'next': f'/v1{path}?limit={limit}&offset={next_offset}&time_range={time_range}'
+                    if next_offset < total else None,
+            'previous': None,
+            'href': f'/v1{path}'
+        }
+
+def start_fake_spotify(config: Optional[FakeSpotifyConfig] = None, host: str = '127.0.0.1',
+                       port: int = 0) -> FakeSpotifyServer:
+    """Start the fake API on a background thread (port 0 picks a free port)."""
+    server = FakeSpotifyServer((host, port), config or FakeSpotifyConfig())
+    threading.Thread(target=server.serve_forever, name='fake-spotify', daemon=True).start()
+    return server
+
+def main():
+    defaults = FakeSpotifyConfig()
+    parser = argparse.ArgumentParser(description='Local fake Spotify Web API for offline benchmarking')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--users', type=int, default=defaults.users)
+    parser.add_argument('--default-user', default=defaults.default_user)
+    parser.add_argument('--tracks', type=int, default=defaults.tracks, help='catalogue size')
+    parser.add_argument('--artists', type=int, default=defaults.artists)
+    parser.add_argument('--top-items', type=int, default=defaults.top_items)
+    parser.add_argument('--follows', type=int, default=defaults.follows)
+    parser.add_argument('--play-interval', type=int, default=defaults.play_interval, help='seconds between plays')
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms)
+    parser.add_argument('--jitter-ms', type=float, default=defaults.jitter_ms)
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate)
+    parser.add_argument('--rate-limit-rate', type=float, default=defaults.rate_limit_rate)
+    parser.add_argument('--retry-after', type=float, default=defaults.retry_after)
+    parser.add_argument('--no-etags', action='store_true')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = FakeSpotifyConfig(
+        users=args.users, default_user=args.default_user, tracks=args.tracks, artists=args.artists,
+        top_items=args.top_items, follows=args.follows, play_interval=args.play_interval,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, etags=not args.no_etags,
+        seed=args.seed)
+
+    server = FakeSpotifyServer((args.host, args.port), config)
+    print("Fake Spotify Web API")
+    print("=" * 60)
+    print(f"🎧 Serving {config.users} users, {config.tracks} tracks, {config.artists} artists")
+    print(f"🌐 Listening on {server.base_url}")
+    print("\nPoint the backend at it with:")
+    print(f"   SPOTIFY_API_BASE_URL={server.base_url}/v1/")
+    print(f"   SPOTIFY_ACCOUNTS_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Move user directories from the flat layout (data/<user_id>) to the
+hash-sharded layout (data/_shards/ab/cd/<user_id>).
+
+Safe to run while the app is serving: each directory is moved with a
+single rename and a symlink is left at the old path, so workers still
+holding an old path keep reading and writing the same files. Run again
+with --prune-links once every worker has been restarted; that also
+removes the per-file .lock files older versions left in user directories.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+import json_storage as storage
+
+def legacy_user_dirs():
+    """Flat-layout user directories that haven't been moved yet."""
+    return [(user_id, path) for user_id, path in storage.iter_user_dirs()
+            if path == storage.get_legacy_user_dir(user_id)]
+
+def migrate_user(user_id: str, dry_run: bool = False) -> bool:
+    """Move one user's directory into its shard and link the old path to it."""
+    legacy_dir = storage.get_legacy_user_dir(user_id)
+    shard_dir = storage.get_shard_dir(user_id)
+
+    if os.path.exists(shard_dir):
+        print(f"   ⚠️  {user_id}: {shard_dir} already exists, skipping")
+        return False
+    if dry_run:
+        print(f"   - {user_id} -> {os.path.relpath(shard_dir, storage.STORAGE_DIR)}")
+        return True
+
+    os.makedirs(os.path.dirname(shard_dir), exist_ok=True)
+    os.rename(legacy_dir, shard_dir)
+    try:
+        os.symlink(os.path.relpath(shard_dir, storage.STORAGE_DIR), legacy_dir, target_is_directory=True)
+    except OSError as e:
+        print(f"   ⚠️  {user_id}: moved, but could not link the old path ({e})")
+    print(f"   ✅ {user_id}")
+    return True
+
+def prune_links() -> int:
+    """Remove the symlinks left at old paths by earlier runs."""
+    removed = 0
+    with os.scandir(storage.STORAGE_DIR) as entries:
+        for entry in entries:
+            if entry.is_symlink() and entry.name != storage.SHARDS_DIR:
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+def prune_lock_files() -> int:
+    """Remove the <file>.lock files older versions kept next to each data file."""
+    removed = 0
+    for _, user_dir in storage.iter_user_dirs():
+        with os.scandir(user_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.lock') and entry.is_file():
+                    os.remove(entry.path)
+                    removed += 1
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='Show what would be moved')
+    parser.add_argument('--prune-links', action='store_true',
+                        help='Remove symlinks left at old paths and old per-file lock files')
+    args = parser.parse_args()
+
+    print("Storage Layout Migration")
+    print("=" * 60)
+    print(f"📁 Storage directory: {storage.STORAGE_DIR}")
+
+    if not os.path.isdir(storage.STORAGE_DIR):
+        print("❌ Storage directory not found, nothing to migrate")
+        return
+
+    if args.prune_links:
+        print(f"✅ Removed {prune_links()} old-path links")
+        print(f"✅ Removed {prune_lock_files()} old lock files")
+        return
+
+    users = legacy_user_dirs()
+    print(f"\n👤 {len(users)} users in the flat layout")
+    # Manifests move with their directories and the storage index is keyed by
+    # user ID, not path, so nothing else needs updating
+    moved = sum(migrate_user(user_id, args.dry_run) for user_id, _ in users)
+    print(f"\n{'Would move' if args.dry_run else 'Moved'} {moved} of {len(users)} users")
+
+if __name__ == "__main__":
+    main()
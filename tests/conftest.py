@@ -0,0 +1,47 @@
+"""Shared fixtures for the offline tests."""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import json_storage as storage
+from storage_cache import read_cache
+
+_original_storage_dir = storage.STORAGE_DIR
+_import_storage_dir = None
+
+def pytest_configure(config):
+    # Importing app creates the storage directory, so point it somewhere
+    # disposable before test modules are collected
+    global _import_storage_dir
+    _import_storage_dir = tempfile.mkdtemp(prefix='storage-import-')
+    storage.STORAGE_DIR = _import_storage_dir
+
+def pytest_unconfigure(config):
+    storage.STORAGE_DIR = _original_storage_dir
+    if _import_storage_dir:
+        shutil.rmtree(_import_storage_dir, ignore_errors=True)
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    """Point json_storage at an empty directory, with optional features off.
+
+    Tests turn features on with ``monkeypatch``; everything is restored
+    after the test and queued writes are flushed first.
+    """
+    directory = str(tmp_path / 'data')
+    monkeypatch.setattr(storage, 'STORAGE_DIR', directory)
+    monkeypatch.setattr(storage, 'STORAGE_ENTITY_STORE', False)
+    monkeypatch.setattr(storage, 'STORAGE_WRITE_BEHIND', False)
+    monkeypatch.setattr(storage.write_behind, 'delay', storage.write_behind.delay)
+    read_cache.clear()
+    yield directory
+    storage.write_behind.flush()
+    read_cache.clear()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test script to verify the persistent audio features store (runs offline)."""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import app
+from audio_features_store import AudioFeaturesStore
+
+def features(track_id):
+    return {'id': track_id, 'energy': 0.5, 'valence': 0.25, 'tempo': 120.0}
+
+class FakeSpotify:
+    user_key = 'user_1'
+
+    def __init__(self):
+        self.calls = []
+
+    def audio_features(self, track_ids):
+        self.calls.append(list(track_ids))
+        return [features(track_id) if track_id != 'no_features' else None for track_id in track_ids]
+
+def age_rows(store, days):
+    conn = sqlite3.connect(store.db_path)
+    conn.execute('UPDATE audio_features SET fetched_at = ?', ((datetime.now() - timedelta(days=days)).isoformat(),))
+    conn.commit()
+    conn.close()
+
+def test_round_trip(tmp_path):
+    """Stored features come back as stored, across query chunks, with None for featureless tracks."""
+    store = AudioFeaturesStore(str(tmp_path / 'audio_features.db'))
+    stored = {f'track_{i}': features(f'track_{i}') for i in range(1200)}
+    stored['no_features'] = None
+    store.put_many(stored)
+
+    found = store.get_many(list(stored) + ['unknown'])
+    assert found == stored
+    assert 'unknown' not in found and found['no_features'] is None
+    stats = store.get_stats()
+    print(f"✅ Round trip of {len(found)} tracks, stats: {stats}")
+    assert stats['hits'] == 1201 and stats['misses'] == 1 and stats['stored'] == 1201
+
+def test_missing_features_expire(tmp_path):
+    """Featureless answers expire after the TTL; real features never do."""
+    store = AudioFeaturesStore(str(tmp_path / 'audio_features.db'), missing_ttl_days=30)
+    store.put_many({'track_1': features('track_1'), 'no_features': None})
+
+    age_rows(store, 29)
+    assert set(store.get_many(['track_1', 'no_features'])) == {'track_1', 'no_features'}
+    age_rows(store, 31)
+    assert set(store.get_many(['track_1', 'no_features'])) == {'track_1'}
+    print("✅ Missing-features entries expire after the TTL")
+
+def test_known_tracks_skip_the_api(storage_dir):
+    """get_audio_features only asks Spotify for tracks the store doesn't know."""
+    sp = FakeSpotify()
+    first = app.get_audio_features(sp, ['track_1', 'track_2', 'no_features'])
+    assert [f['id'] for f in first] == ['track_1', 'track_2'] and len(sp.calls) == 1
+
+    second = app.get_audio_features(sp, ['track_2', 'no_features', 'track_1', 'track_3'])
+    print(f"✅ Upstream calls: {sp.calls}")
+    assert sp.calls[1:] == [['track_3']]
+    assert [f['id'] for f in second] == ['track_2', 'track_1', 'track_3']
+
+    sp.calls.clear()
+    app.get_audio_features(sp, ['track_1', 'track_2', 'track_3', 'no_features'])
+    assert sp.calls == []
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Test script to verify the cursor-paginated followed-artists sync (runs offline)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import app
+import json_storage as storage
+
+class FakeSpotify:
+    """Serves followed artists ordered by ID with `after` cursors, like the real endpoint."""
+
+    def __init__(self, count):
+        self.artist_ids = [f'artist_{i:04d}' for i in range(count)]
+        self.calls = 0
+
+    def current_user_followed_artists(self, limit=20, after=None):
+        self.calls += 1
+        start = self.artist_ids.index(after) + 1 if after else 0
+        ids = self.artist_ids[start:start + limit]
+        more = start + limit < len(self.artist_ids)
+        return {'artists': {
+            'items': [{'id': artist_id, 'name': artist_id} for artist_id in ids],
+            'next': 'next' if more else None,
+            'cursors': {'after': ids[-1] if more else None},
+            'total': len(self.artist_ids)
+        }}
+
+def sync_followed(sp, force=False):
+    jobs = {job.name: job for job in app.plan_sync_jobs(sp, 'user_1', force=force, time_ranges=[])}
+    return jobs['followed_artists'].func()
+
+def test_followed_artists_follow_cursors(storage_dir):
+    """Every page is followed and streamed into the usual wrapped format."""
+    sp = FakeSpotify(1234)
+    assert sync_followed(sp, force=True) == 1234
+    assert sp.calls == 25
+
+    stored = storage.load_data('user_1', 'followed_artists')
+    print(f"✅ Stored {len(stored['data'])} followed artists in {sp.calls} calls")
+    assert [a['id'] for a in stored['data']] == sp.artist_ids
+    assert stored['data_type'] == 'followed_artists'
+
+def test_follow_and_unfollow_resync(storage_dir):
+    """Swapping one follow for another keeps the total, but the stored list still changes."""
+    sp = FakeSpotify(1234)
+    sync_followed(sp, force=True)
+
+    sp.artist_ids.remove('artist_1000')
+    sp.artist_ids.append('artist_9999')
+    sp.calls = 0
+    assert sync_followed(sp) == 1234
+    assert sp.calls == 25
+    stored_ids = [a['id'] for a in storage.load_data('user_1', 'followed_artists')['data']]
+    print(f"✅ Follow/unfollow resync took {sp.calls} calls")
+    assert stored_ids == sp.artist_ids
+    assert 'artist_1000' not in stored_ids and 'artist_9999' in stored_ids
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
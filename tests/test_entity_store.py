@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test script to verify the shared track/artist entity store (runs offline)."""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+import storage_codecs
+from projections import project_tracks
+from storage_cache import read_cache
+
+def track(i):
+    return {'id': f'track_{i}', 'name': f'Track {i}', 'duration_ms': 200000 + i, 'popularity': i % 100,
+            'artists': [{'id': f'artist_{i % 7}', 'name': f'Artist {i % 7}'}],
+            'album': {'id': f'album_{i % 30}', 'name': f'Album {i % 30}', 'images': [{'url': f'https://img/{i}'}]}}
+
+def refcounts():
+    conn = sqlite3.connect(storage.entity_store.db_path)
+    try:
+        return dict(conn.execute('SELECT entity_id, refcount FROM entities'))
+    finally:
+        conn.close()
+
+@pytest.fixture
+def entity_storage(storage_dir, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_ENTITY_STORE', True)
+
+def test_ranges_and_users_share_entities(entity_storage):
+    ranges = {'short_term': range(0, 50), 'medium_term': range(0, 100), 'long_term': range(25, 125)}
+    for user_id in ('user_1', 'user_2'):
+        for time_range, ids in ranges.items():
+            assert storage.save_top_tracks(user_id, [track(i) for i in ids], time_range)
+
+    stats = storage.entity_store.get_stats()
+    assert stats['entities'] == 125
+    assert refcounts()['track_30'] == 6 and refcounts()['track_110'] == 2
+
+    read_cache.clear()
+    loaded = storage.load_top_tracks('user_2', 'long_term')
+    assert loaded == project_tracks([track(i) for i in ranges['long_term']])
+    assert storage.load_top_tracks('user_2', 'long_term', limit=3) == loaded[:3]
+
+    # Range files hold only keys
+    raw = storage_codecs.load_file(storage.get_file_path('user_1', 'top_tracks', 'medium_term'))
+    assert raw['entities'] == 'track' and all(isinstance(key, str) and len(key) == 64 for key in raw['data'])
+    print(f"✅ 6 range files, {stats['entities']} stored tracks ({stats['deduplicated']} deduplicated)")
+
+def test_references_follow_rewrites_and_deletes(entity_storage):
+    storage.save_top_tracks('user_1', [track(i) for i in range(10)], 'short_term')
+    storage.save_top_tracks('user_2', [track(i) for i in range(5)], 'short_term')
+
+    # A changed object is a new entity; the old version loses this file's reference
+    changed = track(0)
+    changed['popularity'] = 99
+    storage.save_top_tracks('user_1', [changed] + [track(i) for i in range(1, 8)], 'short_term')
+    counts = refcounts()
+    assert counts['track_9'] == 0 and counts['track_4'] == 2
+    assert storage.collect_entity_garbage() == 2  # track_8 and track_9
+    assert storage.entity_store.get_stats()['entities'] == 9  # 10 originals - 2 + changed track_0
+
+    storage.clear_user_data('user_2')
+    assert storage.collect_entity_garbage() == 1  # The old track_0 only user_2 listed
+    assert storage.load_top_tracks('user_1', 'short_term')[0]['popularity'] == 99
+
+def test_switching_off_and_recount(entity_storage, monkeypatch):
+    storage.save_top_tracks('user_1', [track(i) for i in range(10)], 'long_term')
+    storage.save_top_tracks('user_1', [track(i) for i in range(10)], 'medium_term')
+
+    # Drift the counts as a crash would, then recount from the files
+    conn = sqlite3.connect(storage.entity_store.db_path)
+    conn.execute('UPDATE entities SET refcount = 0')
+    conn.commit()
+    conn.close()
+    assert storage.collect_entity_garbage(recount=True) == 0
+    assert set(refcounts().values()) == {2}
+
+    # Plain saves release the file's references
+    monkeypatch.setattr(storage, 'STORAGE_ENTITY_STORE', False)
+    storage.save_top_tracks('user_1', [track(i) for i in range(3)], 'long_term')
+    assert set(refcounts().values()) == {1}
+    assert storage.load_top_tracks('user_1', 'long_term') == project_tracks([track(i) for i in range(3)])
+    assert len(storage.load_top_tracks('user_1', 'medium_term')) == 10
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline fake Spotify API (runs offline).
+Logs in, syncs and reads data through the real Flask app against
+scripts/utils/fake_spotify_server.py.
+"""
+
+import os
+import sys
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'scripts', 'utils'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import app
+import json_storage as storage
+import requests
+import spotify_clients
+from spotipy.cache_handler import MemoryCacheHandler
+from fake_spotify_server import FakeSpotifyConfig, start_fake_spotify
+
+def login(client, server, user_id):
+    """Walk the OAuth redirect flow against the fake accounts service."""
+    authorize_url = client.get('/login').headers['Location']
+    assert authorize_url.startswith(server.base_url)
+
+    redirect = requests.get(authorize_url + f'&user={user_id}', allow_redirects=False).headers['Location']
+    code = parse_qs(urlparse(redirect).query)['code'][0]
+    response = client.get(f'/callback?code={code}')
+    assert response.status_code == 302, response.get_json()
+
+def test_login_and_sync_against_fake_api(storage_dir, monkeypatch):
+    """A full sync pulls every page of the synthetic catalogue."""
+    server = start_fake_spotify(FakeSpotifyConfig(users=3, tracks=600, artists=300, top_items=120, follows=75))
+    monkeypatch.setattr(spotify_clients, 'SPOTIFY_API_BASE_URL', server.base_url + '/v1/')
+    monkeypatch.setattr(app.sp_oauth, 'OAUTH_AUTHORIZE_URL', server.base_url + '/authorize')
+    monkeypatch.setattr(app.sp_oauth, 'OAUTH_TOKEN_URL', server.base_url + '/api/token')
+    monkeypatch.setattr(app.sp_oauth, 'cache_handler', MemoryCacheHandler())  # Don't leave a .cache file behind
+    try:
+        client = app.app.test_client()
+        login(client, server, 'user_2')
+
+        user = client.get('/api/user').get_json()
+        assert user['id'] == 'user_2'
+
+        result = client.post('/api/sync', json={'force': True}).get_json()['stats']
+        print(f"✅ Sync stats: {result}")
+        assert result['tracks_synced'] == 3 * 120
+        assert result['artists_synced'] == 3 * 120
+        assert len(storage.load_data('user_2', 'followed_artists')['data']) == 75
+
+        recent = client.get('/api/recently-played').get_json()
+        assert len(recent['items']) == 50
+
+        # Unchanged data is revalidated with If-None-Match instead of downloaded again
+        client.post('/api/sync', json={'force': True})
+        print(f"✅ Fake API stats: {server.stats}")
+        assert server.stats['not_modified'] > 0
+    finally:
+        server.shutdown()
+
+def test_injected_rate_limits_are_absorbed(monkeypatch):
+    """429s from the fake API are retried by the scheduler instead of failing calls."""
+    server = start_fake_spotify(FakeSpotifyConfig(rate_limit_rate=0.3, retry_after=0.05, seed=7))
+    monkeypatch.setattr(spotify_clients, 'SPOTIFY_API_BASE_URL', server.base_url + '/v1/')
+    try:
+        sp = spotify_clients.PooledSpotify(auth='fake-user_0-1', requests_session=spotify_clients.build_http_session(4))
+        names = [sp.current_user()['id'] for _ in range(10)]
+        print(f"✅ Fake API stats: {server.stats}")
+        assert names == ['user_0'] * 10
+        assert server.stats['rate_limited'] > 0
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Test script to verify cross-request batching of audio features lookups (runs offline)."""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from feature_batcher import AudioFeaturesBatcher
+from spotify_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, current_priority, lane
+
+class FakeSpotify:
+    def __init__(self, user_key=None):
+        self.user_key = user_key
+        self.calls = []
+        self.lanes = []
+        self.lock = threading.Lock()
+
+    def audio_features(self, track_ids):
+        with self.lock:
+            self.calls.append(list(track_ids))
+            self.lanes.append(current_priority())
+        time.sleep(0.05)
+        return [{'id': track_id, 'energy': 0.5} if track_id != 'no_features' else None for track_id in track_ids]
+
+def test_concurrent_requests_share_full_batches():
+    """Overlapping requests from many callers collapse into deduplicated 100-ID calls."""
+    batcher = AudioFeaturesBatcher(window_ms=30)
+    sp = FakeSpotify()
+    results = []
+
+    def request(offset):
+        ids = [f'track_{i}' for i in range(offset, offset + 60)] + ['no_features']
+        results.append(batcher.fetch(sp, ids))
+
+    threads = [threading.Thread(target=request, args=(k * 30,)) for k in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    requested = [track_id for call in sp.calls for track_id in call]
+    print(f"✅ {len(sp.calls)} upstream calls, stats: {batcher.get_stats()}")
+    assert len(requested) == len(set(requested)) == 271
+    assert all(len(call) <= 100 for call in sp.calls)
+    assert len(sp.calls) < 8
+    assert all(len(result) == 61 and result['no_features'] is None for result in results)
+
+def test_failed_batch_is_left_out():
+    """IDs whose upstream call failed are omitted so they are retried later."""
+    class FailingSpotify:
+        def audio_features(self, track_ids):
+            raise RuntimeError('upstream down')
+
+    batcher = AudioFeaturesBatcher(window_ms=5)
+    result = batcher.fetch(FailingSpotify(), ['track_1', 'track_2'])
+    print(f"✅ Failed batch result: {result}")
+    assert result == {}
+    assert batcher.get_stats()['pending'] == 0
+
+def request_concurrently(batcher, requests):
+    """Run (name, client, track IDs) lookups in threads started in order; return results by name."""
+    results = {}
+
+    def request(name, sp, ids):
+        results[name] = batcher.fetch(sp, ids)
+
+    threads = [threading.Thread(target=request, args=args) for args in requests]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)  # Keep the queueing order fixed
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_users_share_one_upstream_call():
+    """Two users' IDs are deduplicated into a single call."""
+    batcher = AudioFeaturesBatcher(window_ms=50)
+    sp_a, sp_b = FakeSpotify('user_a'), FakeSpotify('user_b')
+    results = request_concurrently(batcher, [('a', sp_a, ['track_1', 'track_2', 'only_a']),
+                                             ('b', sp_b, ['track_2', 'track_1', 'only_b'])])
+
+    calls = sp_a.calls + sp_b.calls
+    print(f"✅ Cross-user calls: {calls}")
+    assert calls == [['track_1', 'track_2', 'only_a', 'only_b']]
+    assert sorted(results['a']) == ['only_a', 'track_1', 'track_2']
+    assert sorted(results['b']) == ['only_b', 'track_1', 'track_2']
+    assert batcher.get_stats()['ids_shared'] == 2
+
+def test_failed_chunk_is_retried_with_each_waiters_client():
+    """A failing client only loses its own user's IDs; the other waiter's IDs are retried with their client."""
+    class UnauthorizedSpotify:
+        user_key = 'user_a'
+        calls = []
+
+        def audio_features(self, track_ids):
+            UnauthorizedSpotify.calls.append(list(track_ids))
+            raise RuntimeError('401 token expired')
+
+    batcher = AudioFeaturesBatcher(window_ms=50)
+    sp_b = FakeSpotify('user_b')
+    results = request_concurrently(batcher, [('a', UnauthorizedSpotify(), ['track_1', 'track_2', 'only_a']),
+                                             ('b', sp_b, ['track_1', 'track_2', 'only_b'])])
+
+    print(f"✅ Per-user results: a={sorted(results['a'])}, b={sorted(results['b'])}")
+    assert UnauthorizedSpotify.calls == [['track_1', 'track_2', 'only_a', 'only_b']]
+    assert sp_b.calls == [['track_1', 'track_2', 'only_b']]
+    assert sorted(results['a']) == ['track_1', 'track_2']
+    assert sorted(results['b']) == ['only_b', 'track_1', 'track_2']
+    stats = batcher.get_stats()
+    assert stats['retried_calls'] == 1 and stats['pending'] == 0
+
+def test_calls_run_in_the_callers_lane():
+    """Upstream calls keep the priority lane of the caller that queued the IDs."""
+    batcher = AudioFeaturesBatcher(window_ms=5)
+    sp = FakeSpotify('user_1')
+    with lane(PRIORITY_BACKGROUND):
+        batcher.fetch(sp, ['track_1'])
+    batcher.fetch(sp, ['track_2'])
+    print(f"✅ Lanes of upstream calls: {sp.lanes}")
+    assert sp.lanes == [PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE]
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_full_batches()
+    test_failed_batch_is_left_out()
+    test_users_share_one_upstream_call()
+    test_failed_chunk_is_retried_with_each_waiters_client()
+    test_calls_run_in_the_callers_lane()
+    print("Test complete!")
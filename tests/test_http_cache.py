@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Test script to verify the ETag / conditional-request cache (runs offline)."""
+
+import hashlib
+import json
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import requests
+from requests.adapters import BaseAdapter
+
+import app
+import json_storage as storage
+from http_cache import CachingSession, ResponseCache, cache_scope, response_cache
+from spotify_clients import PooledSpotify
+
+class FakeTransport(BaseAdapter):
+    """Serves paged top tracks with ETags and answers matching If-None-Match with 304."""
+
+    def __init__(self, count=120):
+        super().__init__()
+        self.track_ids = [f'track_{i}' for i in range(count)]
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        query = {key: values[0] for key, values in parse_qs(urlparse(request.url).query).items()}
+        limit, offset = int(query.get('limit', 20)), int(query.get('offset', 0))
+        ids = self.track_ids[offset:offset + limit]
+        body = json.dumps({
+            'items': [{'id': track_id, 'name': track_id, 'duration_ms': 1000} for track_id in ids],
+            'total': len(self.track_ids),
+            'next': 'more' if offset + limit < len(self.track_ids) else None
+        }).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        response = requests.Response()
+        response.request, response.url = request, request.url
+        response.headers['ETag'] = etag
+        if request.headers.get('If-None-Match') == etag:
+            response.status_code, response._content = 304, b''
+        else:
+            response.status_code, response._content = 200, body
+            response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def close(self):
+        pass
+
+def make_session(cache, transport):
+    session = CachingSession(cache)
+    session.mount('https://', transport)
+    return session
+
+def test_revalidation_serves_cached_body():
+    """The second GET sends If-None-Match and a 304 is answered from the cache."""
+    cache, transport = ResponseCache(), FakeTransport()
+    session = make_session(cache, transport)
+    url = 'https://api.spotify.com/v1/me/top/tracks?limit=50&offset=0'
+
+    with cache_scope('user_1'):
+        first = session.get(url)
+        second = session.get(url)
+    assert 'If-None-Match' not in transport.sent[0].headers
+    assert transport.sent[1].headers['If-None-Match'] == first.headers['ETag']
+    assert second.status_code == 200 and second.headers['X-Cache'] == 'revalidated'
+    assert second.json() == first.json()
+
+    # Other users and unscoped calls don't share the entry
+    with cache_scope('user_2'):
+        session.get(url)
+    session.get(url)
+    assert 'If-None-Match' not in transport.sent[2].headers and 'If-None-Match' not in transport.sent[3].headers
+
+    stats = cache.get_stats()
+    print(f"✅ Revalidated from cache: {stats}")
+    assert stats['hits'] == 1 and stats['bytes_saved'] == len(first.content)
+
+def test_eviction_keeps_the_byte_budget():
+    cache = ResponseCache(max_bytes=250)
+    for i in range(5):
+        cache.put(('user_1', f'url_{i}'), f'"{i}"', b'x' * 100, 'application/json')
+    assert cache.get(('user_1', 'url_0')) is None and cache.get(('user_1', 'url_2')) is None
+    assert cache.get(('user_1', 'url_3')) and cache.get(('user_1', 'url_4'))
+    assert cache.get_stats()['stored_bytes'] == 200
+
+    # Recently read entries survive; oversized bodies are never stored
+    cache.get(('user_1', 'url_3'))
+    cache.put(('user_1', 'url_5'), '"5"', b'x' * 100, None)
+    assert cache.get(('user_1', 'url_3')) and cache.get(('user_1', 'url_4')) is None
+    cache.put(('user_1', 'huge'), '"h"', b'x' * 300, None)
+    assert cache.get(('user_1', 'huge')) is None and cache.get_stats()['stored_bytes'] == 200
+    print("✅ Least recently used responses are evicted to stay within budget")
+
+def test_change_tracker_reports_unchanged_only_for_all_304s():
+    cache, transport = ResponseCache(), FakeTransport()
+    session = make_session(cache, transport)
+    urls = [f'https://api.spotify.com/v1/me/top/tracks?limit=50&offset={offset}' for offset in (0, 50)]
+
+    with cache_scope('user_1'):
+        with cache.track_changes() as changes:
+            session.get(urls[0])
+        assert not changes.unchanged and changes.fetched == 1
+
+        with cache.track_changes() as changes:
+            session.get(urls[0])
+            session.get(urls[1])  # Not cached yet
+        assert not changes.unchanged
+
+        with cache.track_changes() as changes:
+            for url in urls:
+                session.get(url)
+        assert changes.unchanged and changes.revalidated == 2
+
+    with cache.track_changes() as changes:
+        pass
+    assert not changes.unchanged  # Nothing fetched proves nothing
+    print("✅ ChangeTracker is unchanged only when every response was a 304")
+
+def test_unchanged_sync_skips_the_storage_rewrite(storage_dir, monkeypatch):
+    """A resync whose pages all come back 304 marks the file verified instead of rewriting it."""
+    transport = FakeTransport(count=120)
+    sp = PooledSpotify(auth='token', requests_session=make_session(response_cache, transport))
+    sp.user_key = 'user_1'
+    saves = []
+    real_save = storage.save_top_tracks
+    monkeypatch.setattr(storage, 'save_top_tracks', lambda *args, **kwargs: saves.append(args) or real_save(*args, **kwargs))
+
+    def sync():
+        jobs = {job.name: job for job in app.plan_sync_jobs(sp, 'user_1', force=True, time_ranges=['short_term'])}
+        return jobs['top_tracks:short_term'].func()
+
+    assert sync() == 120 and len(saves) == 1
+    entry = storage.get_manifest_entry('user_1', 'top_tracks', 'short_term')
+
+    sent = len(transport.sent)
+    assert sync() == 120 and len(saves) == 1
+    assert all('If-None-Match' in request.headers for request in transport.sent[sent:])
+    touched = storage.get_manifest_entry('user_1', 'top_tracks', 'short_term')
+    assert touched['sha256'] == entry['sha256'] and touched['verified_at'] > entry['verified_at']
+
+    transport.track_ids.insert(0, 'track_new')
+    assert sync() == 121 and len(saves) == 2
+    assert storage.load_top_tracks('user_1', 'short_term', limit=1)[0]['id'] == 'track_new'
+    print("✅ All-304 resync touched the stored file; a changed page rewrote it")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
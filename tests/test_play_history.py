@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Test script to verify the incremental play history log (runs offline)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+import play_history
+
+def make_play(minutes_ago, track_id, now=datetime(2024, 3, 1, 0, 30, tzinfo=timezone.utc)):
+    played_at = (now - timedelta(minutes=minutes_ago)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return {'played_at': played_at, 'track': {'id': track_id, 'name': track_id}}
+
+class FakeSpotify:
+    """Serves plays newest first, honouring the `after` cursor like the real endpoint."""
+
+    def __init__(self, plays):
+        self.plays = plays
+        self.calls = []
+
+    def current_user_recently_played(self, limit=50, after=None):
+        self.calls.append(after)
+        items = sorted(self.plays, key=lambda p: p['played_at'], reverse=True)
+        if after is not None:
+            items = [p for p in items if play_history.parse_played_at(p['played_at']).timestamp() * 1000 > after]
+        return {'items': items[:limit], 'next': None, 'cursors': None}
+
+def test_incremental_sync_appends_only_new_plays(storage_dir):
+    """Only plays newer than the cursor are fetched and history spans month segments."""
+    sp = FakeSpotify([make_play(m, f'track_{m}') for m in range(0, 90, 3)])
+
+    added = play_history.fetch_new_plays(sp, 'user_1')
+    assert added == 30 and sp.calls == [None]
+
+    # Same plays again plus two new ones: only the new ones land in the log
+    sp.plays += [make_play(-5, 'track_new_1'), make_play(-10, 'track_new_2')]
+    added = play_history.fetch_new_plays(sp, 'user_1')
+    assert added == 2 and sp.calls[-1] is not None
+
+    segments = sorted(os.listdir(play_history.get_history_dir('user_1')))
+    print(f"✅ Segments: {segments}")
+    assert '2024-02.jsonl' in segments and '2024-03.jsonl' in segments
+
+    history = play_history.load_plays('user_1')
+    assert len(history) == 32
+    assert [p['played_at'] for p in history] == sorted(p['played_at'] for p in history)
+
+    recent = play_history.load_recent('user_1', 5)
+    assert recent[0]['track']['id'] == 'track_new_2'
+
+    march = play_history.load_plays('user_1', since=datetime(2024, 3, 1, tzinfo=timezone.utc))
+    print(f"✅ {len(history)} plays stored, {len(march)} in March")
+    assert all(p['played_at'].startswith('2024-03') for p in march)
+
+def test_replayed_append_after_crash_is_not_duplicated(storage_dir):
+    """Plays appended before a crash that skipped the cursor write aren't stored twice."""
+    plays = [make_play(m, f'track_{m}') for m in range(0, 60, 3)]
+    assert play_history.append_plays('user_1', plays[10:]) == 10
+
+    # Simulate the crash: segments hold the new plays, the cursor still points before them
+    older_cursor = plays[12]['played_at']
+    play_history._write_cursor('user_1', older_cursor)
+    assert play_history.append_plays('user_1', plays) == 10
+    stored = [p['played_at'] for p in play_history.load_plays('user_1')]
+    print(f"✅ {len(stored)} plays stored after replaying the append")
+    assert len(stored) == len(set(stored)) == 20
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
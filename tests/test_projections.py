@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Test script to verify compact storage projections of Spotify objects (runs offline)."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+from projections import project_artist, project_track
+
+MARKETS = ['AD', 'AE', 'AG', 'AL', 'AM', 'AO', 'AR', 'AT', 'AU', 'AZ', 'BA', 'BB', 'BD', 'BE', 'BF', 'BG'] * 11
+
+def full_track(i):
+    """A track shaped like a real Web API response."""
+    images = [{'url': f'https://i.scdn.co/image/{size}_{i}', 'height': size, 'width': size} for size in (640, 300, 64)]
+    artist = {'id': f'artist_{i}', 'name': f'Artist {i}', 'type': 'artist', 'uri': f'spotify:artist:artist_{i}',
+              'href': f'https://api.spotify.com/v1/artists/artist_{i}',
+              'external_urls': {'spotify': f'https://open.spotify.com/artist/artist_{i}'}}
+    return {
+        'id': f'track_{i}', 'name': f'Track {i}', 'uri': f'spotify:track:track_{i}', 'type': 'track',
+        'duration_ms': 200000 + i, 'popularity': 50, 'explicit': False, 'preview_url': None,
+        'disc_number': 1, 'track_number': 3, 'is_local': False,
+        'available_markets': MARKETS,
+        'external_ids': {'isrc': f'USRC1{i:07d}'},
+        'external_urls': {'spotify': f'https://open.spotify.com/track/track_{i}'},
+        'href': f'https://api.spotify.com/v1/tracks/track_{i}',
+        'artists': [artist],
+        'album': {
+            'id': f'album_{i}', 'name': f'Album {i}', 'album_type': 'album', 'total_tracks': 12,
+            'release_date': '2020-01-01', 'release_date_precision': 'day', 'type': 'album',
+            'uri': f'spotify:album:album_{i}', 'href': f'https://api.spotify.com/v1/albums/album_{i}',
+            'available_markets': MARKETS, 'images': images, 'artists': [artist],
+            'external_urls': {'spotify': f'https://open.spotify.com/album/album_{i}'}
+        }
+    }
+
+def test_projection_keeps_read_fields_and_shrinks_files(storage_dir):
+    """Stored tracks keep every field the app reads and are several times smaller."""
+    tracks = [full_track(i) for i in range(200)]
+
+    storage.save_top_tracks('user_1', tracks, 'long_term')
+    stored = storage.load_top_tracks('user_1', 'long_term')
+    track = stored[0]
+    assert track['album']['images'][0]['url'] == 'https://i.scdn.co/image/640_0'
+    assert track['artists'][0]['name'] == 'Artist 0'
+    assert track['uri'] == 'spotify:track:track_0' and track['preview_url'] is None
+    assert 'available_markets' not in track
+    assert storage.has_current_projection('user_1', 'top_tracks', 'long_term')
+
+    full_size = len(json.dumps(tracks, indent=2))
+    projected_size = os.path.getsize(storage.get_file_path('user_1', 'top_tracks', 'long_term'))
+    print(f"✅ {full_size // 1024} KB -> {projected_size // 1024} KB ({full_size / projected_size:.1f}x smaller)")
+    assert full_size / projected_size >= 5
+
+def test_projection_is_idempotent():
+    track = project_track(full_track(1))
+    assert project_track(track) == track
+    artist = project_artist({'id': 'a', 'name': 'A', 'genres': ['pop'], 'followers': {'href': None, 'total': 5},
+                             'images': [], 'popularity': 3, 'uri': 'spotify:artist:a'})
+    assert project_artist(artist) == artist
+    assert artist['followers'] == {'total': 5}
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
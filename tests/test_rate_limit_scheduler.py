@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test harness for the Spotify request scheduler (runs offline).
+A local fake Spotify server answers a burst of requests with 429 storms so
+we can check that callers back off for Retry-After and that interactive
+calls are served ahead of background sync.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import spotify_clients
+from spotify_clients import PooledSpotify, build_http_session
+from spotify_scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RequestScheduler
+
+RETRY_AFTER = 0.4
+
+class StormHandler(BaseHTTPRequestHandler):
+    """Answers the first ``storm_size`` requests with 429, then succeeds."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_times.append(time.monotonic())
+            rate_limited = len(server.request_times) <= server.storm_size
+
+        if rate_limited:
+            self.send_response(429)
+            self.send_header('Retry-After', str(RETRY_AFTER))
+            body = json.dumps({'error': {'status': 429, 'message': 'API rate limit exceeded'}}).encode()
+        else:
+            self.send_response(200)
+            body = json.dumps({'id': 'fake_user', 'display_name': 'Fake User'}).encode()
+
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep test output readable
+
+def start_fake_spotify(storm_size: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StormHandler)
+    server.lock = threading.Lock()
+    server.request_times = []
+    server.storm_size = storm_size
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_429_storm_backoff(monkeypatch):
+    """Every caller succeeds after a 429 storm and nobody calls during the pause."""
+    server = start_fake_spotify(storm_size=5)
+    monkeypatch.setattr(spotify_clients, 'scheduler', RequestScheduler(
+        global_rate=50, global_burst=5, user_rate=50, user_burst=5, max_retries=5, backoff_base=0.05))
+    try:
+        http_session = build_http_session(8)
+        results, errors = [], []
+
+        def worker():
+            sp = PooledSpotify(auth='fake-token', requests_session=http_session)
+            sp.prefix = f'http://127.0.0.1:{server.server_address[1]}/v1/'
+            sp.user_key = 'fake_user'
+            try:
+                results.append(sp.current_user()['id'])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        stats = spotify_clients.scheduler.get_stats()
+        print(f"✅ {len(results)} calls succeeded, scheduler stats: {stats}")
+        assert not errors, errors
+        assert results == ['fake_user'] * 10
+        assert stats['rate_limited'] >= 1
+
+        # After the last 429 was answered, the next request must wait for Retry-After
+        storm_end = server.request_times[server.storm_size - 1]
+        after_storm = server.request_times[server.storm_size:]
+        assert after_storm and min(after_storm) - storm_end >= RETRY_AFTER * 0.9
+    finally:
+        server.shutdown()
+
+def test_interactive_lane_runs_first():
+    """Interactive callers are served before background callers queued earlier."""
+    scheduler = RequestScheduler(global_rate=20, global_burst=1, user_rate=100, user_burst=100)
+    order = []
+    lock = threading.Lock()
+
+    def caller(name, priority):
+        scheduler.acquire(f'user_{name}', priority)
+        with lock:
+            order.append(name)
+
+    scheduler.acquire('warmup', PRIORITY_INTERACTIVE)  # Empty the global bucket
+
+    threads = [threading.Thread(target=caller, args=(f'bg{i}', PRIORITY_BACKGROUND)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.01)
+    interactive = [threading.Thread(target=caller, args=(f'ui{i}', PRIORITY_INTERACTIVE)) for i in range(3)]
+    for thread in interactive:
+        thread.start()
+    for thread in threads + interactive:
+        thread.join(timeout=10)
+
+    print(f"✅ Service order: {order}")
+    assert len(order) == 8
+    # At most one background call can slip in before the interactive ones arrive
+    assert all(order.index(f'ui{i}') < 4 for i in range(3))
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Test script to verify single-flight coalescing of freshness syncs (runs offline)."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from singleflight import FileLockBackend, SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    """Callers with the same key wait on the one in-flight call."""
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return ['track_1', 'track_2']
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('user:top_tracks:short_term', fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"✅ {len(results)} callers, {len(calls)} fetch, stats: {flight.stats}")
+    assert len(calls) == 1
+    assert results == [['track_1', 'track_2']] * 5
+
+def test_shared_lock_backend_serializes_workers(tmp_path):
+    """With a shared lock backend, separate workers don't redo fresh work."""
+    lock_dir = str(tmp_path)
+    synced = []
+
+    def sync_if_stale():
+        if synced:
+            return 'already fresh'
+        time.sleep(0.1)
+        synced.append(1)
+        return 'synced'
+
+    # Two SingleFlight instances stand in for two worker processes
+    workers = [SingleFlight(FileLockBackend(lock_dir)) for _ in range(2)]
+    results = []
+    threads = [threading.Thread(target=lambda w=w: results.append(w.do('user:top_artists:long_term', sync_if_stale)))
+               for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"✅ Worker results: {sorted(results)}")
+    assert sorted(results) == ['already fresh', 'synced']
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
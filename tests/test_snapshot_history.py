@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Test script to verify delta-encoded top list history (runs offline)."""
+
+import json
+import os
+import random
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'test')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'test')
+
+import app
+import json_storage as storage
+import snapshot_history
+
+def track(i):
+    return {'id': f'track_{i}', 'name': f'Track {i}', 'popularity': i % 100}
+
+def read_records(user_id, time_range='short_term'):
+    with open(snapshot_history.get_log_path(user_id, 'top_tracks', time_range)) as f:
+        return [json.loads(line) for line in f]
+
+def test_deltas_round_trip():
+    rng = random.Random(7)
+    for _ in range(300):
+        old = [track(i) for i in rng.sample(range(60), rng.randint(0, 30))]
+        new = [track(i) for i in rng.sample(range(60), rng.randint(0, 30))]
+        assert snapshot_history.apply_delta(old, snapshot_history.compute_delta(old, new)) == new
+
+    # One track climbing the chart is a single move
+    old = [track(i) for i in range(20)]
+    new = [old[12]] + old[:12] + old[13:]
+    delta = snapshot_history.compute_delta(old, new)
+    assert delta == {'removed': [], 'inserted': [], 'moved': [[0, 'track_12']]}
+    print("✅ Deltas rebuild the new list; a single climb is one move")
+
+def test_versions_rebuild_with_keyframes(storage_dir):
+    rng = random.Random(11)
+    versions = {}
+    ids = list(range(50))
+    for _ in range(25):
+        # Shuffle a few ranks and swap a few tracks, like a weekly sync
+        for _ in range(3):
+            a, b = rng.randrange(50), rng.randrange(50)
+            ids[a], ids[b] = ids[b], ids[a]
+        ids[rng.randrange(50)] = rng.randrange(50, 500)
+        ids = list(dict.fromkeys(ids))
+        items = [track(i) for i in ids]
+        version = snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items)
+        if version:
+            versions[version] = items
+
+    assert len(versions) >= 20
+    for version, items in versions.items():
+        assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term', version)['items'] == items
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term')['items'] == versions[max(versions)]
+
+    keyframes = [r['version'] for r in read_records('user_1') if 'items' in r]
+    assert keyframes[0] == 1 and len(keyframes) < len(versions) // 2
+    assert all(b - a <= snapshot_history.SNAPSHOT_KEYFRAME_INTERVAL for a, b in zip(keyframes, keyframes[1:]))
+    print(f"✅ {len(versions)} versions rebuilt exactly from {len(keyframes)} keyframes")
+
+def test_unchanged_lists_are_not_recorded(storage_dir):
+    items = [track(i) for i in range(10)]
+    assert snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items) == 1
+    assert snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', list(items)) is None
+    assert snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items[1:]) == 2
+    assert len(snapshot_history.list_snapshots('user_1', 'top_tracks', 'short_term')) == 2
+    print("✅ Only changes add versions")
+
+def test_lookup_by_time_and_diff(storage_dir):
+    first = [track(i) for i in range(10)]
+    second = [track(3)] + [t for t in first if t['id'] != 'track_3'][:8] + [track(99)]
+    snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', first)
+    snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', second)
+
+    taken = [datetime.fromisoformat(s['taken_at'])
+             for s in snapshot_history.list_snapshots('user_1', 'top_tracks', 'short_term')]
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term', at=taken[0])['version'] == 1
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term', at=datetime.now())['version'] == 2
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term', at=datetime(2000, 1, 1)) is None
+
+    diff = snapshot_history.diff_snapshots('user_1', 'top_tracks', 'short_term', 1, 2)
+    assert [t['id'] for t in diff['entered']] == ['track_99'] and diff['entered'][0]['rank'] == 10
+    assert [t['id'] for t in diff['exited']] == ['track_9']
+    climb = next(m for m in diff['moved'] if m['item']['id'] == 'track_3')
+    assert (climb['from_rank'], climb['to_rank']) == (4, 1)
+    assert snapshot_history.diff_snapshots('user_1', 'top_tracks', 'short_term', 1, 5) is None
+
+    timeline = snapshot_history.summarize_history('user_1', 'top_tracks', 'short_term', top=1)
+    assert [(v['top'], v['entered'], v['exited']) for v in timeline] == [(['Track 0'], 0, 0), (['Track 3'], 1, 1)]
+    print("✅ Snapshots found by time and diffed")
+
+def test_crash_leftovers_do_not_break_the_log(storage_dir):
+    """Half a record left by a crash is cut off before the next append, and glued lines are skipped."""
+    items = [track(i) for i in range(10)]
+    snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items)
+    path = snapshot_history.get_log_path('user_1', 'top_tracks', 'short_term')
+    with open(path, 'a') as f:
+        f.write('{"version":2,"taken_at":"2025-')
+
+    assert snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items[1:]) == 2
+    assert [r['version'] for r in read_records('user_1')] == [1, 2]
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term')['items'] == items[1:]
+
+    # A log written before appends trimmed the partial line
+    with open(path, 'a') as f:
+        f.write('{"version":3,"tak' + json.dumps({'version': 3, 'taken_at': '2025-01-01T00:00:00',
+                                                   'items': items}) + '\n')
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term')['version'] == 2
+    assert snapshot_history.record_snapshot('user_1', 'top_tracks', 'short_term', items[2:]) == 3
+    assert snapshot_history.get_snapshot('user_1', 'top_tracks', 'short_term')['items'] == items[2:]
+    print("✅ Partial and glued records are skipped")
+
+def test_failed_saves_record_no_snapshot(storage_dir, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, 'save_top_tracks', lambda *args: False)
+        assert not app.save_top_items('user_1', 'tracks', [track(i) for i in range(5)], 'short_term')
+    assert snapshot_history.list_snapshots('user_1', 'top_tracks', 'short_term') == []
+
+    assert app.save_top_items('user_1', 'tracks', [track(i) for i in range(5)], 'short_term')
+    assert len(snapshot_history.list_snapshots('user_1', 'top_tracks', 'short_term')) == 1
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
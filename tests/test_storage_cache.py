@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Test script to verify the storage read-through cache (runs offline)."""
+
+import copy
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+from storage_cache import StorageReadCache, read_cache
+
+TRACKS = [{'id': f'track_{i}', 'name': f'Track {i}', 'popularity': i} for i in range(100)]
+
+def test_repeated_loads_skip_parsing(storage_dir):
+    """Unchanged files are parsed once; writes through storage invalidate the entry."""
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+
+    first = storage.load_top_tracks('user_1', 'short_term')
+    second = storage.load_top_tracks('user_1', 'short_term')
+    assert first is second
+
+    storage.save_top_tracks('user_1', TRACKS[:10], 'short_term')
+    assert len(storage.load_top_tracks('user_1', 'short_term')) == 10
+
+    # Metadata-only touches keep the cached entry
+    storage.touch_data('user_1', 'top_tracks', 'short_term')
+    assert storage.load_top_tracks('user_1', 'short_term') is storage.load_top_tracks('user_1', 'short_term')
+    print(f"✅ Read cache stats: {read_cache.get_stats()}")
+
+def test_changes_from_other_writers_are_seen(storage_dir):
+    """A file rewritten behind the cache's back is re-read (mtime/size key)."""
+    storage.save_data('user_1', 'recently_played', TRACKS)
+    assert len(storage.load_data('user_1', 'recently_played')['data']) == 100
+
+    path = storage.get_file_path('user_1', 'recently_played')
+    with open(path, 'w') as f:
+        json.dump({'timestamp': '2025-01-01T00:00:00', 'data': TRACKS[:3]}, f)
+    assert len(storage.load_data('user_1', 'recently_played')['data']) == 3
+
+    os.remove(path)
+    assert storage.load_data('user_1', 'recently_played') is None
+
+def test_cached_data_is_read_only_but_serializable(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'long_term')
+    tracks = storage.load_top_tracks('user_1', 'long_term')
+
+    for mutate in (lambda: tracks.append({}), lambda: tracks.sort(key=len), lambda: tracks[0].update(name='x'),
+                   lambda: tracks[0].__setitem__('name', 'x')):
+        try:
+            mutate()
+            assert False, 'mutation should fail'
+        except TypeError:
+            pass
+
+    assert json.loads(json.dumps(tracks))[0]['name'] == 'Track 0'
+    assert type(pickle.loads(pickle.dumps(tracks))[0]) is dict
+
+    editable = copy.deepcopy(tracks)
+    editable.sort(key=lambda t: -t['popularity'])
+    editable[0]['name'] = 'edited'
+    assert tracks[99]['name'] == 'Track 99'
+    assert sorted(tracks, key=lambda t: -t['popularity'])[0]['id'] == 'track_99'
+
+def test_memory_budget_evicts_least_recently_used(tmp_path):
+    directory = str(tmp_path)
+    cache = StorageReadCache(max_bytes=60 * 1024)
+    paths = []
+    for i in range(5):
+        path = os.path.join(directory, f'file_{i}.json')
+        with open(path, 'w') as f:
+            json.dump(TRACKS, f)
+        paths.append(path)
+        cache.load(path, lambda p: json.load(open(p)))
+
+    stats = cache.get_stats()
+    print(f"✅ Budget stats: {stats}")
+    assert stats['cached_bytes'] <= 60 * 1024
+    assert stats['evictions'] > 0
+    assert isinstance(cache.load(paths[-1], lambda p: {}), list)  # Newest entry is still cached
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test script to verify pluggable storage codecs (runs offline)."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+import storage_codecs
+from storage_cache import read_cache
+
+TRACKS = [{'id': f'track_{i}', 'name': f'Track {i}', 'artists': [{'id': 'a', 'name': 'Ärtist'}]} for i in range(50)]
+
+def test_every_codec_round_trips(storage_dir, monkeypatch):
+    """Files written with any codec load back through the usual API."""
+    for name in storage_codecs.CODECS:
+        monkeypatch.setattr(storage_codecs, 'STORAGE_CODEC', name)
+        storage.save_data('user_1', 'followed_artists', TRACKS)
+        streamed = storage.stream_data('user_1', 'recently_played', iter(TRACKS), metadata={'projection': 1})
+
+        assert storage.load_data('user_1', 'followed_artists')['data'] == TRACKS
+        loaded = storage.load_data('user_1', 'recently_played')
+        assert streamed == 50 and loaded['data'] == TRACKS and loaded['projection'] == 1
+
+        size = os.path.getsize(storage.get_file_path('user_1', 'followed_artists'))
+        print(f"✅ {name}: {size} bytes")
+
+def test_legacy_files_still_load(storage_dir):
+    """Pretty-printed files written before codecs existed are read as JSON."""
+    with open(storage.get_file_path('user_1', 'top_tracks', 'short_term'), 'w') as f:
+        json.dump({'user_id': 'user_1', 'timestamp': '2025-01-01T00:00:00', 'data': TRACKS}, f, indent=2)
+    assert storage.load_top_tracks('user_1', 'short_term') == TRACKS
+
+def test_codec_is_detected_from_header():
+    gzip_raw = storage_codecs.CODECS['gzip'].encode({'data': TRACKS})
+    assert storage_codecs.detect_codec(gzip_raw).name == 'gzip'
+    assert storage_codecs.detect_codec(b'{"data": []}').name == 'compact'
+    assert storage_codecs.get_codec('no-such-codec').name == 'compact'
+
+def test_limited_reads_decode_only_the_slice(storage_dir, monkeypatch):
+    """load_top_tracks(limit=N) reads jsonl files through the offset index."""
+    tracks = [dict(track, id=f'track_{i}') for i, track in enumerate(TRACKS * 40)]
+    monkeypatch.setattr(storage_codecs, 'STORAGE_CODEC', 'jsonl')
+    storage.save_data('user_1', 'top_tracks', tracks, 'long_term')
+    monkeypatch.setattr(storage_codecs, 'STORAGE_CODEC', 'compact')
+    storage.save_data('user_1', 'top_tracks', tracks, 'short_term')
+    read_cache.clear()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(storage_codecs, 'load_file',
+                      lambda path: (_ for _ in ()).throw(AssertionError('parsed the whole file')))
+        top_10 = storage.load_top_tracks('user_1', 'long_term', limit=10)
+        middle = storage.load_items('user_1', 'top_tracks', 'long_term', limit=3, offset=1000)
+        past_end = storage.load_top_tracks('user_1', 'long_term', limit=10 ** 6)
+    assert top_10 == tracks[:10] and middle == tracks[1000:1003] and past_end == tracks
+    assert read_cache.get_stats()['entries'] == 0
+
+    # Other codecs fall back to a full load, and the cached copy serves later slices
+    assert storage.load_top_tracks('user_1', 'short_term', limit=5) == tracks[:5]
+    assert storage.load_top_tracks('user_1', 'long_term') == tracks
+    assert storage.load_top_tracks('user_1', 'long_term', limit=2) == tracks[:2]
+    assert storage.load_top_tracks('user_1', 'medium_term', limit=2) is None
+    print(f"✅ jsonl slice reads: {len(top_10)} of {len(tracks)} tracks decoded")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
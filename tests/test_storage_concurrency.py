@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Test script to verify storage is safe with several writer processes (runs offline)."""
+
+import multiprocessing
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+import storage_codecs
+
+def tracks(n):
+    return [{'id': f'track_{i}', 'name': f'Track {i}' * 20} for i in range(n)]
+
+def write_versions(worker, rounds):
+    for i in range(rounds):
+        # Alternate large and small payloads so a torn write would show up as bad JSON
+        storage.save_data('user_1', 'shared', tracks(2000 if (worker + i) % 2 else 10), metadata={'worker': worker})
+        storage.save_data('user_1', f'own_{worker}', tracks(5))
+
+def _fork_context():
+    if storage.fcntl is None or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+def test_readers_never_see_partial_writes(storage_dir):
+    context = _fork_context()
+    if context is None:
+        pytest.skip("needs fork and fcntl")
+    storage.save_data('user_1', 'shared', tracks(10))
+    path = storage.get_file_path('user_1', 'shared')
+
+    writers = [context.Process(target=write_versions, args=(worker, 15)) for worker in range(4)]
+    for writer in writers:
+        writer.start()
+
+    reads = 0
+    while any(writer.is_alive() for writer in writers):
+        # Read without locks or the cache, like another worker would
+        data = storage_codecs.load_file(path)
+        assert len(data['data']) in (10, 2000)
+        reads += 1
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+
+    leftovers = [name for name in os.listdir(storage.get_user_dir('user_1')) if name.endswith(('.tmp', '.lock'))]
+    assert not leftovers, leftovers
+    print(f"✅ {reads} lock-free reads, all complete")
+
+def test_manifest_keeps_every_writers_entry(storage_dir):
+    context = _fork_context()
+    if context is None:
+        pytest.skip("needs fork and fcntl")
+
+    writers = [context.Process(target=write_versions, args=(worker, 5)) for worker in range(6)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+
+    entries = storage.load_manifest('user_1')['entries']
+    assert set(entries) == {'shared'} | {f'own_{worker}' for worker in range(6)}
+    assert storage.storage_index.get_totals()['files'] == 7
+    print("✅ No lost manifest updates")
+
+def test_locks_leave_no_trace(storage_dir):
+    """Thread locks are dropped once released and lock files stay out of user directories."""
+    threads = [threading.Thread(target=write_versions, args=(worker, 5)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert storage._path_locks == {}
+    user_files = os.listdir(storage.get_user_dir('user_1'))
+    assert not [name for name in user_files if name.endswith('.lock')], user_files
+    assert [user_id for user_id, _ in storage.iter_user_dirs()] == ['user_1']
+
+    # The old-layout symlink and the shard path share one lock
+    legacy = storage.get_legacy_user_dir('user_1')
+    os.symlink(storage.get_user_dir('user_1'), legacy)
+    with storage.key_lock(os.path.join(legacy, 'shared.json')):
+        with storage.key_lock(storage.get_file_path('user_1', 'shared')):
+            assert len(storage._path_locks) == 1
+    print(f"✅ No lock files among {len(user_files)} user files; lock registry empty")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
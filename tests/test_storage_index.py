@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test script to verify the global storage index (runs offline)."""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+
+TRACKS = [{'id': f'track_{i}', 'name': f'Track {i}', 'popularity': i} for i in range(50)]
+
+def walk_totals():
+    """Totals computed the slow way, for comparison."""
+    users, files, size = 0, 0, 0
+    for _, user_path in storage.iter_user_dirs():
+        names = [f for f in os.listdir(user_path) if f.endswith('.json') and f != storage.MANIFEST_FILE]
+        users += bool(names)
+        files += len(names)
+        size += sum(os.path.getsize(os.path.join(user_path, f)) for f in names)
+    return {'users': users, 'files': files, 'bytes': size}
+
+def test_totals_follow_writes_and_deletes(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+    storage.save_top_tracks('user_1', TRACKS, 'long_term')
+    storage.save_user_profile('user_2', {'id': 'user_2'})
+    assert storage.storage_index.get_totals() == walk_totals()
+
+    # Overwrites adjust bytes without adding files
+    storage.save_top_tracks('user_1', TRACKS[:5], 'short_term')
+    storage.stream_data('user_2', 'followed_artists', iter(TRACKS))
+    storage.touch_data('user_2', 'profile')
+    assert storage.storage_index.get_totals() == walk_totals()
+
+    storage.clear_user_data('user_1')
+    totals = storage.storage_index.get_totals()
+    assert totals == walk_totals() and totals['users'] == 1 and totals['files'] == 2
+    print(f"✅ Totals: {totals}")
+
+def test_stats_and_listing_come_from_index(storage_dir, monkeypatch):
+    storage.save_top_tracks('user_1', TRACKS, 'medium_term')
+    storage.save_data('user_1', 'recently_played', TRACKS[:20])
+
+    stats = storage.get_storage_stats()
+    assert stats['users'] == 1 and stats['total_files'] == 2
+
+    # Listing doesn't touch the user's directory
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'listdir', lambda path='.': (_ for _ in ()).throw(AssertionError(f'walked {path}')))
+        files = {f['filename']: f for f in storage.get_all_user_files('user_1')}
+        storage.get_storage_stats()
+    assert files['top_tracks_medium_term.json']['time_range'] == 'medium_term'
+    assert files['recently_played.json']['item_count'] == 20
+    assert not files['recently_played.json']['is_stale']
+
+def test_rebuild_indexes_existing_files(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+    # A file from before the manifest and index existed
+    legacy = os.path.join(storage.get_user_dir('user_2'), 'top_artists_long_term.json')
+    with open(legacy, 'w') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'data': TRACKS[:3]}, f)
+
+    os.remove(storage.storage_index.db_path)
+    stats = storage.get_storage_stats()
+    assert stats['users'] == 2 and stats['total_files'] == 2
+    assert storage.storage_index.get_totals() == walk_totals()
+    [entry] = storage.get_all_user_files('user_2')
+    assert entry['data_type'] == 'top_artists' and entry['item_count'] == 3
+    print(f"✅ Rebuilt stats: {stats}")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
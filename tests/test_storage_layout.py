@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test script to verify the sharded storage layout and its migration (runs offline)."""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'scripts', 'utils'))
+
+import json_storage as storage
+import migrate_storage_layout
+
+TRACKS = [{'id': f'track_{i}', 'name': f'Track {i}'} for i in range(10)]
+
+def write_legacy_user(user_id):
+    """A user directory as the flat layout wrote it."""
+    user_dir = os.path.join(storage.STORAGE_DIR, user_id)
+    os.makedirs(user_dir)
+    with open(os.path.join(user_dir, 'top_tracks_short_term.json'), 'w') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'data': TRACKS}, f, indent=2)
+
+def test_new_users_are_sharded(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+
+    path = storage.get_file_path('user_1', 'top_tracks', 'short_term')
+    relative = os.path.relpath(path, storage_dir).split(os.sep)
+    assert relative[0] == storage.SHARDS_DIR and len(relative[1]) == 2 and len(relative[2]) == 2
+    assert relative[3:] == ['user_1', 'top_tracks_short_term.json']
+    assert not os.path.exists(os.path.join(storage_dir, 'user_1'))
+    print(f"✅ Sharded path: {os.path.join(*relative)}")
+
+def test_legacy_users_stay_readable(storage_dir):
+    write_legacy_user('old_user')
+    storage.save_top_tracks('new_user', TRACKS, 'long_term')
+
+    assert storage.get_user_dir('old_user') == os.path.join(storage_dir, 'old_user')
+    assert len(storage.load_top_tracks('old_user', 'short_term')) == 10
+    assert sorted(user_id for user_id, _ in storage.iter_user_dirs()) == ['new_user', 'old_user']
+    assert storage.get_storage_stats()['total_files'] == 2
+
+def test_migration_moves_users_and_links_old_paths(storage_dir):
+    write_legacy_user('old_user')
+    old_path = storage.get_file_path('old_user', 'top_tracks', 'short_term')
+    assert len(storage.load_top_tracks('old_user', 'short_term')) == 10
+
+    assert migrate_storage_layout.migrate_user('old_user', dry_run=True)
+    assert os.path.isfile(old_path) and not os.path.islink(os.path.dirname(old_path))
+    assert migrate_storage_layout.migrate_user('old_user')
+
+    # New lookups use the shard; a worker holding the old path still sees the same file
+    assert storage.get_user_dir('old_user') == storage.get_shard_dir('old_user')
+    assert len(storage.load_top_tracks('old_user', 'short_term')) == 10
+    storage.save_top_tracks('old_user', TRACKS[:3], 'short_term')
+    with open(old_path) as f:
+        assert len(json.load(f)['data']) == 3
+
+    # Each user is listed once, and only flat-layout users are left to migrate
+    assert [user_id for user_id, _ in storage.iter_user_dirs()] == ['old_user']
+    assert migrate_storage_layout.legacy_user_dirs() == []
+
+    assert migrate_storage_layout.prune_links() == 1
+    old_lock = storage.get_file_path('old_user', 'top_tracks', 'short_term') + '.lock'
+    open(old_lock, 'w').close()  # Left behind by a version that locked next to each file
+    assert migrate_storage_layout.prune_lock_files() == 1 and not os.path.exists(old_lock)
+    assert not os.path.lexists(os.path.join(storage_dir, 'old_user'))
+    assert len(storage.load_top_tracks('old_user', 'short_term')) == 3
+
+    assert storage.clear_user_data('old_user')
+    assert list(storage.iter_user_dirs()) == []
+    print("✅ Migration keeps old paths working")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
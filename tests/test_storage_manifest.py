@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Test script to verify the per-user storage manifest (runs offline)."""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+import storage_codecs
+from storage_cache import read_cache
+
+TRACKS = [{'id': f'track_{i}', 'name': f'Track {i}', 'popularity': i} for i in range(50)]
+
+class PayloadReads:
+    """Count data files parsed, ignoring the manifest itself."""
+
+    def __init__(self):
+        self.paths = []
+        self._load_file = storage_codecs.load_file
+
+    def __enter__(self):
+        def load_file(path):
+            if os.path.basename(path) != storage.MANIFEST_FILE:
+                self.paths.append(path)
+            return self._load_file(path)
+        storage_codecs.load_file = load_file
+        return self
+
+    def __exit__(self, *exc):
+        storage_codecs.load_file = self._load_file
+
+def test_save_records_entry(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+
+    entry = storage.get_manifest_entry('user_1', 'top_tracks', 'short_term')
+    path = storage.get_file_path('user_1', 'top_tracks', 'short_term')
+    with open(path, 'rb') as f:
+        raw = f.read()
+    assert entry['item_count'] == 50
+    assert entry['size'] == len(raw)
+    assert entry['sha256'] == hashlib.sha256(raw).hexdigest()
+    assert entry['projection'] == storage.PROJECTION_VERSION
+
+    # Streamed writes are recorded too
+    storage.stream_data('user_1', 'followed_artists', iter(TRACKS[:7]))
+    entry = storage.get_manifest_entry('user_1', 'followed_artists')
+    with open(storage.get_file_path('user_1', 'followed_artists'), 'rb') as f:
+        assert entry['sha256'] == hashlib.sha256(f.read()).hexdigest()
+    assert entry['item_count'] == 7
+    print(f"✅ Manifest entry: {entry}")
+
+def test_staleness_reads_no_payload(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'long_term')
+    read_cache.clear()
+
+    with PayloadReads() as reads:
+        assert not storage.is_data_stale('user_1', 'top_tracks', 'long_term')
+        assert storage.has_current_projection('user_1', 'top_tracks', 'long_term')
+        assert storage.is_data_stale('user_1', 'top_tracks', 'short_term')  # Never saved
+        storage.get_all_user_files('user_1')
+    assert reads.paths == [], reads.paths
+
+def test_touch_updates_verified_at(storage_dir):
+    storage.save_data('user_1', 'recently_played', TRACKS)
+
+    # Age the entry, then record an unchanged resync
+    old = (datetime.now() - timedelta(days=3)).isoformat()
+    storage._update_manifest('user_1', 'recently_played', {'timestamp': old, 'verified_at': old}, replace=False)
+    assert storage.is_data_stale('user_1', 'recently_played', days=1)
+
+    assert storage.touch_data('user_1', 'recently_played')
+    assert not storage.is_data_stale('user_1', 'recently_played', days=1)
+    assert storage.get_manifest_entry('user_1', 'recently_played')['timestamp'] == old
+
+def test_legacy_files_are_indexed_once(storage_dir):
+    path = storage.get_file_path('user_1', 'top_artists', 'medium_term')
+    with open(path, 'w') as f:
+        json.dump({'timestamp': datetime.now().isoformat(), 'data': TRACKS[:4]}, f, indent=2)
+
+    with PayloadReads() as reads:
+        assert not storage.is_data_stale('user_1', 'top_artists', 'medium_term')
+        assert not storage.has_current_projection('user_1', 'top_artists', 'medium_term')
+        read_cache.clear()
+        assert not storage.is_data_stale('user_1', 'top_artists', 'medium_term')
+    assert reads.paths == [path]
+    assert storage.get_manifest_entry('user_1', 'top_artists', 'medium_term')['item_count'] == 4
+
+def test_user_files_listing(storage_dir):
+    storage.save_top_tracks('user_1', TRACKS, 'short_term')
+    storage.save_user_profile('user_1', {'id': 'user_1'})
+
+    files = {f['filename']: f for f in storage.get_all_user_files('user_1')}
+    assert set(files) == {'top_tracks_short_term.json', 'profile.json'}
+    assert files['top_tracks_short_term.json']['data_type'] == 'top_tracks'
+    assert files['top_tracks_short_term.json']['time_range'] == 'short_term'
+    assert files['top_tracks_short_term.json']['item_count'] == 50
+    assert not files['top_tracks_short_term.json']['is_stale']
+    assert storage.get_storage_stats()['total_files'] == 2
+
+    # Deleted files drop out even though their entry remains
+    os.remove(storage.get_file_path('user_1', 'top_tracks', 'short_term'))
+    assert storage.get_manifest_entry('user_1', 'top_tracks', 'short_term') is None
+    assert storage.is_data_stale('user_1', 'top_tracks', 'short_term')
+    print("✅ Listing and stats skip the manifest")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Test script to verify write-behind storage saves (runs offline)."""
+
+import os
+import stat
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+import json_storage as storage
+from projections import project_tracks
+from storage_cache import read_cache
+from storage_writer import WriteBehindWriter
+
+def track(i):
+    return {'id': f'track_{i}', 'name': f'Track {i}', 'duration_ms': 200000 + i,
+            'artists': [{'id': 'artist_1', 'name': 'Artist 1'}], 'album': {'id': 'album_1', 'name': 'Album 1'}}
+
+@pytest.fixture
+def write_behind(storage_dir, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_WRITE_BEHIND', True)
+    monkeypatch.setattr(storage.write_behind, 'delay', 0.05)
+
+def test_queued_saves_are_readable(write_behind, monkeypatch):
+    monkeypatch.setattr(storage.write_behind, 'delay', 0.3)
+    tracks = [track(i) for i in range(30)]
+    assert storage.save_top_tracks('user_1', tracks, 'short_term')
+    assert storage.save_user_profile('user_1', {'id': 'user_1', 'display_name': 'One'})
+    path = storage.get_file_path('user_1', 'top_tracks', 'short_term')
+    assert not os.path.exists(path)
+
+    # Served from the queue until written
+    assert storage.load_top_tracks('user_1', 'short_term') == project_tracks(tracks)
+    assert storage.load_top_tracks('user_1', 'short_term', limit=3) == project_tracks(tracks[:3])
+    assert storage.load_user_profile('user_1')['display_name'] == 'One'
+    entry = storage.get_manifest_entry('user_1', 'top_tracks', 'short_term')
+    assert entry['pending'] and entry['item_count'] == 30
+    assert not storage.is_data_stale('user_1', 'top_tracks', 'short_term')
+    assert storage.has_current_projection('user_1', 'top_tracks', 'short_term')
+
+    assert storage.write_behind.flush(timeout=5)
+    assert os.path.exists(path)
+    entry = storage.get_manifest_entry('user_1', 'top_tracks', 'short_term')
+    assert 'pending' not in entry and entry['sha256'] and entry['timestamp'] == entry['verified_at']
+    assert storage.load_top_tracks('user_1', 'short_term') == project_tracks(tracks)
+    print("✅ Queued saves are served until they reach disk")
+
+def test_repeated_saves_coalesce_and_share_fsyncs(write_behind, monkeypatch):
+    monkeypatch.setattr(storage.write_behind, 'delay', 0.2)
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+    monkeypatch.setattr(os, 'fsync', lambda fd: events.append(
+        'dir' if stat.S_ISDIR(os.fstat(fd).st_mode) else 'file') or real_fsync(fd))
+    monkeypatch.setattr(os, 'replace', lambda src, dst: events.append('rename') or real_replace(src, dst))
+    before = storage.write_behind.get_stats()
+    for version in range(20):
+        storage.save_data('user_1', 'recently_played', [{'version': version}])
+    for i in range(5):
+        storage.save_data('user_1', f'extra_{i}', {'i': i})
+    assert storage.load_data('user_1', 'recently_played')['data'][0]['version'] == 19
+    assert storage.write_behind.flush(timeout=5)
+
+    stats = storage.write_behind.get_stats()
+    assert stats['written'] - before['written'] == 6
+    assert stats['coalesced'] - before['coalesced'] == 19
+    # Each of the 6 files and 6 manifest updates is synced before its rename;
+    # their one directory is synced once, after all of them
+    renames = events.count('rename')
+    assert renames == 12 and events[:-1] == ['file', 'rename'] * renames and events[-1] == 'dir', events
+    read_cache.clear()
+    assert storage.load_data('user_1', 'recently_played')['data'][0]['version'] == 19
+    print(f"✅ 25 saves written as {stats['written'] - before['written']} files with {len(events) - renames} fsyncs")
+
+def test_entity_lists_and_streams(write_behind, monkeypatch):
+    monkeypatch.setattr(storage, 'STORAGE_ENTITY_STORE', True)
+    storage.save_top_tracks('user_1', [track(i) for i in range(10)], 'long_term')
+    storage.save_top_tracks('user_1', [track(i) for i in range(5)], 'long_term')
+    assert storage.write_behind.flush(timeout=5)
+    assert storage.collect_entity_garbage() == 0  # Only the last save was written
+    assert len(storage.load_top_tracks('user_1', 'long_term')) == 5
+
+    # A synchronous stream replaces a queued save of the same file
+    monkeypatch.setattr(storage.write_behind, 'delay', 0.3)
+    storage.save_data('user_1', 'followed_artists', [{'id': 'queued'}])
+    assert storage.stream_data('user_1', 'followed_artists', iter([{'id': 'streamed'}])) == 1
+    assert storage.write_behind.flush(timeout=5)
+    assert storage.load_data('user_1', 'followed_artists')['data'] == [{'id': 'streamed'}]
+    print("✅ Entity lists and streams stay consistent with the queue")
+
+def test_queue_is_bounded():
+    release = threading.Event()
+    batches, written = [], []
+
+    def run_batch(writes):
+        release.wait(5)
+        batches.append(len(writes))
+        for write in writes:
+            write()
+
+    writer = WriteBehindWriter(run_batch, max_pending=2, delay=0)
+    writer.submit('a', 1, lambda: written.append('a'))
+    time.sleep(0.1)  # 'a' is now in flight, holding the writer thread
+    writer.submit('b', 1, lambda: written.append('b'))
+    writer.submit('c', 1, lambda: written.append('c'))
+    writer.submit('b', 2, lambda: written.append('b2'))  # Coalesces, so it doesn't block
+    assert writer.get('b') == 2 and writer.get('a') == 1
+
+    blocked = threading.Thread(target=writer.submit, args=('d', 1, lambda: written.append('d')))
+    blocked.start()
+    time.sleep(0.1)
+    assert blocked.is_alive() and writer.get_stats()['blocked'] == 1
+
+    release.set()
+    blocked.join(5)
+    assert writer.flush(timeout=5) and not blocked.is_alive()
+    assert writer.get('a') is None and writer.get_stats()['pending'] == 0
+    assert written == ['a', 'b2', 'c', 'd']
+    print(f"✅ A full queue blocks new files until the writer catches up (batches {batches})")
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-s']))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test script to verify the concurrent sync engine (runs offline)."""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from sync_engine import SyncJob, run_sync_jobs
+from sync_queue import SyncJobQueue
+
+def test_jobs_run_concurrently():
+    """A full sync should take about as long as its slowest job."""
+    jobs = [SyncJob(f'job_{i}', lambda i=i: time.sleep(0.2) or i) for i in range(4)]
+
+    start = time.perf_counter()
+    outcomes = run_sync_jobs(jobs, max_concurrency=4)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ 4 x 200ms jobs finished in {elapsed:.3f}s")
+    assert elapsed < 0.6
+    assert [o['result'] for o in outcomes] == [0, 1, 2, 3]
+    assert all(o['duration_ms'] >= 190 for o in outcomes)
+
+def test_concurrency_cap_and_failures():
+    """Jobs respect the concurrency cap and failures are reported per job."""
+    in_flight = []
+    peak = []
+
+    def work():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        time.sleep(0.05)
+        in_flight.pop()
+        return 'ok'
+
+    def broken():
+        raise RuntimeError('boom')
+
+    jobs = [SyncJob(f'job_{i}', work) for i in range(6)]
+    jobs.append(SyncJob('broken', broken, required=False))
+    progress = []
+    outcomes = run_sync_jobs(jobs, max_concurrency=2, on_progress=progress.append)
+
+    print(f"✅ Peak concurrency: {max(peak)}")
+    assert max(peak) <= 2
+    finished = [p for p in progress if p['status'] in ('done', 'failed')]
+    assert len(finished) == 7
+    assert sum(1 for p in progress if p['status'] == 'running') == 7
+    assert outcomes[-1]['status'] == 'failed'
+    assert outcomes[-1]['error'] == 'boom'
+    assert not outcomes[-1]['required']
+
+def test_background_queue_deduplicates_per_user():
+    """Only one sync per user is in flight and its progress is reported."""
+    sync_queue = SyncJobQueue(workers=2)
+    calls = []
+
+    def sync(on_progress):
+        calls.append(1)
+        jobs = [SyncJob('top_tracks:short_term', lambda: time.sleep(0.1) or 10, 'short_term')]
+        run_sync_jobs(jobs, on_progress=on_progress)
+        return {'tracks_synced': 10}
+
+    job, created = sync_queue.enqueue('user_a', sync)
+    duplicate, duplicate_created = sync_queue.enqueue('user_a', sync)
+    assert created and not duplicate_created
+    assert duplicate['job_id'] == job['job_id']
+
+    deadline = time.time() + 5
+    while sync_queue.is_active('user_a') and time.time() < deadline:
+        time.sleep(0.02)
+
+    status = sync_queue.get_status('user_a')
+    print(f"✅ Background job finished: {status['status']}, progress: {status['progress']}")
+    assert len(calls) == 1
+    assert status['status'] == 'done'
+    assert status['progress']['top_tracks:short_term']['status'] == 'done'
+    assert status['result'] == {'tracks_synced': 10}
+
+if __name__ == "__main__":
+    test_jobs_run_concurrently()
+    test_concurrency_cap_and_failures()
+    test_background_queue_deduplicates_per_user()
+    print("Test complete!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test script to verify coordinated token refresh (runs offline)."""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from token_manager import TokenManager
+
+class FakeOAuth:
+    """Counts refresh calls; each refresh takes a while, like a real round trip."""
+
+    def __init__(self):
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    def refresh_access_token(self, refresh_token):
+        time.sleep(0.1)
+        with self.lock:
+            self.refreshes += 1
+            n = self.refreshes
+        return {'access_token': f'access_{n}', 'refresh_token': refresh_token,
+                'expires_at': int(time.time()) + 3600}
+
+def expired_token():
+    return {'access_token': 'access_0', 'refresh_token': 'refresh_user_1', 'expires_at': int(time.time()) - 5}
+
+def test_concurrent_requests_share_one_refresh():
+    """Requests that find the token expired wait on a single refresh."""
+    oauth = FakeOAuth()
+    refreshed = []
+    manager = TokenManager(oauth, on_refresh=lambda old, new: refreshed.append((old, new)), renew_interval=0)
+    results = []
+
+    # Every request carries the stale token from its session cookie
+    threads = [threading.Thread(target=lambda: results.append(manager.get_token(expired_token())['access_token']))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"✅ {len(results)} requests, {oauth.refreshes} refresh, stats: {manager.get_stats()}")
+    assert oauth.refreshes == 1
+    assert results == ['access_1'] * 8
+    assert len(refreshed) == 1 and refreshed[0][0]['access_token'] == 'access_0'
+
+    # Later requests with the old session token get the refreshed one without a new call
+    assert manager.get_token(expired_token())['access_token'] == 'access_1'
+    assert oauth.refreshes == 1
+
+def test_tokens_are_renewed_before_expiry():
+    """The renewal pass refreshes active tokens inside the margin and skips idle ones."""
+    oauth = FakeOAuth()
+    manager = TokenManager(oauth, margin=300, renew_interval=0, idle_seconds=60)
+
+    soon = {'access_token': 'a', 'refresh_token': 'refresh_soon', 'expires_at': int(time.time()) + 120}
+    later = {'access_token': 'b', 'refresh_token': 'refresh_later', 'expires_at': int(time.time()) + 3000}
+    assert manager.get_token(soon) is soon
+    manager.get_token(later)
+
+    manager.renew_expiring()
+    assert oauth.refreshes == 1
+    assert manager.get_token(soon)['access_token'] == 'access_1'
+    assert manager.get_stats()['proactive_refreshes'] == 1
+
+    # A session that hasn't been used for a while is dropped instead of renewed
+    idle = {'access_token': 'c', 'refresh_token': 'refresh_idle', 'expires_at': int(time.time()) + 120}
+    manager.get_token(idle)
+    manager._lineages[list(manager._lineages)[-1]].last_used -= 120
+    manager.renew_expiring()
+    print(f"✅ Renewal stats: {manager.get_stats()}")
+    assert oauth.refreshes == 1
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_one_refresh()
+    test_tokens_are_renewed_before_expiry()
+    print("Test complete!")